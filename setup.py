@@ -5,7 +5,8 @@ setup(
     version='0.1',
     packages=find_packages(),
     install_requires=[
-        'click'
+        'click',
+        'numpy'
     ],
     entry_points='''
         [console_scripts]
@@ -0,0 +1,159 @@
+import hashlib
+import json
+import os
+import pickle
+from datetime import datetime, timezone
+import numpy as np
+from compiled import export_ensemble, load_compiled, save_compiled
+
+#
+# Versioned artifacts of trained models
+#
+# Models are saved under a root directory, one numbered subdirectory per
+# version (<root>/1/, <root>/2/...), each holding the pickled classifier
+# (model.pkl) and a meta.json recording what it was trained on: the
+# dataset's name, feature_names and target_names, the backend and its
+# parameters, the number of training rows and a SHA-256 hash of the
+# training data (see data_hash), and the sklearn version.  Models which
+# can be compiled (see compiled) are also saved as compiled.npz, which can
+# be loaded instead of the pickle (load_model(..., compiled=True)) to score
+# data without sklearn.  Scoring new data with an artifact checks that its
+# features are the ones the model was trained on.
+#
+# Artifacts are pickles, so only load ones you trust.
+#
+
+# Bump whenever the layout of an artifact changes
+FORMAT_VERSION = 1
+
+
+# A hash of the values (as float64) and shapes of a training set
+def data_hash(X, y):
+    digest = hashlib.sha256()
+    for arr in (np.asarray(X, dtype=np.float64), np.asarray(y)):
+        arr = np.ascontiguousarray(arr)
+        digest.update('{}{}'.format(arr.dtype.str, arr.shape).encode())
+        digest.update(arr.tobytes())
+    return digest.hexdigest()
+
+
+# The versions saved under root, in increasing order
+def versions(root):
+    if not os.path.isdir(root):
+        return []
+    return sorted(int(name) for name in os.listdir(root)
+                  if name.isdigit() and os.path.exists(os.path.join(root, name, 'meta.json')))
+
+#
+# save_model: save a classifier fit on X, y (from dataset, a Bunch with
+#   name, feature_names and target_names) as the next version under root
+#
+# Returns the new version.
+#
+
+def save_model(model, root, dataset, X, y, backend, params):
+    import sklearn
+
+    os.makedirs(root, exist_ok=True)
+    version = (versions(root) or [0])[-1] + 1
+    while True:
+        directory = os.path.join(root, str(version))
+        try:
+            os.mkdir(directory)
+            break
+        except FileExistsError:
+            version += 1
+
+    with open(os.path.join(directory, 'model.pkl'), 'wb') as f:
+        pickle.dump(model, f, protocol=pickle.HIGHEST_PROTOCOL)
+    try:
+        save_compiled(export_ensemble(model), os.path.join(directory, 'compiled.npz'))
+        has_compiled = True
+    except ValueError:
+        has_compiled = False
+    meta = {
+        'format_version': FORMAT_VERSION,
+        'version': version,
+        'created': datetime.now(timezone.utc).isoformat(),
+        'dataset': dataset.name,
+        'feature_names': list(dataset.feature_names),
+        'target_names': list(dataset.target_names),
+        'backend': backend,
+        'params': params,
+        'training_rows': len(y),
+        'training_data_sha256': data_hash(X, y),
+        'sklearn_version': sklearn.__version__,
+        'compiled': has_compiled
+    }
+    # meta.json is written last, so a partially saved version is never listed
+    tmp = os.path.join(directory, 'meta.json.tmp')
+    with open(tmp, 'w') as f:
+        json.dump(meta, f, indent=2)
+    os.replace(tmp, os.path.join(directory, 'meta.json'))
+    return version
+
+
+class ModelArtifact:
+    def __init__(self, directory, compiled=False):
+        with open(os.path.join(directory, 'meta.json')) as f:
+            self.meta = json.load(f)
+        if self.meta.get('format_version') != FORMAT_VERSION:
+            raise ValueError('Model artifact {} has format version {}, expected {}'.format(
+                directory, self.meta.get('format_version'), FORMAT_VERSION))
+        if compiled:
+            if not self.meta.get('compiled'):
+                raise ValueError('Model artifact {} has no compiled model'.format(directory))
+            self.model = load_compiled(os.path.join(directory, 'compiled.npz'))
+        else:
+            with open(os.path.join(directory, 'model.pkl'), 'rb') as f:
+                self.model = pickle.load(f)
+        self.directory = directory
+
+    @property
+    def version(self):
+        return self.meta['version']
+
+    @property
+    def feature_names(self):
+        return self.meta['feature_names']
+
+    def check_features(self, dataset):
+        if list(dataset.feature_names) != self.feature_names:
+            raise ValueError('Model was trained on features {}, not {}'.format(
+                self.feature_names, list(dataset.feature_names)))
+
+    # Returns the rows of dataset, each with its raw and data columns, the
+    # predicted class and the probability of each class (as the results of
+    # dataset.run_gbc)
+    def predict(self, dataset):
+        self.check_features(dataset)
+        X = np.asarray(dataset.data, dtype=np.float64)
+        rows = np.append(dataset.raw, dataset.data, 1)
+        rows = np.append(rows, np.reshape(self.model.predict(X), (-1, 1)), 1)
+        return np.append(rows, self.model.predict_proba(X), 1)
+
+    # The name of a class label: labels index target_names, except those
+    # past its end (such as the meter targets' 100), which are their own name
+    def class_name(self, label):
+        names = self.meta['target_names']
+        return names[label] if 0 <= label < len(names) else str(label)
+
+    # Returns (class name, number of rows) for each of the model's classes,
+    # from the results of predict.  The labels need not be 0 to n - 1, so
+    # the predicted class is the column before one probability per class.
+    def class_counts(self, results):
+        classes = self.model.classes_
+        predicted = results[:, -len(classes) - 1]
+        return [(self.class_name(int(c)), int((predicted == str(c)).sum()))
+                for c in classes]
+
+
+# Loads the given version (by default the latest) of the model saved under
+# root, as the sklearn classifier or, if compiled is set, the compiled one
+def load_model(root, version=None, compiled=False):
+    if version is None:
+        saved = versions(root)
+        if not saved:
+            raise FileNotFoundError('No models saved under {}'.format(root))
+        version = saved[-1]
+    return ModelArtifact(os.path.join(root, str(version)), compiled)
@@ -0,0 +1,238 @@
+import numpy as np
+
+#
+# Compiled tree ensembles: gradient boosted classifiers flattened into
+# contiguous node arrays, evaluated with NumPy alone
+#
+# export_ensemble turns a fitted GradientBoostingClassifier or
+# HistGradientBoostingClassifier (the run_gbc backends) into a
+# CompiledEnsemble, which gives the same probabilities without sklearn -
+# nothing here imports it, so a compiled model can be saved (save_compiled)
+# and loaded (load_compiled) in a process which never does.
+#
+# The nodes of all the trees are laid out one after another, trees in the
+# order of their boosting iteration and then class.  Node i splits on
+# feature[i], going to left[i] if the sample's value is <= threshold[i]
+# (or is NaN and nan_left[i]) and to right[i] otherwise.  A leaf's left and
+# right are itself, with an infinite threshold, so walking every tree
+# max_depth steps from roots leaves each sample at a leaf of each tree,
+# with no per-node branching.  value[i] is the leaf's contribution, which
+# is multiplied by scale.  GradientBoostingClassifier's trees compare
+# float32 samples (float32 is set), the histogram trees float64 ones.
+#
+# The raw prediction of each class is init plus the scaled leaf values,
+# summed in iteration order as sklearn does, so that the probabilities are
+# the same to the last bit: the softmax of the raw predictions, or for two
+# classes the sigmoid of the raw prediction (of twice it for the
+# exponential loss).
+#
+
+ARRAYS = ['feature', 'threshold', 'nan_left', 'left', 'right', 'value',
+          'roots', 'init', 'classes']
+
+
+class CompiledEnsemble:
+    def __init__(self, feature, threshold, nan_left, left, right, value,
+                 roots, init, classes, scale=1.0, float32=False,
+                 link='logit', max_depth=None):
+        self.feature = np.ascontiguousarray(feature, dtype=np.intp)
+        self.threshold = np.ascontiguousarray(threshold, dtype=np.float64)
+        self.nan_left = np.ascontiguousarray(nan_left, dtype=bool)
+        self.left = np.ascontiguousarray(left, dtype=np.intp)
+        self.right = np.ascontiguousarray(right, dtype=np.intp)
+        self.value = np.ascontiguousarray(value, dtype=np.float64)
+        self.roots = np.ascontiguousarray(roots, dtype=np.intp)
+        self.init = np.ascontiguousarray(init, dtype=np.float64)
+        self.classes = np.asarray(classes)
+        self.scale = float(scale)
+        self.float32 = bool(float32)
+        self.link = link
+        self.max_depth = _max_depth(self.left, self.right, self.roots) \
+            if max_depth is None else int(max_depth)
+        # Node i's children are child[2 * i] (left) and child[2 * i + 1]
+        self.child = np.stack([self.left, self.right], axis=1).ravel()
+        # Thresholds to compare samples with in their own precision: for
+        # float32 samples, the largest float32 <= the threshold
+        self.split = self.threshold
+        if self.float32:
+            split = self.threshold.astype(np.float32)
+            self.split = np.where(split > self.threshold,
+                                  np.nextafter(split, np.float32(-np.inf)), split)
+
+    @property
+    def classes_(self):
+        return self.classes
+
+    @property
+    def n_trees_per_iteration(self):
+        return len(self.init)
+
+    # The leaf each sample reaches in each tree, (n_samples, n_trees)
+    def leaves(self, X):
+        return self._walk(X).T
+
+    # Walks every tree for every sample, giving (n_trees, n_samples) leaves.
+    # The samples' features are laid out by column so that one gather finds
+    # every sample's value of the feature each of its current nodes splits
+    # on.
+    def _walk(self, X):
+        X = np.asarray(X, dtype=np.float32 if self.float32 else np.float64)
+        n = X.shape[0]
+        columns = np.ascontiguousarray(X.T).ravel()
+        missing = np.isnan(columns).any()
+        samples = np.arange(n)[None, :]
+        nodes = np.repeat(self.roots[:, None], n, axis=1)
+        for _ in range(self.max_depth):
+            offsets = np.take(self.feature, nodes)
+            offsets *= n
+            offsets += samples
+            x = np.take(columns, offsets)
+            if missing:
+                go_right = ~((x <= np.take(self.split, nodes)) |
+                             (np.isnan(x) & np.take(self.nan_left, nodes)))
+            else:
+                go_right = x > np.take(self.split, nodes)
+            nodes *= 2
+            nodes += go_right
+            nodes = np.take(self.child, nodes)
+        return nodes
+
+    def raw_predict(self, X):
+        values = np.take(self.value, self._walk(X))
+        values *= self.scale
+        K = self.n_trees_per_iteration
+        values = values.reshape(-1, K, values.shape[1])
+        # Added one iteration at a time, in the order sklearn adds them
+        raw = np.repeat(self.init[:, None], values.shape[2], axis=1)
+        for iteration in values:
+            raw += iteration
+        return raw.T
+
+    def predict_proba(self, X):
+        raw = self.raw_predict(X)
+        if raw.shape[1] == 1:
+            raw = raw[:, 0] * (2 if self.link == 'half_logit' else 1)
+            proba = np.empty((raw.shape[0], 2))
+            proba[:, 1] = _expit(raw)
+            proba[:, 0] = 1 - proba[:, 1]
+            return proba
+        raw = raw - raw.max(axis=1)[:, None]
+        np.exp(raw, out=raw)
+        raw /= raw.sum(axis=1)[:, None]
+        return raw
+
+    def predict(self, X):
+        return self.classes[np.argmax(self.predict_proba(X), axis=1)]
+
+
+# The logistic sigmoid.  sklearn uses scipy's, whose exp may differ from
+# NumPy's in the last bit, so that is used when scipy is installed.
+def _expit(x):
+    try:
+        from scipy.special import expit
+    except ImportError:
+        return 1.0 / (1.0 + np.exp(-x))
+    return expit(x)
+
+
+def _max_depth(left, right, roots):
+    depth = 0
+    nodes = np.unique(roots)
+    while True:
+        children = np.unique(np.concatenate([left[nodes], right[nodes]]))
+        if np.array_equal(children, nodes):
+            return depth
+        nodes = children
+        depth += 1
+
+#
+# Exporting fitted sklearn classifiers
+#
+
+
+def export_ensemble(model):
+    if hasattr(model, 'estimators_'):
+        return _export_gbc(model)
+    if hasattr(model, '_predictors'):
+        return _export_hist_gbc(model)
+    raise ValueError('Cannot compile a {}'.format(type(model).__name__))
+
+
+class _Nodes:
+    def __init__(self):
+        self.arrays = {name: [] for name in ARRAYS[:6]}
+        self.roots = []
+        self.count = 0
+
+    # Appends a tree's nodes; leaves are those whose is_leaf is set
+    def add(self, feature, threshold, nan_left, left, right, value, is_leaf):
+        n = len(feature)
+        index = np.arange(n)
+        self.arrays['feature'].append(np.where(is_leaf, 0, feature))
+        self.arrays['threshold'].append(np.where(is_leaf, np.inf, threshold))
+        self.arrays['nan_left'].append(np.where(is_leaf, False, nan_left))
+        self.arrays['left'].append(np.where(is_leaf, index, left) + self.count)
+        self.arrays['right'].append(np.where(is_leaf, index, right) + self.count)
+        self.arrays['value'].append(np.where(is_leaf, value, 0.0))
+        self.roots.append(self.count)
+        self.count += n
+
+    def ensemble(self, init, classes, **options):
+        arrays = {name: np.concatenate(a) for name, a in self.arrays.items()}
+        return CompiledEnsemble(roots=self.roots, init=init, classes=classes,
+                                **arrays, **options)
+
+
+def _export_gbc(model):
+    if model.init_ == 'zero':
+        init = np.zeros(model.n_trees_per_iteration_)
+    elif hasattr(model.init_, 'class_prior_'):
+        # The prior (DummyClassifier) init gives every sample the same raw
+        # prediction
+        init = model._raw_predict_init(
+            np.zeros((1, model.n_features_in_)))[0]
+    else:
+        raise ValueError('Cannot compile an init estimator {}'.format(
+            type(model.init_).__name__))
+
+    nodes = _Nodes()
+    for stage in model.estimators_:
+        for tree in stage:
+            t = tree.tree_
+            is_leaf = t.children_left == -1
+            # These trees never see missing values
+            nodes.add(t.feature, t.threshold, np.zeros(t.node_count, dtype=bool),
+                      t.children_left, t.children_right, t.value[:, 0, 0],
+                      is_leaf)
+    return nodes.ensemble(
+        init, model.classes_, scale=model.learning_rate, float32=True,
+        link='half_logit' if model.loss == 'exponential' else 'logit')
+
+
+def _export_hist_gbc(model):
+    nodes = _Nodes()
+    for iteration in model._predictors:
+        for predictor in iteration:
+            n = predictor.nodes
+            if 'is_categorical' in n.dtype.names and n['is_categorical'].any():
+                raise ValueError('Cannot compile categorical splits')
+            nodes.add(n['feature_idx'], n['num_threshold'],
+                      n['missing_go_to_left'].astype(bool), n['left'], n['right'],
+                      n['value'], n['is_leaf'].astype(bool))
+    return nodes.ensemble(
+        np.asarray(model._baseline_prediction, dtype=np.float64).reshape(-1),
+        model.classes_)
+
+
+def save_compiled(compiled, path):
+    np.savez(path, scale=compiled.scale, float32=compiled.float32,
+             link=compiled.link, max_depth=compiled.max_depth,
+             **{name: getattr(compiled, name) for name in ARRAYS})
+
+
+def load_compiled(path):
+    with np.load(path) as f:
+        arrays = {name: f[name] for name in ARRAYS}
+        return CompiledEnsemble(
+            scale=f['scale'][()], float32=f['float32'][()],
+            link=str(f['link'][()]), max_depth=f['max_depth'][()], **arrays)
@@ -0,0 +1,265 @@
+from array import array
+import numpy as np
+from syllable import VOWELS, STOPS, LIQUIDS, shape_of
+
+#
+# SyllableCorpus: a columnar (struct-of-arrays) store of syllable features
+#
+# Rather than keeping a Syllable object per syllable, each feature is
+# held in its own typed column, one entry per syllable in corpus order.
+# Line and word boundaries are kept as offsets into the columns:
+# syllables of line i are [line_offsets[i], line_offsets[i + 1]), and
+# likewise for words.  Syllable strings are stored once each, in a table of
+# distinct strings, and referenced from the chars_id column.
+#
+# Columns grow in compact array.array buffers while the corpus is built;
+# column() returns a NumPy copy of one, so that the corpus can go on
+# growing (an array.array exporting its buffer cannot be resized).
+#
+# A corpus can be filled from SyllabifiedLines (add_line), or straight
+# from words (add_words followed by weigh()), in which case no Syllable
+# objects are created at all and the line-level weight rules are applied
+# to all of the new lines at once by line_weights().
+#
+
+COLUMNS = {
+    'chars_id': 'i',
+    'nucleus_weight': 'd',
+    'coda_weight': 'd',
+    'nucleus_class': 'b',
+    'word_position': 'h',
+    'reverse_word_position': 'h',
+    'line_position': 'h',
+    'reverse_line_position': 'h',
+    # Word boundary marks and the values the weight rules across syllable
+    # boundaries depend on: the onset weight and the first two and last two
+    # characters (as character codes, 0 where the syllable is too short)
+    'initial': 'b',
+    'final': 'b',
+    'onset_weight': 'd',
+    'first_char': 'B',
+    'second_char': 'B',
+    'penultimate_char': 'B',
+    'last_char': 'B'
+}
+
+# Same order as the feature_names of dataset.load_latin_scansion_dataset
+FEATURE_NAMES = [
+    'nucleus_weight',
+    'coda_weight',
+    'nucleus_class',
+    'word_position',
+    'reverse_word_position',
+    'line_position',
+    'reverse_line_position'
+]
+
+
+class SyllableCorpus:
+    def __init__(self):
+        self.columns = {name: array(code) for name, code in COLUMNS.items()}
+        self.line_offsets = array('q', [0])
+        self.word_offsets = array('q', [0])
+        self.strings = []
+        self.string_ids = {}
+        # Index of the first line added by add_words and not yet weighed
+        self.unweighed_line = None
+
+    def _string_id(self, chars):
+        sid = self.string_ids.get(chars)
+        if sid is None:
+            sid = len(self.strings)
+            self.strings.append(chars)
+            self.string_ids[chars] = sid
+        return sid
+
+    def _append(self, chars, nucleus, coda, onset, nucleus_class, initial,
+                final, wp, rwp, lp, rlp):
+        cols = self.columns
+        if initial and len(cols['chars_id']) > self.word_offsets[-1]:
+            self.word_offsets.append(len(cols['chars_id']))
+        cols['chars_id'].append(self._string_id(chars))
+        cols['nucleus_weight'].append(nucleus)
+        cols['coda_weight'].append(coda)
+        cols['nucleus_class'].append(nucleus_class)
+        cols['word_position'].append(wp)
+        cols['reverse_word_position'].append(rwp)
+        cols['line_position'].append(lp)
+        cols['reverse_line_position'].append(rlp)
+        cols['initial'].append(initial)
+        cols['final'].append(final)
+        cols['onset_weight'].append(onset)
+        cols['first_char'].append(_char_code(chars, 0))
+        cols['second_char'].append(_char_code(chars, 1))
+        cols['penultimate_char'].append(_char_code(chars, -2))
+        cols['last_char'].append(_char_code(chars, -1))
+
+    def _end_line(self):
+        count = len(self.columns['chars_id'])
+        if count > self.word_offsets[-1]:
+            self.word_offsets.append(count)
+        self.line_offsets.append(count)
+
+    # Appends the syllables of a SyllabifiedLine, whose weights already
+    # reflect the rest of the line.  Words are delimited by the syllables'
+    # word-initial marks.
+    def add_line(self, line):
+        for syl in line.syllables:
+            wp, rwp, lp, rlp = syl.positions()
+            self._append(syl.chars, syl.nucleus_weight(), syl.coda_weight(),
+                         syl.onset_weight(), syl.nucleus_class(),
+                         syl.is_initial(), syl.is_final(), wp, rwp, lp, rlp)
+        self._end_line()
+
+    # Appends a line given as a list of syllable.Words, with each syllable
+    # weighed as if it stood alone.  weigh() must be called once all lines
+    # have been added to apply the weight rules across syllable boundaries.
+    def add_words(self, words):
+        frozen = []
+        for word in words:
+            try:
+                frozen.extend(word.frozen_syllables())
+            except IndexError:
+                print('Unable to syllabify \"{}\", skipping'.format(word.chars))
+        if self.unweighed_line is None:
+            self.unweighed_line = self.line_count()
+        max_pos = len(frozen) - 1
+        for pos, (chars, onset, nucleus, coda, wp, rwp, initial, final) in enumerate(frozen):
+            self._append(chars, nucleus, coda, onset,
+                         shape_of(chars).vowel_class, initial, final,
+                         wp, rwp, pos, max_pos - pos)
+        self._end_line()
+
+    # Applies line_weights() to every line added by add_words since the
+    # last call.
+    def weigh(self):
+        if self.unweighed_line is None:
+            return
+        start = self.line_offsets[self.unweighed_line]
+        self.unweighed_line = None
+        if start == self.syllable_count():
+            return
+        cols = {name: self.column(name)[start:] for name in self.columns}
+        nucleus, coda = line_weights(
+            cols['onset_weight'], cols['nucleus_weight'], cols['coda_weight'],
+            cols['final'], cols['reverse_line_position'], cols['first_char'],
+            cols['second_char'], cols['penultimate_char'], cols['last_char'])
+        self.columns['nucleus_weight'][start:] = array('d', nucleus.tobytes())
+        self.columns['coda_weight'][start:] = array('d', coda.tobytes())
+
+    def add_lines(self, lines):
+        for line in lines:
+            self.add_line(line)
+
+    def syllable_count(self):
+        return len(self.columns['chars_id'])
+
+    def line_count(self):
+        return len(self.line_offsets) - 1
+
+    def word_count(self):
+        return len(self.word_offsets) - 1
+
+    # Returns a copy of a column as a NumPy array, unaffected by lines added
+    # later
+    def column(self, name):
+        return _copy(self.columns[name])
+
+    def line_offset_array(self):
+        return _copy(self.line_offsets)
+
+    def word_offset_array(self):
+        return _copy(self.word_offsets)
+
+    # Returns the line index of every syllable
+    def line_numbers(self):
+        return np.repeat(np.arange(self.line_count()),
+                         np.diff(self.line_offset_array()))
+
+    # Returns the syllable strings of the given line
+    def line_chars(self, lineno):
+        start, end = self.line_offsets[lineno], self.line_offsets[lineno + 1]
+        return [self.strings[sid] for sid in self.columns['chars_id'][start:end]]
+
+    # Returns the feature matrix (syllables x FEATURE_NAMES), as used to
+    # train and apply the syllable quantity models
+    def features(self):
+        return np.column_stack([self.column(name) for name in FEATURE_NAMES])
+
+
+# A NumPy copy of an array.array.  No view of the array's buffer is kept,
+# as the array could not be appended to while one exists.
+def _copy(buf):
+    return np.frombuffer(buf, dtype=buf.typecode).copy() if len(buf) else \
+        np.zeros(0, dtype=buf.typecode)
+
+
+# Character code at pos (which may be negative), or 0 if the syllable is
+# too short or the character is outside the 8-bit range the rules use.
+def _char_code(chars, pos):
+    if len(chars) < (pos + 1 if pos >= 0 else -pos):
+        return 0
+    code = ord(chars[pos])
+    return code if code < 256 else 0
+
+
+def _char_table(chars):
+    table = np.zeros(256, dtype=bool)
+    table[[ord(c) for c in chars]] = True
+    return table
+
+
+_IS_VOWEL = _char_table(VOWELS)
+_IS_STOP = _char_table(STOPS)
+_IS_LIQUID = _char_table(LIQUIDS)
+
+#
+# line_weights: apply the weight rules across syllable boundaries
+#   (syllable.SyllabifiedLine) to whole columns of syllables at once
+#
+# All arguments are arrays with one entry per syllable, in line order:
+# the onset, nucleus and coda weights of each syllable on its own, the
+# word-final marks, the reverse line positions (0 for the last syllable of
+# each line) and the character codes of the first, second, penultimate and
+# last characters.
+#
+# returns a tuple (nucleus, coda) of the final weight arrays
+#
+
+def line_weights(onset, nucleus, coda, final, reverse_line_position,
+                 first, second, penultimate, last):
+    # Every syllable but the last in its line is affected by the next one
+    has_next = reverse_line_position > 0
+    next_onset = np.append(onset[1:], 0)
+    next_first = np.append(first[1:], 0)
+    next_second = np.append(second[1:], 0)
+
+    # Elision: a word-final vowel (or vowel + m) before a word beginning
+    # with a vowel (or h + vowel) loses its weight entirely
+    elided = has_next & (final != 0) \
+        & (_IS_VOWEL[next_first]
+           | ((next_first == ord('h')) & _IS_VOWEL[next_second])) \
+        & (_IS_VOWEL[last]
+           | ((last == ord('m')) & _IS_VOWEL[penultimate]))
+    # Stop-liquid sequence across the syllable boundary adds half a weight,
+    # otherwise the next syllable's onset weight carries over to our coda
+    stop_liquid = has_next & ~elided & _IS_STOP[last] & _IS_LIQUID[next_first]
+    carried = np.where(stop_liquid, .5, np.where(has_next, next_onset, 0))
+
+    return (np.where(elided, 0, nucleus).astype(np.float64),
+            np.where(elided, 0, coda + carried).astype(np.float64))
+
+#
+# corpus_from_text: syllabify a text file (as read by syllable.Words)
+#   straight into a SyllableCorpus, without creating Syllable objects
+#
+
+def corpus_from_text(path, corpus=None):
+    from syllable import word_lines
+
+    corpus = corpus if corpus is not None else SyllableCorpus()
+    with open(path) as f:
+        for line in word_lines(f):
+            corpus.add_words(line)
+    corpus.weigh()
+    return corpus
@@ -1,46 +1,378 @@
-from ibm_boto3.session import Session
-from ibm_botocore.client import Config
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timezone
 from pathlib import PurePath
 
+#
+# CloudObjectStorage: access to IBM Cloud Object Storage buckets
+#
+# A single S3 resource is built the first time it's needed and shared by
+# every call, so its HTTP connection pool (of up to max_pool_connections
+# connections, reused across requests) and IAM token are only set up once
+# per client.  Tests and local runs may pass their own resource (anything
+# with the ibm_boto3 resource's Bucket() interface) instead of credentials;
+# ibm_boto3 itself is only imported when a resource has to be built.
+#
+# Objects are named after the base name of the local file they are
+# transferred from or to, except by the bulk transfers (upload_many,
+# download_many and sync), which move many objects concurrently through the
+# resource's thread-safe low-level client, retrying failed transfers.
+# Files larger than multipart_threshold bytes are transferred in parts of
+# multipart_chunksize bytes.
+#
 
 class CloudObjectStorage():
     def __init__(self, api_key=None, instance_id=None, iam_endpoint=None,
-                 cos_endpoint=None):
+                 cos_endpoint=None, max_pool_connections=10, resource=None,
+                 multipart_threshold=8 * 1024 * 1024,
+                 multipart_chunksize=8 * 1024 * 1024):
+        self.api_key = api_key
+        self.instance_id = instance_id
+        self.iam_endpoint = iam_endpoint
         self.cos_endpoint = cos_endpoint
-        self.session = Session(
-            ibm_api_key_id=api_key,
-            ibm_service_instance_id=instance_id,
-            ibm_auth_endpoint=iam_endpoint)
+        self.max_pool_connections = max_pool_connections
+        self.multipart_threshold = multipart_threshold
+        self.multipart_chunksize = multipart_chunksize
+        self._resource = resource
+        self._buckets = {}
+        self._transfer_config = None
+
+    @property
+    def resource(self):
+        if self._resource is None:
+            from ibm_boto3.session import Session
+            from ibm_botocore.client import Config
+
+            session = Session(
+                ibm_api_key_id=self.api_key,
+                ibm_service_instance_id=self.instance_id,
+                ibm_auth_endpoint=self.iam_endpoint)
+            self._resource = session.resource(
+                service_name='s3',
+                endpoint_url=self.cos_endpoint,
+                config=Config(signature_version='oauth',
+                              max_pool_connections=self.max_pool_connections)
+            )
+        return self._resource
+
+    @property
+    def client(self):
+        return self.resource.meta.client
+
+    # Transfer settings for the bulk transfers; None when ibm_boto3 is not
+    # installed (i.e. with an injected resource), which then gets no Config
+    def transfer_config(self):
+        if self._transfer_config is None:
+            try:
+                from ibm_boto3.s3.transfer import TransferConfig
+            except ImportError:
+                return None
+            # Each transfer runs on one of our own worker threads
+            self._transfer_config = TransferConfig(
+                multipart_threshold=self.multipart_threshold,
+                multipart_chunksize=self.multipart_chunksize,
+                use_threads=False)
+        return self._transfer_config
+
+    def bucket(self, bucket_name):
+        bucket = self._buckets.get(bucket_name)
+        if bucket is None:
+            bucket = self.resource.Bucket(bucket_name)
+            self._buckets[bucket_name] = bucket
+        return bucket
 
     def get_text(self, bucket_name=None, file=None):
-        cos = self.session.resource(
-            service_name='s3',
-            endpoint_url=self.cos_endpoint,
-            config=Config(signature_version='oauth')
-        )
-        response = cos.Bucket(bucket_name).download_file(
+        response = self.bucket(bucket_name).download_file(
             Key=PurePath(file).name,
             Filename=file
         )
-        # bucket = cos.bucket(bucket_name)
-        # bucket.load()
         return response
 
     def put_text(self, bucket_name=None, file=None):
-        cos = self.session.resource(
-            service_name='s3',
-            endpoint_url=self.cos_endpoint,
-            config=Config(signature_version='oauth')
-        )
-        cos.Bucket(bucket_name).upload_file(file, PurePath(file).name)
+        self.bucket(bucket_name).upload_file(file, PurePath(file).name)
 
-    def watch_bucket(self, bucket_name=None):
-        cos = self.session.resource(
-            service_name='s3',
-            endpoint_url=self.cos_endpoint,
-            config=Config(signature_version='oauth')
-        )
+    # Yields a dict (Key, Size, ETag, LastModified) for every object in the
+    # bucket whose key starts with prefix, a page of page_size at a time
+    def list_objects(self, bucket_name=None, prefix='', page_size=1000):
+        kwargs = {'Bucket': bucket_name, 'Prefix': prefix, 'MaxKeys': page_size}
+        while True:
+            page = self.client.list_objects_v2(**kwargs)
+            for obj in page.get('Contents', []):
+                yield obj
+            if not page.get('IsTruncated'):
+                return
+            kwargs['ContinuationToken'] = page['NextContinuationToken']
+
+    # Uploads files (local paths) concurrently, under keys (by default their
+    # base names); returns a TransferReport
+    def upload_many(self, bucket_name=None, files=(), keys=None, **options):
+        keys = keys if keys is not None else [PurePath(f).name for f in files]
+        config = self.transfer_config()
+
+        def upload(job):
+            f, key = job
+            extra = {'Config': config} if config is not None else {}
+            self.client.upload_file(Filename=f, Bucket=bucket_name, Key=key, **extra)
+            return os.path.getsize(f)
+
+        return transfer_all(upload, list(zip(files, keys)), **options)
+
+    # Downloads the objects named by keys concurrently into directory (keys
+    # containing '/' into subdirectories); returns a TransferReport.  If
+    # last_modified maps keys to the objects' LastModified, the files'
+    # modification times are set to them.
+    def download_many(self, bucket_name=None, keys=(), directory='.',
+                      last_modified=None, **options):
+        config = self.transfer_config()
+
+        def download(key):
+            path = os.path.join(directory, *key.split('/'))
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+            extra = {'Config': config} if config is not None else {}
+            self.client.download_file(Bucket=bucket_name, Key=key, Filename=path, **extra)
+            if last_modified and key in last_modified:
+                mtime = _timestamp(last_modified[key])
+                os.utime(path, (mtime, mtime))
+            return os.path.getsize(path)
+
+        return transfer_all(download, list(keys), **options)
+
+    # Makes the bucket (direction 'up') or directory ('down') match the
+    # other, transferring only the files which are missing, differ in size
+    # or are older than their counterpart.  Keys are paths relative to
+    # directory, with '/' separators.  Downloaded files take the objects'
+    # modification times, so they are not uploaded again by the next sync
+    # up.  Returns a TransferReport.
+    def sync(self, bucket_name=None, directory='.', direction='up', prefix='',
+             **options):
+        local = _local_files(directory)
+        remote = {o['Key']: o for o in self.list_objects(bucket_name, prefix)}
+        if direction == 'up':
+            keys = [k for k, (size, mtime) in sorted(local.items())
+                    if k.startswith(prefix) and (
+                        k not in remote or remote[k]['Size'] != size
+                        or _timestamp(remote[k]['LastModified']) < mtime)]
+            files = [os.path.join(directory, *k.split('/')) for k in keys]
+            return self.upload_many(bucket_name, files, keys, **options)
+        if direction == 'down':
+            keys = [k for k, obj in sorted(remote.items())
+                    if k not in local or local[k][0] != obj['Size']
+                    or local[k][1] < _timestamp(obj['LastModified'])]
+            return self.download_many(
+                bucket_name, keys, directory,
+                {k: remote[k]['LastModified'] for k in keys}, **options)
+        raise ValueError('Unknown sync direction {}'.format(direction))
+
+    def watcher(self, bucket_name=None, state_file=None, suffix='.text',
+                prefix='', page_size=1000):
+        return BucketWatcher(self, bucket_name, state_file, suffix, prefix,
+                             page_size)
+
+    # Prints the objects which are new or have changed since the last call
+    # with the same state file
+    def watch_bucket(self, bucket_name=None, state_file=None, suffix='.text'):
+        for obj in self.watcher(bucket_name, state_file, suffix).changes():
+            print(obj['Key'])
+
+
+#
+# BucketWatcher: find the objects of a bucket which are new or have changed
+#   since they were last seen
+#
+# The ETag and LastModified of every object seen are remembered in a JSON
+# state file, so that each run of changes() only yields objects (the dicts
+# of list_objects) whose key ends with suffix and which were not seen, or
+# have a different ETag or LastModified, in earlier runs.  An object is
+# recorded as seen once the consumer asks for the next one, so an
+# interrupted run yields the objects it had not finished again next time.
+# The consumer may also retry() an object it failed to process, which
+# leaves it unrecorded without stopping the run.  Keys no longer in the
+# bucket are forgotten at the end of a complete run.
+#
+
+class BucketWatcher:
+    def __init__(self, storage, bucket_name, state_file, suffix='.text',
+                 prefix='', page_size=1000, save_every=100):
+        self.storage = storage
+        self.bucket_name = bucket_name
+        self.state_file = state_file
+        self.suffix = suffix
+        self.prefix = prefix
+        self.page_size = page_size
+        self.save_every = save_every
+        self.state = self._load()
+        self.retrying = set()
+
+    def _load(self):
+        if not self.state_file:
+            return {}
+        try:
+            with open(self.state_file) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def save(self):
+        if not self.state_file:
+            return
+        tmp = self.state_file + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(self.state, f, indent=2, sort_keys=True)
+        os.replace(tmp, self.state_file)
+
+    def changes(self):
+        seen = set()
+        unsaved = 0
+        try:
+            for obj in self.storage.list_objects(self.bucket_name, self.prefix,
+                                                 self.page_size):
+                key = obj['Key']
+                seen.add(key)
+                if not key.endswith(self.suffix):
+                    continue
+                entry = {'etag': obj['ETag'],
+                         'last_modified': str(obj['LastModified'])}
+                if self.state.get(key) == entry:
+                    continue
+                yield obj
+                if key in self.retrying:
+                    self.retrying.discard(key)
+                    continue
+                self.state[key] = entry
+                unsaved += 1
+                if unsaved == self.save_every:
+                    self.save()
+                    unsaved = 0
+            for key in [k for k in self.state
+                        if k.startswith(self.prefix) and k not in seen]:
+                del self.state[key]
+        finally:
+            self.save()
+
+    # Leaves the object with the given key (the one last yielded by
+    # changes()) to be yielded again by the next run
+    def retry(self, key):
+        self.retrying.add(key)
+
+    # Yields changes every interval seconds, forever or for the given
+    # number of rounds
+    def poll(self, interval=60, rounds=None):
+        done = 0
+        while rounds is None or done < rounds:
+            if done:
+                time.sleep(interval)
+            yield from self.changes()
+            done += 1
+
+
+# Returns {key: (size, mtime)} for every file under directory
+def _local_files(directory):
+    files = {}
+    for root, _, names in os.walk(directory):
+        for name in names:
+            path = os.path.join(root, name)
+            key = os.path.relpath(path, directory).replace(os.sep, '/')
+            st = os.stat(path)
+            files[key] = (st.st_size, st.st_mtime)
+    return files
+
+
+def _timestamp(last_modified):
+    if last_modified.tzinfo is None:
+        last_modified = last_modified.replace(tzinfo=timezone.utc)
+    return last_modified.timestamp()
+
+#
+# TransferReport: the outcome of a bulk transfer
+#
+
+class TransferReport:
+    def __init__(self, total):
+        self.total = total
+        self.done = 0
+        self.bytes = 0
+        self.retries = 0
+        self.failures = []
+        self.seconds = 0.0
+
+    def throughput(self):
+        return self.bytes / self.seconds if self.seconds else 0.0
+
+    def __str__(self):
+        return '{} of {} files, {} bytes in {:.2f}s ({:.2f} MiB/s), {} retries, {} failed'.format(
+            self.done, self.total, self.bytes, self.seconds,
+            self.throughput() / (1024 * 1024), self.retries, len(self.failures))
+
+# Error codes of requests which may succeed if made again
+TRANSIENT_CODES = {'RequestTimeout', 'SlowDown', 'Throttling', 'ThrottlingException',
+                   'InternalError', 'ServiceUnavailable'}
+
+
+# Whether a transfer's error is worth retrying: a dropped or timed out
+# connection, or the service being busy or failing (a 5xx response)
+def is_transient(e):
+    if isinstance(e, (ConnectionError, TimeoutError)):
+        return True
+    try:
+        from ibm_botocore import exceptions
+    except ImportError:
+        return False
+    if isinstance(e, (exceptions.ConnectionError, exceptions.HTTPClientError)):
+        return True
+    if isinstance(e, exceptions.ClientError):
+        status = e.response.get('ResponseMetadata', {}).get('HTTPStatusCode', 0)
+        return e.response.get('Error', {}).get('Code') in TRANSIENT_CODES or status >= 500
+    return False
+
+#
+# transfer_all: apply transfer (which returns the number of bytes moved) to
+#   every job on a pool of workers threads
+#
+# At most max_in_flight jobs (by default twice the workers) are submitted
+# at once.  A job raising a transient error (see is_transient) is retried
+# up to retries times, sleeping backoff, 2 * backoff, 4 * backoff...
+# seconds in between; jobs which still fail, or fail with any other
+# exception (such as a missing local file), are recorded in the report's
+# failures as (job, exception).  progress, if given, is called with the
+# report after each job completes.
+#
+
+def transfer_all(transfer, jobs, workers=8, max_in_flight=None, retries=3,
+                 backoff=0.5, progress=None):
+    report = TransferReport(len(jobs))
+    lock = threading.Lock()
+    slots = threading.BoundedSemaphore(max_in_flight or 2 * workers)
+
+    def run(job):
+        try:
+            for attempt in range(retries + 1):
+                try:
+                    size = transfer(job)
+                    break
+                except Exception as e:
+                    if attempt == retries or not is_transient(e):
+                        with lock:
+                            report.failures.append((job, e))
+                        return
+                    with lock:
+                        report.retries += 1
+                    time.sleep(backoff * 2 ** attempt)
+            with lock:
+                report.done += 1
+                report.bytes += size
+                report.seconds = time.perf_counter() - start
+                if progress:
+                    progress(report)
+        finally:
+            slots.release()
 
-        obj_iter = cos.Bucket(bucket_name).objects.all()
-        for obj in obj_iter:
-            print(obj)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for job in jobs:
+            slots.acquire()
+            pool.submit(run, job)
+    report.seconds = time.perf_counter() - start
+    return report
@@ -0,0 +1,170 @@
+import csv
+import time
+import numpy as np
+from dataset import make_classifier
+from sweep import DEFAULTS, map_shared, mapped_array
+
+#
+# Grouped cross-validation of the run_gbc classifiers
+#
+# Rows are assigned to folds by group, so that no group has rows on both
+# sides of a split: by line (the line number in the first raw column - for
+# syllable data, the syllables of a line; for meter data, a poem) or by
+# poem (runs of rows whose line numbers do not go back, as when the data
+# of several poems is concatenated).  Folds are evaluated in parallel, on
+# the worker processes of sweep.map_shared.
+#
+# The features are binned once, up front, into at most max_bins values
+# each (bin_features), and every fold's model is fit and scored on the
+# bins, which the workers share as one uint8 array.  Features with no more
+# than max_bins distinct values - as all the syllable and meter features
+# are - are binned without loss, so the models make the same splits as on
+# the features themselves.
+#
+# Each fold gives a result row (see RESULT_FIELDS) with its scores and fit
+# and predict times.
+#
+
+RESULT_FIELDS = ['backend', 'fold', 'train_rows', 'test_rows', 'test_groups',
+                 'train_score', 'test_score', 'fit_seconds', 'predict_seconds']
+
+
+def line_groups(raw):
+    return np.asarray(raw)[:, 0].astype(np.int64)
+
+
+def poem_groups(raw):
+    lines = line_groups(raw)
+    return np.concatenate([[0], np.cumsum(np.diff(lines) < 0)])
+
+
+GROUPINGS = {
+    'line': line_groups,
+    'poem': poem_groups
+}
+
+
+# Returns the groups of raw's rows under the named grouping, checking that
+# there are enough of them for n_splits folds.  (Meter data is a line per
+# poem, numbered from the first, so it has a single group by poem; group it
+# by line instead.)
+def groups_of(raw, group_by, n_splits):
+    groups = GROUPINGS[group_by](raw)
+    count = len(np.unique(groups))
+    if count < n_splits:
+        raise ValueError('Cannot split rows grouped by {} into {} folds: there {} only {} {}{}'.format(
+            group_by, n_splits, 'is' if count == 1 else 'are', count, group_by,
+            '' if count == 1 else 's'))
+    return groups
+
+
+# Returns the uint8 bin of each value of X, and the edges between the bins
+# of each feature.  Features with more than max_bins distinct values are
+# binned by quantile; missing values are put in a bin of their own, above
+# the others.
+def bin_features(X, max_bins=255):
+    if not 1 < max_bins < 256:
+        raise ValueError('max_bins must be between 2 and 255')
+    X = np.asarray(X, dtype=np.float64)
+    binned = np.empty(X.shape, dtype=np.uint8)
+    edges = []
+    for j in range(X.shape[1]):
+        column = X[:, j]
+        values = np.unique(column[~np.isnan(column)])
+        if len(values) > max_bins:
+            values = np.unique(np.quantile(values, np.linspace(0, 1, max_bins)))
+        e = (values[:-1] + values[1:]) / 2
+        binned[:, j] = np.searchsorted(e, column, side='right')
+        binned[np.isnan(column), j] = len(e) + 1
+        edges.append(e)
+    return binned, edges
+
+
+# Assigns each row a fold, 0 to n_splits - 1, keeping groups together and
+# balancing the folds' numbers of rows
+def fold_assignments(groups, n_splits=5):
+    keys, group_index, sizes = np.unique(groups, return_inverse=True,
+                                         return_counts=True)
+    if len(keys) < n_splits:
+        raise ValueError('Cannot split {} groups into {} folds'.format(
+            len(keys), n_splits))
+    # The largest groups first, each to the fold with the fewest rows
+    fold_of_group = np.empty(len(keys), dtype=np.int8)
+    fold_rows = np.zeros(n_splits, dtype=np.int64)
+    for g in np.argsort(-sizes, kind='stable'):
+        fold = np.argmin(fold_rows)
+        fold_of_group[g] = fold
+        fold_rows[fold] += sizes[g]
+    return fold_of_group[group_index]
+
+
+def evaluate_fold(job):
+    shared, (backend, fold, config, model_random_state) = job
+    X, y = mapped_array(shared['binned']), mapped_array(shared['target'])
+    folds, groups = mapped_array(shared['folds']), mapped_array(shared['groups'])
+    test = folds == fold
+    X_train, y_train, X_test, y_test = X[~test], y[~test], X[test], y[test]
+
+    options = dict(DEFAULTS)
+    options.update(config)
+    clf = make_classifier(backend, n_features=X.shape[1],
+                          random_state=model_random_state, **options)
+    start = time.perf_counter()
+    clf.fit(X_train, y_train)
+    fit = time.perf_counter() - start
+    start = time.perf_counter()
+    test_score = clf.score(X_test, y_test)
+    predict = time.perf_counter() - start
+
+    return {
+        'backend': backend,
+        'fold': fold,
+        'train_rows': len(y_train),
+        'test_rows': len(y_test),
+        'test_groups': len(np.unique(groups[test])),
+        'train_score': clf.score(X_train, y_train),
+        'test_score': test_score,
+        'fit_seconds': fit,
+        'predict_seconds': predict
+    }
+
+#
+# cross_validate: evaluate the backend (with the make_classifier parameters
+#   in config) on each of n_splits grouped folds of dataset, yielding a
+#   result row per fold
+#
+# binned may be given the dataset's bin_features, to reuse them across
+# calls (e.g. to compare backends on the same folds).  jobs is the number
+# of worker processes (all cores if 0).
+#
+
+def cross_validate(dataset, n_splits=5, group_by='line', backend='gbc',
+                   config=None, jobs=0, model_random_state=0, binned=None):
+    groups = groups_of(dataset.raw, group_by, n_splits)
+    if binned is None:
+        binned, _ = bin_features(dataset.data)
+    return map_shared(
+        evaluate_fold,
+        {'binned': binned, 'target': dataset.target, 'groups': groups,
+         'folds': fold_assignments(groups, n_splits)},
+        [(backend, fold, config or {}, model_random_state)
+         for fold in range(n_splits)], jobs)
+
+
+# The mean and standard deviation of the folds' test scores, and the total
+# fit time
+def summarize(rows):
+    scores = np.array([r['test_score'] for r in rows])
+    return {
+        'folds': len(rows),
+        'mean_test_score': scores.mean(),
+        'std_test_score': scores.std(),
+        'fit_seconds': sum(r['fit_seconds'] for r in rows)
+    }
+
+
+def write_results(rows, f):
+    writer = csv.DictWriter(f, fieldnames=RESULT_FIELDS)
+    writer.writeheader()
+    for row in rows:
+        writer.writerow(row)
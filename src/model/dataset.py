@@ -1,10 +1,27 @@
-from sklearn.utils import Bunch
 import numpy as np
-from sklearn.ensemble import GradientBoostingClassifier
-from sklearn.model_selection import train_test_split
+from featurestore import cached_arrays
+from scanrows import is_rows_file, open_rows
 
+# sklearn is only imported to train models, so that data can be loaded and
+# scored with a compiled model (see compiled) without it.  Datasets are
+# Bunches, dicts whose keys are also attributes (as sklearn.utils.Bunch).
 
-def load_latin_scansion_dataset(data_file_name, target_file_name):
+
+class Bunch(dict):
+    def __getattr__(self, key):
+        try:
+            return self[key]
+        except KeyError:
+            raise AttributeError(key)
+
+    def __setattr__(self, key, value):
+        self[key] = value
+
+    def __dir__(self):
+        return list(self.keys())
+
+
+def load_latin_scansion_dataset(data_file_name, target_file_name=None, cache=True):
     dataset = Bunch(
         name='Latin Dataset for Syllabic Analysis',
         feature_names=['nucleus_weight',
@@ -16,6 +33,28 @@ def load_latin_scansion_dataset(data_file_name, target_file_name):
                        'reverse_line_position'],
         target_names=['zero', 'short', 'long']
     )
+    if is_rows_file(data_file_name):
+        dataset.update(_rows_data(open_rows(data_file_name)))
+    else:
+        dataset.update(_load(data_file_name, 'scansion', _parse_scansion_data, cache))
+    if target_file_name:
+        dataset.update(_load(target_file_name, 'target', _parse_target, cache))
+
+    return dataset
+
+# A data file may also be a binary rows file (see scanrows), in which case
+# data is the file's memory-mapped features section itself (float32, never
+# copied); only raw, the line numbers and syllable strings, is built.
+
+
+def _rows_data(rows):
+    return {
+        'data': rows.features,
+        'raw': np.column_stack([np.asarray(rows.line), rows.chars_array()])
+    }
+
+
+def _parse_scansion_data(data_file_name):
     data = []
     raw = []
     data_rows_skipped = 0
@@ -43,21 +82,55 @@ def load_latin_scansion_dataset(data_file_name, target_file_name):
                 data_rows_skipped += 1
                 print('Bad line: {}'.format(line))
 
-    dataset['data'] = np.array(data)
-    dataset['raw'] = np.array(raw)
+    return {'data': np.array(data), 'raw': np.array(raw)}
+
 
+def _parse_target(target_file_name):
     target = []
     with open(target_file_name) as f:
         for line in f:
             target.append(int(line.strip()))
-        dataset['target'] = np.array(target)
+    return {'target': np.array(target)}
+
+# Parsed arrays are cached in binary sidecars next to the source files (see
+# featurestore), so that repeated runs over the same dataset skip parsing.
+
+
+def _load(file_name, kind, parser, cache):
+    if cache:
+        return cached_arrays(file_name, kind, parser)
+    return parser(file_name)
+
+# load_latin_scansion_corpus builds the same dataset as
+# load_latin_scansion_dataset directly from the columns of a
+# corpus.SyllableCorpus, without writing or parsing a CSV file.  The
+# target file is optional, for corpora which have not been scanned yet.
+
+
+def load_latin_scansion_corpus(corpus, target_file_name=None):
+    from corpus import FEATURE_NAMES
+
+    dataset = Bunch(
+        name='Latin Dataset for Syllabic Analysis',
+        feature_names=list(FEATURE_NAMES),
+        target_names=['zero', 'short', 'long']
+    )
+    dataset['data'] = corpus.features()
+    dataset['raw'] = np.column_stack([
+        corpus.line_numbers(),
+        np.array(corpus.strings)[corpus.column('chars_id')]])
+
+    if target_file_name:
+        dataset.update(_load(target_file_name, 'target', _parse_target, True))
 
     return dataset
 
-# load_latin_meter_dataset loads a dataset for classifying poems by meter
+# load_latin_meter_dataset loads a dataset for classifying poems by meter.
+# As for load_latin_scansion_dataset, the target file may be left out for
+# data which is only to be scored by a saved model (see artifact).
 
 
-def load_latin_meter_dataset(data_file_name, target_file_name):
+def load_latin_meter_dataset(data_file_name, target_file_name=None, cache=True):
     dataset = Bunch(
         name='Latin Dataset for Metric Classification',
         feature_names=['syllable_count', 'definite_long_count'],
@@ -75,6 +148,14 @@ def load_latin_meter_dataset(data_file_name, target_file_name):
             'Priapean'
         ]
     )
+    dataset.update(_load(data_file_name, 'meter', _parse_meter_data, cache))
+    if target_file_name:
+        dataset.update(_load(target_file_name, 'target', _parse_target, cache))
+
+    return dataset
+
+
+def _parse_meter_data(data_file_name):
     data = []
     raw = []
     data_rows_skipped = 0
@@ -97,19 +178,77 @@ def load_latin_meter_dataset(data_file_name, target_file_name):
                 data_rows_skipped += 1
                 print('Bad line: {}'.format(line))
 
-    dataset['data'] = np.array(data)
-    dataset['raw'] = np.array(raw)
+    return {'data': np.array(data), 'raw': np.array(raw)}
 
-    target = []
-    with open(target_file_name) as f:
-        for line in f:
-            target.append(int(line.strip()))
-        dataset['target'] = np.array(target)
 
-    return dataset
+#
+# Classifier backends for run_gbc
+#
+# 'gbc' is sklearn's exact GradientBoostingClassifier.  'hist' is its
+# HistGradientBoostingClassifier, which bins each feature into at most 255
+# values once, up front, and then grows each tree from histograms of the
+# bins, on all cores.  It holds out validation_fraction of the training
+# data and stops adding trees (n_estimators at most) once the score on it
+# has not improved for n_iter_no_change rounds.  Both take max_features as
+# a number of features.
+#
+
+
+def _gbc(n_features, n_estimators, learning_rate, max_depth, max_features,
+         random_state):
+    from sklearn.ensemble import GradientBoostingClassifier
+
+    return GradientBoostingClassifier(
+        n_estimators=n_estimators,
+        learning_rate=learning_rate,
+        max_depth=max_depth,
+        max_features=max_features,
+        random_state=random_state)
+
 
+def _hist_gbc(n_features, n_estimators, learning_rate, max_depth, max_features,
+              random_state, validation_fraction=0.1, n_iter_no_change=10):
+    from sklearn.ensemble import HistGradientBoostingClassifier
+
+    return HistGradientBoostingClassifier(
+        max_iter=n_estimators,
+        learning_rate=learning_rate,
+        max_depth=max_depth,
+        max_features=max_features / n_features if max_features else 1.0,
+        early_stopping=True,
+        validation_fraction=validation_fraction,
+        n_iter_no_change=n_iter_no_change,
+        random_state=random_state)
+
+
+BACKENDS = {
+    'gbc': _gbc,
+    'hist': _hist_gbc
+}
+
+
+def make_classifier(backend, n_features, n_estimators, learning_rate,
+                    max_depth, max_features, random_state, **options):
+    if backend not in BACKENDS:
+        raise ValueError('Unknown classifier backend {}'.format(backend))
+    return BACKENDS[backend](n_features, n_estimators, learning_rate, max_depth,
+                             max_features, random_state, **options)
+
+
+# The loader of each kind of dataset, by dataset name
+LOADERS = {
+    'Latin Dataset for Syllabic Analysis': load_latin_scansion_dataset,
+    'Latin Dataset for Metric Classification': load_latin_meter_dataset
+}
+
+# run_gbc fits a classifier and scores it on a split of dataset (or on
+# test_dataset).  If model_root is given, the fitted classifier is saved as
+# a new version of the model there (see artifact).
+
+
+def run_gbc(dataset, split_random_state, n_estimators, learning_rate, max_depth, max_features, model_random_state, test_dataset=None, backend='gbc', model_root=None, **backend_options):
+    from sklearn.model_selection import train_test_split
 
-def run_gbc(dataset, split_random_state, n_estimators, learning_rate, max_depth, max_features, model_random_state, test_dataset=None):
     # for now we're still working with a training dataset.
     # TODO: Update to use unseen data
     X_train, X_test, y_train, y_test = train_test_split(
@@ -124,14 +263,25 @@ def run_gbc(dataset, split_random_state, n_estimators, learning_rate, max_depth,
         X_test = np.append(test_dataset.raw, test_dataset.data, 1)
         y_test = test_dataset.target
 
-    gbc = GradientBoostingClassifier(
+    gbc = make_classifier(
+        backend,
+        n_features=dataset.data.shape[1],
         n_estimators=n_estimators,
         learning_rate=learning_rate,
         max_depth=max_depth,
         max_features=max_features,
-        random_state=model_random_state)
+        random_state=model_random_state,
+        **backend_options)
 
     gbc.fit(X_train[:, 2:], y_train)
+    if model_root:
+        from artifact import save_model
+
+        params = dict(backend_options, n_estimators=n_estimators,
+                      learning_rate=learning_rate, max_depth=max_depth,
+                      max_features=max_features, random_state=model_random_state)
+        save_model(gbc, model_root, dataset, X_train[:, 2:], y_train,
+                   backend, params)
     data_with_predictions = np.append(
         X_test,
         np.reshape(gbc.predict(X_test[:, 2:]), (-1, 1)), 1)
@@ -0,0 +1,133 @@
+import contextlib
+import hashlib
+import json
+import os
+import numpy as np
+
+#
+# A binary cache of the arrays parsed from a dataset file.
+#
+# The first time a file is loaded through cached_arrays(), the arrays the
+# parser produces are written to a sidecar directory next to it
+# (<file>.cache/<kind>/), one .npy file per array plus a meta.json
+# recording the source's path, size, modification time and SHA-256 hash.
+# Later loads memory-map the .npy files instead of parsing the source
+# again.
+#
+# A sidecar is used when the source's size and modification time are
+# unchanged, or, failing that, when its content hash still matches (the
+# recorded modification time is then refreshed).  Otherwise the source is
+# parsed again and the sidecar rewritten.  If the sidecar cannot be written
+# (e.g. a read-only directory) the parsed arrays are returned as is.
+#
+
+# Bump whenever the parsers' output changes, to invalidate old sidecars
+FORMAT_VERSION = 1
+
+
+def sidecar_dir(source, kind):
+    return os.path.join(source + '.cache', kind)
+
+
+def file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _source_key(source):
+    st = os.stat(source)
+    return {
+        'format_version': FORMAT_VERSION,
+        'source': os.path.realpath(source),
+        'size': st.st_size,
+        'mtime_ns': st.st_mtime_ns
+    }
+
+
+def _read_meta(directory):
+    try:
+        with open(os.path.join(directory, 'meta.json')) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_meta(directory, meta):
+    tmp = os.path.join(directory, 'meta.json.tmp')
+    with open(tmp, 'w') as f:
+        json.dump(meta, f, indent=2)
+    os.replace(tmp, os.path.join(directory, 'meta.json'))
+
+
+def _load_sidecar(directory, meta, mmap_mode):
+    arrays = {}
+    for name in meta['arrays']:
+        arrays[name] = np.load(os.path.join(directory, name + '.npy'),
+                               mmap_mode=mmap_mode)
+    return arrays
+
+
+def _write_sidecar(directory, key, arrays):
+    os.makedirs(directory, exist_ok=True)
+    # Remove the old meta first, so that a partially written sidecar is
+    # never mistaken for a valid one
+    try:
+        os.remove(os.path.join(directory, 'meta.json'))
+    except FileNotFoundError:
+        pass
+    # Each array is written to a temporary file and renamed into place, as
+    # other processes may have the old one memory-mapped: rewriting it in
+    # place would change (or truncate) the pages under them
+    for name, arr in arrays.items():
+        tmp = os.path.join(directory, '{}.npy.{}.tmp'.format(name, os.getpid()))
+        try:
+            with open(tmp, 'wb') as f:
+                np.save(f, np.asarray(arr))
+            os.replace(tmp, os.path.join(directory, name + '.npy'))
+        except BaseException:
+            # The file may never have been created, or already be renamed
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(tmp)
+            raise
+    meta = dict(key)
+    meta['arrays'] = sorted(arrays)
+    _write_meta(directory, meta)
+
+#
+# cached_arrays: return the arrays parsed from source, using (or creating)
+#   its binary sidecar
+#
+# kind names the parser, so that one file may be cached in more than one
+# form.  parser is called with the source path and must return a dict of
+# name -> array.  Arrays loaded from a sidecar are read-only memory maps
+# unless mmap_mode is None.
+#
+
+def cached_arrays(source, kind, parser, mmap_mode='r'):
+    directory = sidecar_dir(source, kind)
+    key = _source_key(source)
+    meta = _read_meta(directory)
+    if meta is not None and meta.get('format_version') == FORMAT_VERSION \
+            and meta.get('source') == key['source'] \
+            and meta.get('size') == key['size']:
+        if meta.get('mtime_ns') == key['mtime_ns']:
+            return _load_sidecar(directory, meta, mmap_mode)
+        content_hash = file_hash(source)
+        if meta.get('sha256') == content_hash:
+            meta['mtime_ns'] = key['mtime_ns']
+            try:
+                _write_meta(directory, meta)
+            except OSError:
+                pass
+            return _load_sidecar(directory, meta, mmap_mode)
+
+    arrays = parser(source)
+    key['sha256'] = file_hash(source)
+    try:
+        _write_sidecar(directory, key, arrays)
+    except OSError:
+        pass
+    return arrays
@@ -0,0 +1,191 @@
+import asyncio
+import os
+import re
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from html.parser import HTMLParser
+from text import tokenized_lines
+
+#
+# Fetching the chapters of a work from the latin-texts server
+#
+# The server (Dockerfile.httpd) serves texts/latin as
+# <base>/<author>/<work>/<chapter>.txt, with directory listings.  A
+# TextFetcher fetches many chapters concurrently - at most concurrency at a
+# time - over one requests.Session, whose connection pool keeps that many
+# keep-alive connections to the server open for reuse.  Responses are
+# tokenized in memory (see text.tokenized_lines).
+#
+# base may also be a local directory laid out the same way (e.g.
+# texts/latin), for running without a server.
+#
+
+CHAPTER_LINK = re.compile(r'href="(\d+)\.txt"')
+
+
+class TextFetcher:
+    def __init__(self, base, concurrency=8, timeout=30):
+        self.base = base.rstrip('/')
+        self.remote = self.base.startswith(('http://', 'https://'))
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.executor = ThreadPoolExecutor(max_workers=concurrency)
+        self.session = None
+        # Errors fetching a document, which lose only that document
+        self.errors = ()
+        if self.remote:
+            import requests
+            from requests.adapters import HTTPAdapter
+
+            self.errors = (requests.RequestException,)
+            self.session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=concurrency)
+            self.session.mount('http://', adapter)
+            self.session.mount('https://', adapter)
+
+    def close(self):
+        self.executor.shutdown()
+        if self.session:
+            self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # Returns the body of the document at path (relative to base), or None
+    # if there is none
+    def _get(self, path):
+        if not self.remote:
+            try:
+                with open(os.path.join(self.base, *path.split('/'))) as f:
+                    return f.read()
+            except OSError:
+                return None
+        r = self.session.get('{}/{}'.format(self.base, path), timeout=self.timeout)
+        if r.status_code != 200:
+            print('Received {} from server for {}'.format(r.status_code, path))
+            return None
+        return r.text
+
+    # Returns the sorted chapter indices of a work, from the server's
+    # directory listing
+    def chapters(self, author, work):
+        if not self.remote:
+            directory = os.path.join(self.base, author, work)
+            names = os.listdir(directory) if os.path.isdir(directory) else []
+            found = [n[:-len('.txt')] for n in names
+                     if n.endswith('.txt') and n[:-len('.txt')].isdigit()]
+        else:
+            listing = self._get('{}/{}/'.format(author, work))
+            found = CHAPTER_LINK.findall(listing) if listing else []
+        return sorted(set(found), key=int)
+
+    # Fetches one chapter; returns its lines' word lists, or None if it
+    # could not be fetched (including if the request failed or timed out,
+    # so that one chapter's failure doesn't lose the rest of the work)
+    async def fetch(self, author, work, chapter, semaphore):
+        path = '{}/{}/{}.txt'.format(author, work, chapter)
+        async with semaphore:
+            try:
+                body = await asyncio.get_running_loop().run_in_executor(
+                    self.executor, self._get, path)
+            except self.errors as e:
+                print('Unable to fetch {}: {}'.format(path, e))
+                return None
+        if body is None:
+            return None
+        return list(tokenized_lines(body.splitlines()))
+
+    # Fetches the given chapters (by default all of them) of a work; returns
+    # a list of (chapter, word lists) in chapter order, with None for
+    # chapters which could not be fetched
+    async def fetch_work(self, author, work, chapters=None):
+        if chapters is None:
+            chapters = await asyncio.get_running_loop().run_in_executor(
+                self.executor, self.chapters, author, work)
+        semaphore = asyncio.Semaphore(self.concurrency)
+        texts = await asyncio.gather(*[
+            self.fetch(author, work, c, semaphore) for c in chapters])
+        return list(zip(chapters, texts))
+
+
+def fetch_work(base, author, work, chapters=None, concurrency=8, timeout=30):
+    with TextFetcher(base, concurrency, timeout) as fetcher:
+        return asyncio.run(fetcher.fetch_work(author, work, chapters))
+
+
+#
+# PackhumHTMLParser: the verse lines of a text page of latin.packhum.org
+#
+# The page may be fed a chunk at a time as it is downloaded; lines() then
+# yields the verse lines found so far.  A verse line is the text of a table
+# cell, unless it is a Roman or section number or has no lower case word.
+# HTMLParser passes on the text it has when a chunk ends, so a cell's text
+# is collected until the next tag (or the end of the page) before it's
+# checked, giving the same lines however the page is split.
+#
+
+SECTION_NUM = re.compile(r'(?<=\n)(?:[CDILMVX]+|[\d\.]+)(?=\n)')
+VERSE = re.compile(r'[a-z][a-z\?\.\,\!\;\:]*')
+
+
+class PackhumHTMLParser(HTMLParser):
+    def __init__(self):
+        super().__init__()
+        self.found = deque()
+        self.data = []
+        self.in_table_data = False
+
+    def lines(self):
+        found = self.found
+        while found:
+            yield found.popleft()
+
+    def end_data(self):
+        if not self.data:
+            return
+        data = ''.join(self.data)
+        self.data = []
+        if SECTION_NUM.search(data) or not VERSE.search(data):
+            return
+        self.found.append(data.strip('\n'))
+
+    def handle_starttag(self, tag, attrs):
+        self.end_data()
+        if tag == 'td':
+            self.in_table_data = True
+
+    def handle_endtag(self, tag):
+        self.end_data()
+        if tag == 'td':
+            self.in_table_data = False
+
+    def handle_data(self, data):
+        if self.in_table_data:
+            self.data.append(data)
+
+    def handle_comment(self, data):
+        self.end_data()
+
+    def handle_decl(self, decl):
+        self.end_data()
+
+    def handle_pi(self, data):
+        self.end_data()
+
+    def close(self):
+        super().close()
+        self.end_data()
+
+
+# Yields the verse lines of a packhum page, given as an iterable of chunks
+# of its text, as soon as each is complete
+def packhum_lines(chunks):
+    parser = PackhumHTMLParser()
+    for chunk in chunks:
+        parser.feed(chunk)
+        yield from parser.lines()
+    parser.close()
+    yield from parser.lines()
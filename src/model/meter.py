@@ -2,6 +2,7 @@ import itertools
 import click
 import inspect
 import sys
+import numpy as np
 
 # Structural representations of the types of feet found
 # across the various meters.
@@ -26,6 +27,58 @@ def _flatten(p):
             syls.append(s)
     return syls
 
+#
+# Bitmask representations of feet and lines: bit i is set when the
+# syllable at position i is long (2) or, for lines, known to be short (1).
+# Since every position in a foot is either long or short, a foot is fully
+# described by its length and its long mask; its short positions are the
+# remaining bits.
+#
+
+
+def _long_mask(syllables):
+    mask = 0
+    for pos, syl in enumerate(syllables):
+        if syl == 2:
+            mask |= 1 << pos
+    return mask
+
+
+def _short_mask(syllables):
+    mask = 0
+    for pos, syl in enumerate(syllables):
+        if syl == 1:
+            mask |= 1 << pos
+    return mask
+
+#
+# Meters are matched as a foot-level automaton: a sequence of slots, each
+# slot a tuple of (foot, length, long mask) alternatives.  A line matches a
+# template when the slots, one foot each, exactly cover its syllables.
+#
+
+
+def _compile_feet(feet):
+    return tuple(
+        tuple((tuple(f), len(f), _long_mask(f)) for f in slot)
+        for slot in feet)
+
+
+# Returns True if a foot (length, long mask) can fill the line, whose long
+# and short positions are given as masks, starting at position pos.
+def _foot_fits(longs, shorts, pos, length, mask, strict):
+    window = (1 << length) - 1
+    # A syllable known to be long can never fill a short position.
+    if (longs >> pos) & window & ~mask:
+        return False
+    # In non-strict searching, we allow for a syllable which
+    # we preliminarily scanned as short, but the pattern has
+    # a long, because sometimes syllables are long "because the
+    # meter requires it."
+    if strict and (shorts >> pos) & mask:
+        return False
+    return True
+
 #
 # Below this point you will find class definitions for meters.
 # This module should not contain any class which does not
@@ -34,42 +87,80 @@ def _flatten(p):
 
 
 class BaseMeter:
+    # Automata are built once per meter class, on first use, and shared by
+    # every instance of that class.
+    _automata = {}
+
     def __init__(self):
         self.feet = []
 
+    # Enumerates the full set of patterns - this grows with the product of
+    # the number of alternatives in each slot, so matching lines should go
+    # through candidates()/candidate_count() instead.
     def patterns(self):
-        patterns = []
-        for raw in list(itertools.product(*self.feet)):
-            patterns.append(_flatten(raw))
-        return patterns
+        return [_flatten(raw) for raw in itertools.product(*self.feet)]
+
+    def automaton(self):
+        automaton = BaseMeter._automata.get(type(self))
+        if automaton is None:
+            automaton = _compile_feet(self.feet)
+            BaseMeter._automata[type(self)] = automaton
+        return automaton
+
+    # Counts, for every slot k and line position i, the number of ways the
+    # slots from k onwards can cover the syllables from i to the end of the
+    # line.  The work is linear in slots x line length x alternatives per
+    # slot, however many patterns the meter has.
+    def _suffix_counts(self, line, strict):
+        longs = _long_mask(line)
+        shorts = _short_mask(line)
+        slots = self.automaton()
+        n = len(line)
+        counts = [[0] * (n + 1) for _ in range(len(slots) + 1)]
+        counts[len(slots)][n] = 1
+        for k in range(len(slots) - 1, -1, -1):
+            following = counts[k + 1]
+            for pos in range(n + 1):
+                total = 0
+                for _, length, mask in slots[k]:
+                    if pos + length <= n and following[pos + length] \
+                            and _foot_fits(longs, shorts, pos, length, mask, strict):
+                        total += following[pos + length]
+                counts[k][pos] = total
+        return counts
+
+    # Lazily yields the patterns matching the line, in the same order as
+    # patterns(), only ever descending into partial matches that can be
+    # completed.
+    def iter_candidates(self, line, strict=True):
+        longs = _long_mask(line)
+        shorts = _short_mask(line)
+        slots = self.automaton()
+        counts = self._suffix_counts(line, strict)
+
+        def walk(k, pos, prefix):
+            if k == len(slots):
+                yield list(prefix)
+                return
+            for foot, length, mask in slots[k]:
+                end = pos + length
+                if end <= len(line) and counts[k + 1][end] \
+                        and _foot_fits(longs, shorts, pos, length, mask, strict):
+                    yield from walk(k + 1, end, prefix + foot)
+
+        if counts[0][0]:
+            yield from walk(0, 0, ())
 
     # Attempts to match the line to one or more candidate patterns
     # of the specific meter.
     def candidates(self, line, strict=True):
         # Line must be a list of syllables marked as one of
         # 0 (unknown), 1 (short), or 2 (long)
-        candidates = []
-        for p in self.patterns():
-            if len(p) != len(line):
-                # print('Pattern length {} does not equal line length {}'.format(len(p), len(line)))
-                continue
-            for pos, syl in enumerate(line):
-                if strict:
-                    if syl > 0 and syl != p[pos]:
-                        # print('Syllable at position {} is {}, expected {}'.format(pos, syl, p[pos]))
-                        break
-                else:
-                    # In non-strict searching, we allow for a syllable which
-                    # we preliminarily scanned as short, but the pattern has
-                    # a long, because sometimes syllables are long "because the
-                    # meter requires it."
-                    if syl > p[pos]:
-                        # print('Syllable at position {} is long, should be short'.format(pos))
-                        break
-            else:
-                # print('Pattern: {}'.format(p))
-                candidates.append(p)
-        return candidates
+        return list(self.iter_candidates(line, strict))
+
+    # Returns the number of candidate patterns without building them
+    def candidate_count(self, line, strict=True):
+        return self._suffix_counts(line, strict)[0][0]
 
 
 class DactyllicHexameter(BaseMeter):
@@ -219,13 +310,98 @@ def metric_probability(lines, meter_name, strict=True):
     matches = []
     lines_matched = 0
     for l in lines:
-        candidate_count = len(m.candidates(l, strict))
+        candidate_count = m.candidate_count(l, strict)
         found = candidate_count > 0
         if found:
             lines_matched += 1
         matches.append((found, candidate_count))
     return {'lines_matched_pct': lines_matched/len(lines), 'lines_matched': matches}
 
+#
+# load_scan_matrix: read a scan file (csv rows of lineno,count,syllables...,
+#   as written by syllabify.write_output(scan=True)) into a padded matrix
+#
+# returns a tuple (linenos, counts, matrix): linenos and counts are 1-d int
+#   arrays, matrix is an int8 array with one row per line, padded with 0
+#   (unknown) past the end of each line
+#
+
+def load_scan_matrix(filename):
+    rows = []
+    with open(filename) as f:
+        for l in f.read().splitlines():
+            rows.append([int(v) for v in l.split(',')])
+    width = max([len(r) - 2 for r in rows], default=0)
+    linenos = np.array([r[0] for r in rows], dtype=np.int64)
+    counts = np.array([len(r) - 2 for r in rows], dtype=np.int64)
+    matrix = np.zeros((len(rows), width), dtype=np.int8)
+    for i, r in enumerate(rows):
+        matrix[i, :len(r) - 2] = r[2:]
+    return linenos, counts, matrix
+
+
+# Packs each row of a padded syllable matrix into a bitmask of the
+# positions holding the given value (see _long_mask).  No meter comes
+# anywhere near 64 syllables to the line, so positions past bit 63 are
+# dropped; such lines never match anyway.
+def _pack_rows(matrix, value):
+    width = min(matrix.shape[1], 64)
+    bits = np.left_shift(np.uint64(1), np.arange(width, dtype=np.uint64))
+    return np.bitwise_or.reduce(
+        np.where(matrix[:, :width] == value, bits, np.uint64(0)),
+        axis=1, initial=np.uint64(0))
+
+
+# Vectorized form of BaseMeter._suffix_counts: runs the meter's automaton
+# over every line at once, returning the candidate count of each line.
+def _survey_meter(meter, counts, longs, shorts, width, strict):
+    rows = np.arange(len(counts))
+    # ways[:, i] is the number of ways the slots so far cover the first
+    # i syllables of each line
+    ways = np.zeros((len(counts), width + 1), dtype=np.int64)
+    ways[:, 0] = 1
+    for slot in meter.automaton():
+        following = np.zeros_like(ways)
+        for _, length, mask in slot:
+            short_positions = np.uint64(~mask & ((1 << length) - 1))
+            long_positions = np.uint64(mask)
+            for pos in range(width - length + 1):
+                shift = np.uint64(pos)
+                fits = ((longs >> shift) & short_positions) == 0
+                if strict:
+                    fits &= ((shorts >> shift) & long_positions) == 0
+                following[:, pos + length] += np.where(fits, ways[:, pos], 0)
+        ways = following
+    return np.where(counts <= width, ways[rows, np.minimum(counts, width)], 0)
+
+#
+# survey: count the candidate patterns of every line for several meters at
+#   once
+#
+# counts and matrix are as returned by load_scan_matrix.  Each meter's
+# automaton is run over all lines together, one array operation per foot
+# and line position, so neither lines nor patterns are ever iterated in
+# Python.  Lines are processed in chunks of chunk_size to bound the size of
+# the intermediate arrays.
+#
+# returns an int array of shape (lines, meters), columns in the order of
+#   meter_names
+#
+
+def survey(counts, matrix, meter_names, strict=True, chunk_size=4096):
+    width = min(matrix.shape[1], 63)
+    longs = _pack_rows(matrix, 2)
+    shorts = _pack_rows(matrix, 1)
+    result = np.zeros((len(counts), len(meter_names)), dtype=np.int64)
+    for col, mn in enumerate(meter_names):
+        m = get_meter(mn)
+        for start in range(0, len(counts), chunk_size):
+            end = start + chunk_size
+            result[start:end, col] = _survey_meter(
+                m, counts[start:end], longs[start:end], shorts[start:end],
+                width, strict)
+    return result
+
 def __islatinmeter(obj):
     if inspect.isclass(obj) and obj.__name__ != "BaseMeter":
         return True
@@ -270,30 +446,14 @@ def main(filename, meter_name, show_syllable_count, disable_strict_scanning):
         scan_strictness = not disable_strict_scanning
         print('Strict scanning enabled: {}'.format(scan_strictness))
 
-        lines = []
-        with open(filename) as f:
-            for l in f.read().splitlines():
-                lines.append([int(syl) for syl in l.split(',')[2:]])
-            
-            if meter_name:
-                mp = metric_probability(lines, meter_name, scan_strictness)
-                lines_m = 0
-                for lm in mp['lines_matched']:
-                    if lm[0]:
-                        lines_m += 1
-                print('Meter: {:<30} Lines matched: {} out of {}   Match pct: {:.2f}'.format(
-                    meter_name, lines_m, len(lines), mp['lines_matched_pct']
-                ))
-            else:
-                for mn in __getmeters().keys():
-                    mp = metric_probability(lines, mn, scan_strictness)
-                    lines_m = 0
-                    for lm in mp['lines_matched']:
-                        if lm[0]:
-                            lines_m += 1
-                    print('Meter: {:<30} Lines matched: {} out of {}   Match pct: {:.2f}'.format(
-                        mn, lines_m, len(lines), mp['lines_matched_pct']
-                    ))
+        _, counts, matrix = load_scan_matrix(filename)
+        meter_names = [meter_name] if meter_name else list(__getmeters().keys())
+        candidate_counts = survey(counts, matrix, meter_names, scan_strictness)
+        for col, mn in enumerate(meter_names):
+            lines_m = int(np.count_nonzero(candidate_counts[:, col]))
+            print('Meter: {:<30} Lines matched: {} out of {}   Match pct: {:.2f}'.format(
+                mn, lines_m, len(counts), lines_m/len(counts)
+            ))
     elif meter_name:
         click.echo("Meter: {}".format(meter_name))
         click.echo("")
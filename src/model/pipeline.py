@@ -0,0 +1,159 @@
+import os
+from syllable import SyllabifiedLine, word_lines
+from text import tokenized_lines
+
+#
+# A streaming pipeline from raw text to syllable feature rows
+#
+# Each stage is a generator consuming the output of the previous one, so a
+# text of any length is processed a line at a time:
+#
+#   read_lines          path or file -> lines
+#   text_words          raw text lines -> lists of word strings (as written
+#                       to .text files by process_text)
+#   word_lines          .text lines -> lists of syllable.Words (normalized)
+#   syllabified_lines   lists of Words -> SyllabifiedLines
+#   feature_rows        SyllabifiedLines -> syllable feature tuples (as
+#                       written to .syl.csv files)
+#   scan_rows           SyllabifiedLines -> definite long marks per line (as
+#                       written by syllabify --scan)
+#
+# and sinks write a stream out, consuming it as they go.  For example,
+#
+#   write_syllabified(syllabify_text('texts/latin/472/1/1.txt'),
+#                     '1.syl', '1.syl.csv')
+#
+# syllabifies a raw text end to end in one process.
+#
+
+
+def read_lines(source):
+    if hasattr(source, 'readline'):
+        yield from source
+        return
+    with open(source) as f:
+        yield from f
+
+
+def text_words(lines):
+    return tokenized_lines(lines)
+
+
+# Formats a list of words as a line of a .text file.  Words are separated
+# by ', ' (as in datasets/*.text): word_lines strips the quotes and commas,
+# so without the space a line's words would run together into one.
+def text_line(words):
+    return '[\'' + '\', \''.join(words) + '\']'
+
+
+def syllabified_lines(word_lines):
+    for line in word_lines:
+        syls = []
+        for word in line:
+            try:
+                syls.extend(word.to_syllables())
+            except IndexError:
+                print('Unable to syllabify \"{}\", skipping'.format(word.chars))
+        yield SyllabifiedLine(syls)
+
+
+# Yields (lineno, chars, nucleus_weight, coda_weight, nucleus_class,
+# word_position, reverse_word_position, line_position,
+# reverse_line_position) for every syllable, numbering lines from 0
+def feature_rows(syllabified):
+    for lineno, line in enumerate(syllabified):
+        yield from _feature_rows(lineno, line)
+
+
+def _feature_rows(lineno, line):
+    for syl in line.syllables:
+        yield (lineno, syl.chars, syl.nucleus_weight(), syl.coda_weight(),
+               syl.nucleus_class()) + tuple(syl.positions())
+
+
+# Yields [lineno, syllable count, mark...] for every line, numbering lines
+# from 1, where each mark is 2 for a definitely long syllable and 0 otherwise
+def scan_rows(syllabified):
+    for lineno, line in enumerate(syllabified):
+        yield from _scan_rows(lineno, line)
+
+
+def _scan_rows(lineno, line):
+    vals = [lineno + 1, len(line.syllables)]
+    for syl in line.syllables:
+        vals.append(2 if syl.nucleus_weight() >= 2 or syl.coda_weight() >= 2 else 0)
+    yield vals
+
+
+# Raw text (a path or file) -> SyllabifiedLines, without an intermediate
+# .text file
+def syllabify_text(source):
+    return syllabified_lines(word_lines(
+        ' '.join(words) for words in text_words(read_lines(source))))
+
+
+# .text file (a path or file) -> SyllabifiedLines
+def syllabify_words(source):
+    return syllabified_lines(word_lines(read_lines(source)))
+
+#
+# Sinks
+#
+
+
+def write_text(word_lists, f):
+    for words in word_lists:
+        f.write(text_line(words) + '\n')
+
+
+def format_row(row):
+    return ','.join(str(v) for v in row) + '\n'
+
+
+# Writes each SyllabifiedLine to the output (.syl) file and its feature
+# rows (or scan rows, if scan is set) to the data (.syl.csv) file, in a
+# single pass over the stream.  Either file may be a path or an open file.
+def write_syllabified(syllabified, output_file, data_file, scan=False):
+    out, out_opened = _open_sink(output_file)
+    data, data_opened = _open_sink(data_file)
+    rows = _scan_rows if scan else _feature_rows
+    try:
+        for lineno, line in enumerate(syllabified):
+            out.write(line.string())
+            for row in rows(lineno, line):
+                data.write(format_row(row))
+    finally:
+        if out_opened:
+            out.close()
+        if data_opened:
+            data.close()
+
+
+def _open_sink(target):
+    if hasattr(target, 'write'):
+        return target, False
+    return open(target, 'w'), True
+
+#
+# syllabify_object: syllabify a .text object of a bucket, storing its .syl
+#   and .syl.csv results under the same key prefix (dir/x.text ->
+#   dir/x.syl, dir/x.syl.csv)
+#
+# storage is a cos.CloudObjectStorage.  The object is downloaded to its key
+# under directory, and the results are written next to it.
+#
+# returns a list of (key, exception) for the transfers which failed, empty
+#   if the results were stored
+#
+
+def syllabify_object(storage, bucket_name, key, directory='.'):
+    report = storage.download_many(bucket_name, [key], directory)
+    if report.failures:
+        return report.failures
+    input_file = os.path.join(directory, *key.split('/'))
+    output_key = (key[:-len('.text')] if key.endswith('.text') else key) + '.syl'
+    output_file = os.path.join(directory, *output_key.split('/'))
+    write_syllabified(syllabify_words(input_file), output_file, output_file + '.csv')
+    report = storage.upload_many(bucket_name, files=[output_file, output_file + '.csv'],
+                                 keys=[output_key, output_key + '.csv'])
+    return [(k, e) for (_, k), e in report.failures]
@@ -0,0 +1,255 @@
+import click
+import os
+import shutil
+import struct
+import numpy as np
+
+#
+# Fixed-width binary storage for syllable feature rows
+#
+# A rows file holds, for every syllable: its line number, the offset and
+# length of its text in a shared character blob, the seven model features
+# (in dataset feature_names order), the predicted quantity and the three
+# class probabilities (zero/short/long).  Each of these is stored as one
+# contiguous section, so that open_rows() can memory-map every section and
+# hand out slices of a file of any size without reading it into memory.
+#
+# Layout (little-endian):
+#   header:   magic (8 bytes), version (u4), padding (u4), rows (u8),
+#             chars length in bytes (u8)
+#   sections: line (i4), chars_offset (u4), chars_length (u1),
+#             features (f4 x 7), quantity (i1), probabilities (f4 x 3),
+#             chars (utf-8 bytes)
+# Every section starts on a 64-byte boundary.  Rows which have not been
+# scanned yet have a quantity of -1 and NaN probabilities.
+#
+
+MAGIC = b'SCANROWS'
+VERSION = 1
+HEADER = struct.Struct('<8sIIQQ')
+ALIGNMENT = 64
+FEATURE_COUNT = 7
+CLASS_COUNT = 3
+# Syllable texts are stored with a u1 length
+MAX_CHARS_LENGTH = 255
+
+# (name, dtype, per-row shape) of each row section, in file order
+SECTIONS = [
+    ('line', np.dtype('<i4'), ()),
+    ('chars_offset', np.dtype('<u4'), ()),
+    ('chars_length', np.dtype('u1'), ()),
+    ('features', np.dtype('<f4'), (FEATURE_COUNT,)),
+    ('quantity', np.dtype('i1'), ()),
+    ('probabilities', np.dtype('<f4'), (CLASS_COUNT,))
+]
+
+
+def _align(offset):
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+# Returns the byte offset of each section, and of the chars blob, for a
+# file of the given number of rows
+def _section_offsets(rows):
+    offsets = {}
+    offset = _align(HEADER.size)
+    for name, dtype, shape in SECTIONS:
+        offsets[name] = offset
+        offset = _align(offset + rows * dtype.itemsize * int(np.prod(shape)))
+    offsets['chars'] = offset
+    return offsets
+
+
+def is_rows_file(path):
+    try:
+        with open(path, 'rb') as f:
+            return f.read(len(MAGIC)) == MAGIC
+    except OSError:
+        return False
+
+#
+# ScanRows: a memory-mapped rows file
+#
+# Each section is exposed as a read-only NumPy memmap (rows.line,
+# rows.features, ...); slicing them reads only the pages touched.
+#
+
+class ScanRows:
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            magic, version, _, rows, chars_size = HEADER.unpack(f.read(HEADER.size))
+        if magic != MAGIC or version != VERSION:
+            raise ValueError('{} is not a version {} rows file'.format(path, VERSION))
+        self.path = path
+        self.rows = rows
+        offsets = _section_offsets(rows)
+        for name, dtype, shape in SECTIONS:
+            setattr(self, name, self._map(dtype, (rows,) + shape, offsets[name]))
+        self.chars = self._map(np.dtype('u1'), (chars_size,), offsets['chars'])
+        self.index = None
+
+    def _map(self, dtype, shape, offset):
+        if int(np.prod(shape)) == 0:
+            return np.zeros(shape, dtype=dtype)
+        return np.memmap(self.path, dtype=dtype, mode='r', shape=shape, offset=offset)
+
+    def __len__(self):
+        return self.rows
+
+    # Returns the syllable text of row i
+    def chars_at(self, i):
+        start = int(self.chars_offset[i])
+        return bytes(self.chars[start:start + int(self.chars_length[i])]).decode('utf-8')
+
+    # Returns the syllable text of every row, as a NumPy unicode array.  The
+    # rows' bytes are gathered from the blob a block of rows at a time into
+    # fixed-width byte strings, and only the distinct ones are decoded.
+    def chars_array(self, block_size=1 << 20):
+        if self.rows == 0:
+            return np.zeros(0, dtype='U1')
+        width = max(int(self.chars_length.max()), 1)
+        columns = np.arange(width)
+        fixed = np.empty(self.rows, dtype='S{}'.format(width))
+        for start in range(0, self.rows, block_size):
+            end = min(start + block_size, self.rows)
+            valid = columns < self.chars_length[start:end, None]
+            index = np.where(valid, self.chars_offset[start:end, None] + columns, 0)
+            block = self.chars[index] if len(self.chars) else \
+                np.zeros(index.shape, dtype=np.uint8)
+            block[~valid] = 0
+            fixed[start:end] = block.view(fixed.dtype)[:, 0]
+        distinct, inverse = np.unique(fixed, return_inverse=True)
+        return np.array([b.decode('utf-8') for b in distinct])[inverse.reshape(-1)]
+
+    # Rows need not be stored in line order (model output is shuffled by the
+    # train/test split), so the first lookup by line builds an index of row
+    # numbers sorted by line - the only array the size of the file that is
+    # ever built.
+    def _line_index(self):
+        if self.index is None:
+            order = np.argsort(self.line, kind='stable')
+            lines, starts = np.unique(self.line[order], return_index=True)
+            self.index = (lines, order, np.append(starts, len(order)))
+        return self.index
+
+    def line_numbers(self):
+        return [int(l) for l in self._line_index()[0]]
+
+    # Returns the indices of the rows of the given line, in file order
+    def line_rows(self, lineno):
+        lines, order, starts = self._line_index()
+        k = np.searchsorted(lines, lineno)
+        if k == len(lines) or lines[k] != lineno:
+            raise KeyError(lineno)
+        return order[starts[k]:starts[k + 1]]
+
+
+def open_rows(path):
+    return ScanRows(path)
+
+#
+# RowsWriter: write a rows file incrementally, a batch of rows at a time,
+#   so that converting a large CSV never holds more than one batch in memory
+#
+# Sections are written to temporary files while rows are appended, and
+# assembled into the final file on close().
+#
+
+class RowsWriter:
+    def __init__(self, path):
+        self.path = path
+        self.rows = 0
+        self.chars_size = 0
+        self.parts = {name: open('{}.{}.part'.format(path, name), 'w+b')
+                      for name, _, _ in SECTIONS + [('chars', None, None)]}
+
+    def append(self, lines, chars, features, quantity=None, probabilities=None):
+        count = len(lines)
+        encoded = [c.encode('utf-8') for c in chars]
+        lengths = np.array([len(e) for e in encoded], dtype=np.int64)
+        if count and lengths.max() > MAX_CHARS_LENGTH:
+            raise ValueError('Syllable "{}" is longer than {} bytes'.format(
+                chars[int(np.argmax(lengths))], MAX_CHARS_LENGTH))
+        offsets = self.chars_size + np.concatenate(([0], np.cumsum(lengths)[:-1])) \
+            if count else np.zeros(0, dtype=np.int64)
+        if quantity is None:
+            quantity = np.full(count, -1)
+        if probabilities is None:
+            probabilities = np.full((count, CLASS_COUNT), np.nan)
+        values = {
+            'line': lines,
+            'chars_offset': offsets,
+            'chars_length': lengths,
+            'features': features,
+            'quantity': quantity,
+            'probabilities': probabilities
+        }
+        for name, dtype, shape in SECTIONS:
+            arr = np.asarray(values[name]).astype(dtype).reshape((count,) + shape)
+            self.parts[name].write(arr.tobytes())
+        self.parts['chars'].write(b''.join(encoded))
+        self.rows += count
+        self.chars_size += int(lengths.sum())
+
+    def close(self):
+        offsets = _section_offsets(self.rows)
+        with open(self.path, 'wb') as out:
+            out.write(HEADER.pack(MAGIC, VERSION, 0, self.rows, self.chars_size))
+            for name in [s[0] for s in SECTIONS] + ['chars']:
+                out.write(b'\0' * (offsets[name] - out.tell()))
+                part = self.parts[name]
+                part.seek(0)
+                shutil.copyfileobj(part, out)
+                part.close()
+                os.remove(part.name)
+
+#
+# convert_csv: convert a syllable data file (the 9 column .syl.csv written
+#   by process_syllables/syllabify) or a scan results file (the 13 column
+#   output of scan_syllables, with predicted quantity and probabilities) into
+#   a rows file, reading batch_size lines at a time
+#
+# returns the number of rows written
+#
+
+def convert_csv(csv_path, rows_path, batch_size=65536):
+    writer = RowsWriter(rows_path)
+
+    def flush(batch):
+        if not batch:
+            return
+        scanned = len(batch[0]) == 13
+        writer.append(
+            [int(float(r[0])) for r in batch],
+            [r[1] for r in batch],
+            [[float(v) for v in r[2:9]] for r in batch],
+            [int(r[9]) for r in batch] if scanned else None,
+            [[float(v) for v in r[10:13]] for r in batch] if scanned else None)
+
+    batch = []
+    with open(csv_path) as f:
+        for line in f:
+            vals = line.strip().split(',')
+            if len(vals) not in (9, 13):
+                continue
+            if batch and len(vals) != len(batch[0]):
+                raise ValueError('{}: mixed row formats'.format(csv_path))
+            batch.append(vals)
+            if len(batch) == batch_size:
+                flush(batch)
+                batch = []
+    flush(batch)
+    writer.close()
+    return writer.rows
+
+
+@click.command()
+@click.argument('csv_file', type=click.Path(exists=True))
+@click.argument('rows_file', type=click.Path())
+def main(csv_file, rows_file):
+    """Convert a syllable data or scan results CSV file to a rows file"""
+
+    click.echo('Wrote {} rows to {}'.format(convert_csv(csv_file, rows_file), rows_file))
+
+if __name__ == "__main__":
+    exit(main())
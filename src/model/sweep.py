@@ -0,0 +1,183 @@
+import csv
+import itertools
+import mmap
+import os
+import random
+import tempfile
+import time
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from sklearn.model_selection import train_test_split
+from dataset import make_classifier
+
+#
+# Hyperparameter sweeps over the run_gbc classifiers
+#
+# A sweep evaluates a list of configurations (dicts of make_classifier
+# parameters: n_estimators, learning_rate, max_depth, max_features) on one
+# train/test split of a dataset, fanned out to a pool of worker processes.
+# The feature and target arrays are never pickled to the workers: each
+# worker memory-maps them from .npy files, once per process.  Arrays which
+# are already memory-mapped .npy files - as datasets loaded through the
+# featurestore cache are - are shared as they are; others are saved to a
+# temporary directory first.
+#
+# The split is the one run_gbc makes with the same split_random_state.
+# Each configuration gives a result row (see RESULT_FIELDS) with its train
+# and test scores and fit and predict times.  Workers share the cores
+# between them for the multi-threaded (hist) backend.
+#
+
+# Parameters missing from a configuration take these values, as in
+# scan_syllables (max_features None being all of them)
+DEFAULTS = {
+    'n_estimators': 100,
+    'learning_rate': 0.1,
+    'max_depth': 3,
+    'max_features': None
+}
+PARAMETERS = list(DEFAULTS)
+RESULT_FIELDS = ['backend'] + PARAMETERS + [
+    'trees', 'train_score', 'test_score', 'fit_seconds', 'predict_seconds']
+
+
+# Every combination of the values of each parameter, e.g.
+# grid({'max_depth': [2, 3], 'learning_rate': [0.1]})
+def grid(space):
+    names = sorted(space)
+    return [dict(zip(names, values))
+            for values in itertools.product(*[space[n] for n in names])]
+
+
+# n distinct combinations, chosen at random (all of them if there are no
+# more than n)
+def random_configs(space, n, seed=0):
+    configs = grid(space)
+    if len(configs) <= n:
+        return configs
+    return random.Random(seed).sample(configs, n)
+
+
+# The path of the .npy file arr is a memory map of, if any.  Only the map
+# np.load returned is the file's array: a view of it (a slice, a transpose,
+# ...) is not, even where its shape is the same, and is saved anew.
+def _npy_path(arr):
+    if not isinstance(arr, np.memmap) or not isinstance(arr.base, mmap.mmap) \
+            or not arr.filename or not arr.filename.endswith('.npy'):
+        return None
+    saved = np.load(arr.filename, mmap_mode='r')
+    if (arr.offset, arr.dtype, arr.shape, arr.strides) != \
+            (saved.offset, saved.dtype, saved.shape, saved.strides):
+        return None
+    return arr.filename
+
+
+# Returns {name: path} of .npy files holding arrays, saving those which are
+# not already memory-mapped .npy files to directory
+def share_arrays(arrays, directory):
+    paths = {}
+    for name, arr in arrays.items():
+        path = _npy_path(arr)
+        if path is None:
+            path = os.path.join(directory, name + '.npy')
+            np.save(path, np.asarray(arr))
+        paths[name] = path
+    return paths
+
+
+# The arrays each worker process has mapped, by path
+_mapped = {}
+_thread_limits = None
+
+
+def _init_worker(threads):
+    from threadpoolctl import threadpool_limits
+
+    global _thread_limits
+    _thread_limits = threadpool_limits(threads)
+
+
+# The array saved at path, memory-mapped once per process
+def mapped_array(path):
+    arr = _mapped.get(path)
+    if arr is None:
+        arr = _mapped[path] = np.load(path, mmap_mode='r')
+    return arr
+
+#
+# map_shared: apply fn to (shared, item) for each of items on a pool of jobs
+#   worker processes (all cores if 0), yielding the results in order
+#
+# shared maps the names of arrays to the .npy files they are shared
+# through (see share_arrays), for fn to open with mapped_array.  With
+# jobs == 1 everything runs in this process.
+#
+
+def map_shared(fn, arrays, items, jobs=0):
+    if jobs == 0:
+        jobs = os.cpu_count() or 1
+    with tempfile.TemporaryDirectory() as directory:
+        shared = share_arrays(arrays, directory)
+        work = [(shared, item) for item in items]
+        if jobs <= 1:
+            yield from map(fn, work)
+            return
+        threads = max(1, (os.cpu_count() or 1) // jobs)
+        with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker,
+                                 initargs=(threads,)) as executor:
+            yield from executor.map(fn, work)
+
+
+def evaluate(job):
+    shared, (backend, config, model_random_state) = job
+    X, y = mapped_array(shared['data']), mapped_array(shared['target'])
+    train, test = mapped_array(shared['train']), mapped_array(shared['test'])
+    X_train, y_train, X_test, y_test = X[train], y[train], X[test], y[test]
+
+    options = dict(DEFAULTS)
+    options.update(config)
+    clf = make_classifier(backend, n_features=X.shape[1],
+                          random_state=model_random_state, **options)
+    start = time.perf_counter()
+    clf.fit(X_train, y_train)
+    fit = time.perf_counter() - start
+    start = time.perf_counter()
+    test_score = clf.score(X_test, y_test)
+    predict = time.perf_counter() - start
+
+    row = {'backend': backend}
+    row.update(options)
+    row.update({
+        'trees': getattr(clf, 'n_iter_', None) or clf.n_estimators_,
+        'train_score': clf.score(X_train, y_train),
+        'test_score': test_score,
+        'fit_seconds': fit,
+        'predict_seconds': predict
+    })
+    return row
+
+#
+# sweep: evaluate each of configs on dataset (a Bunch with data and
+#   target), yielding result rows in the order of configs as they become
+#   available
+#
+# jobs is the number of worker processes (all cores if 0); with jobs == 1
+# everything runs in this process.
+#
+
+def sweep(dataset, configs, backend='gbc', jobs=0, test_size=0.25,
+          split_random_state=0, model_random_state=0):
+    train, test = train_test_split(
+        np.arange(len(dataset.target)), test_size=test_size,
+        random_state=split_random_state)
+    return map_shared(
+        evaluate,
+        {'data': dataset.data, 'target': dataset.target, 'train': train, 'test': test},
+        [(backend, c, model_random_state) for c in configs], jobs)
+
+
+def write_results(rows, f):
+    writer = csv.DictWriter(f, fieldnames=RESULT_FIELDS)
+    writer.writeheader()
+    for row in rows:
+        writer.writerow(row)
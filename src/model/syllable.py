@@ -1,11 +1,12 @@
 import ast
 import re
+from collections import OrderedDict
 
 VOWELS = 'aeiouy'
 VOWELS_NOT_U = 'aeioy'
 VOWELS_NOT_Y = 'aeiou'
 CONSONANTS = 'bcdfghjklmnpqrstvxz'
-SPECIALS_initial_only = ['\Aia[{}]'.format(
+SPECIALS_initial_only = [r'\Aia[{}]'.format(
     CONSONANTS), 'sua']
 SPECIALS_long = ['seu', 'cui', 'huic', 'heu']
 SEQUENCES = ['qu', 'gu']
@@ -35,26 +36,219 @@ VOWEL_CLASSES = {
 }
 
 
+#
+# Syllabifier: the compiled regular expressions used to normalize lines of
+# text into words and to split words into syllables.  These are built from
+# the constant tables above, so a single module-level instance (SYLLABIFIER)
+# is shared by every Words and Word.
+#
+
+class Syllabifier:
+    def __init__(self):
+        self.punctuation = re.compile(r'[\'><)(,:.;!?]')
+        self.deleted = str.maketrans('', '', '\'><)(,:.;!?')
+        self.non_word = re.compile(r'\W+')
+        self.prodelision = re.compile(r'([aeu]m) e(st?)\b')
+        self.m_elision = re.compile(r'[aeu]m ([aeiou])')
+        self.elision = re.compile(r'(?:ae|oe|[aeiou]) (h?[aeiou])')
+        # Any word boundary at which one of the three rules above may apply
+        self.elision_candidate = re.compile(r'[aeioum] h?[aeiou]')
+        # Greek names - easiest way is to treat 'y' as a true upsilon
+        self.upsilon = re.compile('(?<=[{}])y(?=[{}])'.format(
+            CONSONANTS, CONSONANTS))
+        self.initial_sua = re.compile(r'sua[dsv]')
+        self.syllable = re.compile(
+             # '((?<=\A)({}|[{}])*)?[{}]?({}|[{}])(([{}])*(?![{}]))?'.format(
+             '({})|({}|[{}])*[{}]?({}|[{}])(([{}])*(?![{}]))?'.format(
+                 '|'.join(SPECIALS_initial_only),
+                 '|'.join(SEQUENCES),
+                 CONSONANTS,
+                 CONSONANTS,
+                 '|'.join(DIPTHONGS),
+                 VOWELS,
+                 CONSONANTS,
+                 VOWELS),
+             flags=re.IGNORECASE)
+
+    # Remove all punctuation; remove excess space between words;
+    # prodelision of est; elision
+    #
+    # The line is split into words once, and the elision rules are then
+    # applied to the list of words (see _prodelision, _m_elision and
+    # _elision) - only if some word boundary is a candidate for one of them.
+    # The result is the same as that of normalize_passes().
+    def normalize(self, line):
+        parts = self.non_word.split(line.lower().translate(self.deleted))
+        # Leading or trailing non-word characters leave a space at either end
+        start = 1 if parts[0] == '' and len(parts) > 1 else 0
+        end = len(parts) - 1 if parts[-1] == '' and len(parts) - 1 > start else len(parts)
+        words = parts[start:end]
+        textline = ' '.join(words)
+        if self.elision_candidate.search(textline):
+            if 'm es' in textline:
+                words = _prodelision(words)
+            textline = ' '.join(_elision(_m_elision(words)))
+        return ' ' * start + textline + ' ' * (len(parts) - end)
+
+    # The reference implementation of normalize(), as a sequence of regular
+    # expression passes over the whole line
+    def normalize_passes(self, line):
+        textline = ' '.join(
+            self.non_word.split(self.punctuation.sub('', line.lower())))
+        textline = self.prodelision.sub(r'\1\2', textline)
+        textline = self.m_elision.sub(r'\1', textline)
+        return self.elision.sub(r'\1', textline)
+
+#
+# The elision rules of Syllabifier.normalize, applied to a list of words
+#
+# Each function does what the corresponding regular expression substitution
+# does to the words joined by spaces, in a single scan: cur is the current
+# (possibly already merged) word, which is joined with the next one when the
+# rule applies at the boundary between them.  Like re.sub, a rule may not
+# use characters consumed by its previous match, so p is the position in cur
+# at which a match may start (everything before it was consumed).
+#
+
+
+def _prodelision(words):
+    # ([aeu]m) e(st?)\b -> \1\2: consumes the whole of the next word
+    out = []
+    cur = words[0]
+    consumed = False
+    for nxt in words[1:]:
+        if not consumed and (nxt == 'est' or nxt == 'es') \
+                and len(cur) >= 2 and cur[-1] == 'm' and cur[-2] in 'aeu':
+            cur += nxt[1:]
+            consumed = True
+            continue
+        out.append(cur)
+        cur = nxt
+        consumed = False
+    out.append(cur)
+    return out
+
+
+def _m_elision(words):
+    # [aeu]m ([aeiou]) -> \1
+    out = []
+    cur = words[0]
+    p = 0
+    for nxt in words[1:]:
+        n = len(cur)
+        if n >= 2 and n - 2 >= p and cur[-1] == 'm' and cur[-2] in 'aeu' \
+                and nxt[0] in 'aeiou':
+            cur = cur[:-2] + nxt
+            p = n - 1
+            continue
+        out.append(cur)
+        cur = nxt
+        p = 0
+    out.append(cur)
+    return out
+
+
+def _elision(words):
+    # (?:ae|oe|[aeiou]) (h?[aeiou]) -> \1
+    out = []
+    cur = words[0]
+    p = 0
+    for nxt in words[1:]:
+        if cur and cur[-1] in 'aeiou':
+            if nxt[0] in 'aeiou':
+                k = 1
+            elif nxt[0] == 'h' and len(nxt) > 1 and nxt[1] in 'aeiou':
+                k = 2
+            else:
+                k = 0
+            n = len(cur)
+            if k and n - 2 >= p and cur[-2:] in ('ae', 'oe'):
+                cur = cur[:-2] + nxt
+                p = n - 2 + k
+                continue
+            if k and n - 1 >= p:
+                cur = cur[:-1] + nxt
+                p = n - 1 + k
+                continue
+        out.append(cur)
+        cur = nxt
+        p = 0
+    out.append(cur)
+    return out
+
+
+SYLLABIFIER = Syllabifier()
+
+#
+# SyllableCache: a bounded, least-recently-used cache of word
+# syllabifications, keyed by the word's normalized characters.  Entries are
+# tuples of frozen Syllables (see Syllable.freeze) from which callers get
+# fresh copies, free to be positioned within a line.  hits and misses
+# count lookups, so that the cache's effectiveness on a corpus can be
+# checked.  A maxsize of 0 disables caching.
+#
+
+class SyllableCache:
+    def __init__(self, maxsize=16384):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.entries = OrderedDict()
+
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return entry
+
+    def put(self, key, frozen):
+        if self.maxsize <= 0:
+            return
+        self.entries[key] = frozen
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+    def resize(self, maxsize):
+        self.maxsize = maxsize
+        while len(self.entries) > max(maxsize, 0):
+            self.entries.popitem(last=False)
+
+    def clear(self):
+        self.entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def info(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'size': len(self.entries),
+            'maxsize': self.maxsize
+        }
+
+
+SYLLABLE_CACHE = SyllableCache()
+
+
+#
+# word_lines: yield the normalized Words of each of the given lines (e.g. of
+#   a .text file), one list per line, as the lines are consumed
+#
+
+def word_lines(lines):
+    for l in lines:
+        yield [Word(n.strip())
+               for n in SYLLABIFIER.normalize(l.rstrip('\r\n')).split()]
+
+
 class Words:
     def __init__(self, path):
         with open(path) as f:
-            lines = f.read().splitlines()
-            self.wordlines = []
-            for l in lines:
-                # Remove all punctuation; remove excess space between words;
-                # prodelision of est; elision
-                textline = re.sub(r'(?:ae|oe|[aeiou]) (h?[aeiou])',
-                                  r'\1',
-                                  re.sub(r'[aeu]m ([aeiou])',
-                                         r'\1',
-                                         re.sub(r'([aeu]m) e(st?)\b',
-                                                r'\1\2',
-                                                ' '.join(
-                                                    re.split(
-                                                        '\W+',
-                                                        re.sub(r'[\'><)(,:.;!?]', '', l.lower()))))))
-                self.wordlines.append([Word(n.strip())
-                                       for n in textline.split()])
+            self.wordlines = list(word_lines(f))
 
     def lines(self):
         return self.wordlines
@@ -73,35 +267,37 @@ class Word:
         #        'iu(?=([ugp]|[vn][{}]|ng|st))'.format(VOWELS), 'ju', self.chars)
         # self.chars = re.sub('(?<=\A)io', 'jo', self.chars)
         # self.chars = re.sub('((?<=o)|(?<=\A))ia', 'ja', self.chars)
-        # Take care of Greek names - easiest way is to treat 'y' as a true upsilon
-        self.chars = re.sub('(?<=[{}])y(?=[{}])'.format(CONSONANTS, CONSONANTS),
-                            'u', self.chars)
-        # self.chars = chars
-        self.vsp = re.compile(
-             # '((?<=\A)({}|[{}])*)?[{}]?({}|[{}])(([{}])*(?![{}]))?'.format(
-             '({})|({}|[{}])*[{}]?({}|[{}])(([{}])*(?![{}]))?'.format(
-                 '|'.join(SPECIALS_initial_only),
-                 '|'.join(SEQUENCES),
-                 CONSONANTS,
-                 CONSONANTS,
-                 '|'.join(DIPTHONGS),
-                 VOWELS,
-                 CONSONANTS,
-                 VOWELS),
-             flags=re.IGNORECASE)
+        # Take care of Greek names
+        self.chars = SYLLABIFIER.upsilon.sub('u', self.chars)
 
+    # Returns a fresh list of Syllables for the word.  Syllabifications are
+    # cached by the word's characters (see SYLLABLE_CACHE), so repeated
+    # words only pay for copying their syllables.
     def to_syllables(self):
+        return [Syllable.thaw(frozen) for frozen in self.frozen_syllables()]
+
+    # Returns the word's syllabification as a tuple of frozen syllables (see
+    # Syllable.freeze), shared through SYLLABLE_CACHE - for callers which
+    # only need the syllables' values and not Syllable objects.
+    def frozen_syllables(self):
+        cached = SYLLABLE_CACHE.get(self.chars)
+        if cached is None:
+            cached = tuple(syl.freeze() for syl in self._syllabify())
+            SYLLABLE_CACHE.put(self.chars, cached)
+        return cached
+
+    def _syllabify(self):
         syllables = []
         if self.chars in SPECIALS_long:
             syl = Syllable(self.chars)
             syllables.append(syl)
         else:
             chars = self.chars
-            if re.match(r'sua[dsv]', chars):
+            if SYLLABIFIER.initial_sua.match(chars):
                 syllables.append(Syllable('sua'))
                 chars = self.chars.lstrip('sua')
 
-            for syl in self.vsp.finditer(chars):
+            for syl in SYLLABIFIER.syllable.finditer(chars):
                 newSyl = Syllable(syl.group(0))
                 newSyl.mark_final(False)
                 newSyl.mark_initial(False)
@@ -172,48 +368,128 @@ class SyllabifiedLine:
         ]) + '\n'
 
 
-class Syllable:
+#
+# SyllableShape: the properties of a syllable which derive solely from its
+# characters - the C/V slots, the vowel class and the onset, nucleus and
+# coda weights before any context from the rest of the line is applied.
+# Shapes are interned per distinct string by shape_of(), so every
+# occurrence of a syllable in a corpus shares a single shape.
+#
+
+class SyllableShape:
+    __slots__ = ('chars', 'slots', 'vowel_class', 'onset', 'nucleus', 'coda')
+
     def __init__(self, chars):
-        self.line_no = -1
-        self.line_position = -1
-        self.reverse_line_position = -1
-        self.word_position = -1
-        self.reverse_word_position = -1
-        self.chars = chars[:].lower()
-        self.slots = []
-        self.final = False
-        self.initial = False
+        self.chars = chars
+        slots = []
         self.vowel_class = 0
+        self.onset = 0
+        self.nucleus = 0
+        self.coda = 0
         nucleus_seen = False
-        self.weights = {'onset': 0, 'nucleus': 0, 'coda': 0}
-        for pos, c in enumerate(self.chars):
+        for pos, c in enumerate(chars):
             if c in VOWELS:
                 # 'qu' does not fill a nucleus spot
-                if c == 'u' and pos > 0 and self.chars[pos - 1] in 'qg':
+                if c == 'u' and pos > 0 and chars[pos - 1] in 'qg':
                     continue
 
                 # Enable differentiation based on what the actual vowel is
                 self.vowel_class = VOWEL_CLASSES[c]
                 if pos > 0:
-                    seq = '{}{}'.format(self.chars[pos - 1], c)
+                    seq = '{}{}'.format(chars[pos - 1], c)
                     if seq in VOWEL_CLASSES:
-                        if not (pos > 1 and seq[0] == 'u' and self.chars[pos - 2] in 'qg'):
+                        if not (pos > 1 and seq[0] == 'u' and chars[pos - 2] in 'qg'):
                             self.vowel_class = VOWEL_CLASSES[seq]
 
-                self.slots.append('V')
-                self.add_nucleus_weight()
+                slots.append('V')
+                self.nucleus += 1
                 nucleus_seen = True
             elif c in CONSONANTS:
-                self.slots.append('C')
+                slots.append('C')
                 weight = CONSONANT_SPECIAL_WEIGHTS[c] if c in CONSONANT_SPECIAL_WEIGHTS else 1
-                if c in LIQUIDS and pos > 0 and self.chars[pos - 1] in STOPS:
+                if c in LIQUIDS and pos > 0 and chars[pos - 1] in STOPS:
                     weight = .5
                 if nucleus_seen:
-                    self.add_coda_weight(weight)
+                    self.coda += weight
                 else:
-                    self.add_onset_weight(weight)
+                    self.onset += weight
             else:
-                self.slots.append('U')
+                slots.append('U')
+        self.slots = tuple(slots)
+
+
+_SHAPES = {}
+
+
+def shape_of(chars):
+    shape = _SHAPES.get(chars)
+    if shape is None:
+        shape = SyllableShape(chars)
+        _SHAPES[chars] = shape
+    return shape
+
+#
+# Syllable: a single occurrence of a syllable within a word and a line.
+# Everything derived from the characters lives in the shared shape; each
+# instance only holds its positions, word boundary marks and its weights,
+# which the surrounding line may change (elision, coda weight carried over
+# from the following onset).
+#
+
+class Syllable:
+    __slots__ = ('shape', 'line_no', 'line_position', 'reverse_line_position',
+                 'word_position', 'reverse_word_position', 'final', 'initial',
+                 'onset', 'nucleus', 'coda')
+
+    def __init__(self, chars):
+        shape = shape_of(chars.lower())
+        self.shape = shape
+        self.line_no = -1
+        self.line_position = -1
+        self.reverse_line_position = -1
+        self.word_position = -1
+        self.reverse_word_position = -1
+        self.final = False
+        self.initial = False
+        self.onset = shape.onset
+        self.nucleus = shape.nucleus
+        self.coda = shape.coda
+
+    @property
+    def chars(self):
+        return self.shape.chars
+
+    @property
+    def slots(self):
+        return list(self.shape.slots)
+
+    @property
+    def vowel_class(self):
+        return self.shape.vowel_class
+
+    # Returns the syllable's state as a flat tuple of immutable values, from
+    # which thaw() can build new copies.  Holding only immutable values also
+    # keeps cached syllabifications out of the garbage collector's way.
+    def freeze(self):
+        return (self.shape.chars, self.onset, self.nucleus, self.coda,
+                self.word_position, self.reverse_word_position,
+                self.initial, self.final)
+
+    @staticmethod
+    def thaw(frozen):
+        syl = Syllable.__new__(Syllable)
+        syl.shape = shape_of(frozen[0])
+        syl.line_no = -1
+        syl.line_position = -1
+        syl.reverse_line_position = -1
+        syl.onset = frozen[1]
+        syl.nucleus = frozen[2]
+        syl.coda = frozen[3]
+        syl.word_position = frozen[4]
+        syl.reverse_word_position = frozen[5]
+        syl.initial = frozen[6]
+        syl.final = frozen[7]
+        return syl
 
     # Mark the syllable as word-final, default to True
 
@@ -259,26 +535,26 @@ class Syllable:
 
     # For handling elision
     def set_zero_weight(self):
-        self.weights['nucleus'] = 0
-        self.weights['coda'] = 0
+        self.nucleus = 0
+        self.coda = 0
 
     def add_onset_weight(self, weight=1):
-        self.weights['onset'] += weight
+        self.onset += weight
 
     def add_nucleus_weight(self, weight=1):
-        self.weights['nucleus'] += weight
+        self.nucleus += weight
 
     def add_coda_weight(self, weight=1):
-        self.weights['coda'] += weight
+        self.coda += weight
 
     def onset_weight(self):
-        return self.weights['onset']
+        return self.onset
 
     def nucleus_weight(self):
-        return self.weights['nucleus']
+        return self.nucleus
 
     def coda_weight(self):
-        return self.weights['coda']
+        return self.coda
 
     def nucleus_class(self):
         return self.vowel_class
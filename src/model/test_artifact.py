@@ -0,0 +1,94 @@
+import unittest
+import artifact
+import dataset
+import json
+import numpy as np
+import os
+import shutil
+import tempfile
+from test_dataset import synthetic_dataset
+
+
+class ArtifactTestCase(unittest.TestCase):
+    def setUp(self):
+        self.root = os.path.join(tempfile.mkdtemp(), 'models')
+        self.ds = synthetic_dataset()
+        self.ds.update(name='Synthetic', feature_names=list('abcdefg'),
+                       target_names=['zero', 'short', 'long'])
+
+    def tearDown(self):
+        shutil.rmtree(os.path.dirname(self.root))
+
+    def test_data_hash(self):
+        X, y = self.ds.data, self.ds.target
+        self.assertEqual(artifact.data_hash(X, y), artifact.data_hash(X.astype(str), y))
+        self.assertNotEqual(artifact.data_hash(X, y), artifact.data_hash(X[1:], y[1:]))
+
+    def test_save_and_load(self):
+        self.assertEqual(artifact.versions(self.root), [])
+        with self.assertRaises(FileNotFoundError):
+            artifact.load_model(self.root)
+
+        _, test_score, results = dataset.run_gbc(
+            self.ds, 0, 20, 0.1, 3, None, 0, model_root=self.root)
+        dataset.run_gbc(self.ds, 0, 10, 0.1, 2, None, 0, backend='hist',
+                        model_root=self.root)
+        self.assertEqual(artifact.versions(self.root), [1, 2])
+
+        model = artifact.load_model(self.root)
+        self.assertEqual(model.version, 2)
+        self.assertEqual(model.meta['backend'], 'hist')
+
+        model = artifact.load_model(self.root, 1)
+        self.assertEqual(model.meta['params']['n_estimators'], 20)
+        self.assertEqual(model.meta['training_rows'], 225)
+        self.assertEqual(model.feature_names, list('abcdefg'))
+
+        # Scoring the test rows again gives run_gbc's results
+        test = synthetic_dataset()
+        test.update(feature_names=list('abcdefg'))
+        scored = model.predict(test)
+        for row in results:
+            self.assertIn(list(row), scored.tolist())
+
+        # The compiled model scores the same
+        self.assertTrue(model.meta['compiled'])
+        compiled = artifact.load_model(self.root, 1, compiled=True)
+        self.assertEqual(compiled.predict(test).tolist(), scored.tolist())
+
+        test.update(feature_names=list('abcdefh'))
+        with self.assertRaises(ValueError):
+            model.predict(test)
+
+    def test_class_counts(self):
+        # Labels as in the meter targets: not 0 to n - 1, one past target_names
+        ds = synthetic_dataset()
+        ds.target = np.array([0, 3, 8, 100])[ds.target + (ds.data[:, 3] > 1)]
+        ds.update(name='Meters', feature_names=list('abcdefg'),
+                  target_names=['m{}'.format(i) for i in range(11)])
+        dataset.run_gbc(ds, 0, 10, 0.1, 2, None, 0, model_root=self.root)
+
+        for compiled in [False, True]:
+            model = artifact.load_model(self.root, compiled=compiled)
+            results = model.predict(ds)
+            self.assertEqual(results.shape[1], 2 + 7 + 1 + 4)
+            counts = model.class_counts(results)
+            self.assertEqual([name for name, _ in counts], ['m0', 'm3', 'm8', '100'])
+            expected = model.model.predict(ds.data)
+            self.assertEqual([count for _, count in counts],
+                             [int((expected == c).sum()) for c in [0, 3, 8, 100]])
+
+    def test_format_version(self):
+        dataset.run_gbc(self.ds, 0, 5, 0.1, 2, None, 0, model_root=self.root)
+        meta_file = os.path.join(self.root, '1', 'meta.json')
+        with open(meta_file) as f:
+            meta = json.load(f)
+        meta['format_version'] = artifact.FORMAT_VERSION + 1
+        with open(meta_file, 'w') as f:
+            json.dump(meta, f)
+        with self.assertRaises(ValueError):
+            artifact.load_model(self.root)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+import unittest
+import compiled
+import os
+import shutil
+import tempfile
+import numpy as np
+from sklearn.ensemble import GradientBoostingClassifier, HistGradientBoostingClassifier
+from sklearn.linear_model import LogisticRegression
+
+
+class CompiledTestCase(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.RandomState(0)
+        self.X = rng.randint(0, 8, size=(400, 5)) + rng.rand(400, 5) * 0.5
+        self.y = (self.X[:, 0] + self.X[:, 1] > 8).astype(int) + (self.X[:, 2] < 2)
+
+    def check(self, model, X=None):
+        X = self.X if X is None else X
+        c = compiled.export_ensemble(model)
+        self.assertTrue(np.array_equal(c.predict_proba(X), model.predict_proba(X)))
+        self.assertTrue(np.array_equal(c.predict(X), model.predict(X)))
+        return c
+
+    def test_gbc(self):
+        self.check(GradientBoostingClassifier(
+            n_estimators=30, max_depth=4, random_state=0).fit(self.X, self.y))
+        self.check(GradientBoostingClassifier(
+            n_estimators=30, max_features=2, init='zero', random_state=0).fit(self.X, self.y))
+
+    def test_binary(self):
+        y = self.y == 2
+        self.check(GradientBoostingClassifier(n_estimators=20, random_state=0).fit(self.X, y))
+        self.check(GradientBoostingClassifier(
+            n_estimators=20, loss='exponential', random_state=0).fit(self.X, y))
+        self.check(HistGradientBoostingClassifier(max_iter=20, random_state=0).fit(self.X, y))
+
+    def test_hist_gbc(self):
+        X = self.X.copy()
+        X[::5, 1] = np.nan
+        self.check(HistGradientBoostingClassifier(max_iter=30, random_state=0).fit(X, self.y), X)
+
+    def test_save_and_load(self):
+        c = self.check(GradientBoostingClassifier(
+            n_estimators=10, random_state=0).fit(self.X, self.y))
+        directory = tempfile.mkdtemp()
+        try:
+            path = os.path.join(directory, 'compiled.npz')
+            compiled.save_compiled(c, path)
+            loaded = compiled.load_compiled(path)
+            self.assertEqual(loaded.max_depth, c.max_depth)
+            self.assertTrue(np.array_equal(loaded.predict_proba(self.X), c.predict_proba(self.X)))
+        finally:
+            shutil.rmtree(directory)
+
+    def test_unsupported(self):
+        with self.assertRaises(ValueError):
+            compiled.export_ensemble(LogisticRegression().fit(self.X, self.y))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+import unittest
+import corpus
+import syllable
+import os
+import numpy as np
+
+
+def syllabify_line(words):
+    syls = []
+    for w in words:
+        syls.extend(syllable.Word(w).to_syllables())
+    return syllable.SyllabifiedLine(syls)
+
+
+class SyllableCorpusTestCase(unittest.TestCase):
+    def setUp(self):
+        self.lines = [
+            syllabify_line(['arma', 'virumque', 'cano']),
+            syllabify_line(['cui', 'dono', 'lepidum'])
+        ]
+        self.corpus = corpus.SyllableCorpus()
+        self.corpus.add_lines(self.lines)
+
+    def test_counts(self):
+        self.assertEqual(self.corpus.line_count(), 2)
+        self.assertEqual(self.corpus.word_count(), 6)
+        self.assertEqual(self.corpus.syllable_count(), 13)
+
+    def test_offsets(self):
+        self.assertEqual(list(self.corpus.line_offset_array()), [0, 7, 13])
+        self.assertEqual(list(self.corpus.word_offset_array()),
+                         [0, 2, 5, 7, 8, 10, 13])
+        self.assertEqual(list(self.corpus.line_numbers()), [0] * 7 + [1] * 6)
+
+    def test_add_after_reading_columns(self):
+        weights = self.corpus.column('nucleus_weight')
+        offsets = self.corpus.line_offset_array()
+        self.corpus.add_line(syllabify_line(['arma']))
+        self.corpus.add_words([syllable.Word('cano')])
+        self.corpus.weigh()
+        self.assertEqual(len(weights), 13)
+        self.assertEqual(list(offsets), [0, 7, 13])
+        self.assertEqual(list(self.corpus.line_offset_array()), [0, 7, 13, 15, 17])
+
+    def test_line_chars(self):
+        self.assertEqual(self.corpus.line_chars(1),
+                         ['cui', 'do', 'no', 'le', 'pi', 'dum'])
+
+    def test_features(self):
+        features = self.corpus.features()
+        self.assertEqual(features.shape, (13, len(corpus.FEATURE_NAMES)))
+        row = 0
+        for line in self.lines:
+            for syl in line.syllables:
+                self.assertEqual(
+                    list(features[row]),
+                    [syl.nucleus_weight(), syl.coda_weight(),
+                     syl.nucleus_class()] + list(syl.positions()))
+                row += 1
+
+
+class WeighedCorpusTestCase(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        repo = os.path.join(os.path.dirname(os.path.realpath(__file__)), '..', '..')
+        cls.text_file = os.path.join(repo, 'texts/latin/472/1/1.txt')
+        cls.scan_file = os.path.join(
+            repo, 'datasets/syllabifications/472/1/1.txt.syl.csv')
+
+    def setUp(self):
+        self.corpus = corpus.corpus_from_text(self.text_file)
+        self.reference = corpus.SyllableCorpus()
+        for line in syllable.Words(self.text_file).lines():
+            syls = []
+            for w in line:
+                syls.extend(w.to_syllables())
+            self.reference.add_line(syllable.SyllabifiedLine(syls))
+
+    def test_matches_syllabified_lines(self):
+        for name in corpus.COLUMNS:
+            np.testing.assert_array_equal(
+                self.corpus.column(name), self.reference.column(name), name)
+
+    def test_matches_scan(self):
+        definite_longs = (self.corpus.column('nucleus_weight') >= 2) \
+            | (self.corpus.column('coda_weight') >= 2)
+        offsets = self.corpus.line_offset_array()
+        with open(self.scan_file) as f:
+            for lineno, l in enumerate(f.read().splitlines()):
+                marks = definite_longs[offsets[lineno]:offsets[lineno + 1]]
+                self.assertEqual([int(v) for v in l.split(',')[2:]],
+                                 [2 if m else 0 for m in marks])
+
+
+if __name__ == '__main__':
+    unittest.main()
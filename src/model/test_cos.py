@@ -0,0 +1,297 @@
+import unittest
+import cos
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import types
+from datetime import datetime, timezone
+from unittest import mock
+
+
+#
+# A directory-backed stand-in for an ibm_boto3 S3 resource: each bucket is
+# a subdirectory of root, and each object a file in it.
+#
+
+class DirectoryBucket:
+    def __init__(self, path):
+        self.path = path
+
+    def download_file(self, Key=None, Filename=None):
+        shutil.copyfile(os.path.join(self.path, Key), Filename)
+
+    def upload_file(self, Filename=None, Key=None):
+        shutil.copyfile(Filename, os.path.join(self.path, Key))
+
+
+class DirectoryClient:
+    def __init__(self, root):
+        self.root = root
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    def _path(self, bucket, key):
+        return os.path.join(self.root, bucket, *key.split('/'))
+
+    def _transfer(self, src, dst):
+        with self.lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            os.makedirs(os.path.dirname(dst), exist_ok=True)
+            shutil.copyfile(src, dst)
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+
+    def upload_file(self, Filename=None, Bucket=None, Key=None):
+        self._transfer(Filename, self._path(Bucket, Key))
+
+    def download_file(self, Bucket=None, Key=None, Filename=None):
+        self._transfer(self._path(Bucket, Key), Filename)
+
+    def list_objects_v2(self, Bucket=None, Prefix='', MaxKeys=1000,
+                        ContinuationToken=None):
+        directory = os.path.join(self.root, Bucket)
+        keys = []
+        for root, _, names in os.walk(directory):
+            for name in names:
+                key = os.path.relpath(os.path.join(root, name), directory)
+                keys.append(key.replace(os.sep, '/'))
+        keys = sorted(k for k in keys if k.startswith(Prefix))
+        start = int(ContinuationToken or 0)
+        page = keys[start:start + MaxKeys]
+        contents = []
+        for key in page:
+            st = os.stat(self._path(Bucket, key))
+            contents.append({
+                'Key': key,
+                'Size': st.st_size,
+                'ETag': '"{}-{}"'.format(st.st_size, st.st_mtime_ns),
+                'LastModified': datetime.fromtimestamp(st.st_mtime, timezone.utc)
+            })
+        response = {'Contents': contents,
+                    'IsTruncated': start + MaxKeys < len(keys)}
+        if response['IsTruncated']:
+            response['NextContinuationToken'] = str(start + MaxKeys)
+        return response
+
+
+class DirectoryResource:
+    def __init__(self, root):
+        self.root = root
+        self.buckets = 0
+        self.meta = types.SimpleNamespace(client=DirectoryClient(root))
+
+    def Bucket(self, name):
+        self.buckets += 1
+        path = os.path.join(self.root, name)
+        os.makedirs(path, exist_ok=True)
+        return DirectoryBucket(path)
+
+
+class CloudObjectStorageTestCase(unittest.TestCase):
+    def setUp(self):
+        self.store = tempfile.mkdtemp()
+        self.local = tempfile.mkdtemp()
+        self.resource = DirectoryResource(self.store)
+        self.cos = cos.CloudObjectStorage(resource=self.resource)
+
+    def tearDown(self):
+        shutil.rmtree(self.store)
+        shutil.rmtree(self.local)
+
+    def local_file(self, name, content=None):
+        path = os.path.join(self.local, name)
+        if content is not None:
+            with open(path, 'w') as f:
+                f.write(content)
+        return path
+
+    def test_put_and_get(self):
+        path = self.local_file('1.text', 'arma virumque cano\n')
+        self.cos.put_text(bucket_name='texts', file=path)
+        os.remove(path)
+        self.cos.get_text(bucket_name='texts', file=path)
+        with open(path) as f:
+            self.assertEqual(f.read(), 'arma virumque cano\n')
+        # One bucket object, reused by every transfer
+        self.assertEqual(self.resource.buckets, 1)
+
+    def test_resource_built_once(self):
+        built = []
+        store = self.store
+
+        class Session:
+            def __init__(self, **kwargs):
+                self.kwargs = kwargs
+
+            def resource(self, **kwargs):
+                built.append((self.kwargs, kwargs))
+                return DirectoryResource(store)
+
+        modules = {
+            'ibm_boto3': types.ModuleType('ibm_boto3'),
+            'ibm_boto3.session': types.SimpleNamespace(Session=Session),
+            'ibm_botocore': types.ModuleType('ibm_botocore'),
+            'ibm_botocore.client': types.SimpleNamespace(Config=dict)
+        }
+        with mock.patch.dict(sys.modules, modules):
+            client = cos.CloudObjectStorage(api_key='key', instance_id='id',
+                                            max_pool_connections=4)
+            self.assertEqual(built, [])
+            client.put_text(bucket_name='texts', file=self.local_file('a.text', 'a'))
+            client.put_text(bucket_name='texts', file=self.local_file('b.text', 'b'))
+            client.get_text(bucket_name='texts', file=self.local_file('a.text'))
+            client.get_text(bucket_name='texts', file=self.local_file('b.text'))
+        self.assertEqual(len(built), 1)
+        session_args, resource_args = built[0]
+        self.assertEqual(session_args['ibm_api_key_id'], 'key')
+        self.assertEqual(resource_args['config']['max_pool_connections'], 4)
+
+
+class BulkTransferTestCase(unittest.TestCase):
+    def setUp(self):
+        self.store = tempfile.mkdtemp()
+        self.local = tempfile.mkdtemp()
+        self.resource = DirectoryResource(self.store)
+        self.cos = cos.CloudObjectStorage(resource=self.resource)
+        self.files = {}
+        for i in range(20):
+            key = '{}/{}.text'.format(i % 3, i)
+            self.files[key] = 'line {}\n'.format(i) * (i + 1)
+            path = os.path.join(self.local, *key.split('/'))
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'w') as f:
+                f.write(self.files[key])
+
+    def tearDown(self):
+        shutil.rmtree(self.store)
+        shutil.rmtree(self.local)
+
+    def test_list_objects_pages(self):
+        self.cos.sync(bucket_name='texts', directory=self.local)
+        keys = [o['Key'] for o in self.cos.list_objects('texts', page_size=3)]
+        self.assertEqual(keys, sorted(self.files))
+        self.assertEqual([o['Key'] for o in self.cos.list_objects('texts', prefix='1/')],
+                         sorted(k for k in self.files if k.startswith('1/')))
+
+    def test_sync(self):
+        progress = []
+        report = self.cos.sync(bucket_name='texts', directory=self.local,
+                               workers=4, max_in_flight=3,
+                               progress=lambda r: progress.append(r.done))
+        self.assertEqual((report.done, report.total, report.failures), (20, 20, []))
+        self.assertEqual(report.bytes, sum(len(c) for c in self.files.values()))
+        self.assertEqual(sorted(progress), list(range(1, 21)))
+        self.assertLessEqual(self.resource.meta.client.max_in_flight, 3)
+
+        # Nothing left to upload; one changed file is
+        self.assertEqual(self.cos.sync(bucket_name='texts', directory=self.local).total, 0)
+        with open(os.path.join(self.local, '0', '3.text'), 'a') as f:
+            f.write('more\n')
+        self.assertEqual(self.cos.sync(bucket_name='texts', directory=self.local).total, 1)
+
+        # Down into an empty directory, after which nothing needs uploading
+        copy = tempfile.mkdtemp()
+        try:
+            report = self.cos.sync(bucket_name='texts', directory=copy, direction='down')
+            self.assertEqual(report.done, 20)
+            with open(os.path.join(copy, '2', '5.text')) as f:
+                self.assertEqual(f.read(), self.files['2/5.text'])
+            self.assertEqual(self.cos.sync(bucket_name='texts', directory=copy).total, 0)
+        finally:
+            shutil.rmtree(copy)
+
+    def test_retries(self):
+        client = self.resource.meta.client
+        upload = client.upload_file
+        failures = {'0/0.text': 2, '1/1.text': 10}
+
+        def flaky_upload(Filename=None, Bucket=None, Key=None):
+            with client.lock:
+                if failures.get(Key):
+                    failures[Key] -= 1
+                    raise ConnectionError(Key)
+            upload(Filename=Filename, Bucket=Bucket, Key=Key)
+
+        client.upload_file = flaky_upload
+        report = self.cos.sync(bucket_name='texts', directory=self.local,
+                               retries=3, backoff=0)
+        self.assertEqual(report.done, 19)
+        self.assertEqual(report.retries, 2 + 3)
+        self.assertEqual([job[1] for job, _ in report.failures], ['1/1.text'])
+
+    def test_no_retry_of_local_errors(self):
+        missing = os.path.join(self.local, 'missing.text')
+        report = self.cos.upload_many(bucket_name='texts', files=[missing],
+                                      retries=3, backoff=10)
+        self.assertEqual(report.retries, 0)
+        self.assertIsInstance(report.failures[0][1], FileNotFoundError)
+        self.assertFalse(cos.is_transient(PermissionError('texts')))
+        self.assertTrue(cos.is_transient(TimeoutError('texts')))
+
+
+class BucketWatcherTestCase(unittest.TestCase):
+    def setUp(self):
+        self.store = tempfile.mkdtemp()
+        self.bucket = os.path.join(self.store, 'texts')
+        os.makedirs(self.bucket)
+        self.state_file = os.path.join(self.store, 'state.json')
+        self.cos = cos.CloudObjectStorage(resource=DirectoryResource(self.store))
+        for name in ['1.text', '2.text', '3.text', '1.syl.csv']:
+            self.write(name, name)
+
+    def tearDown(self):
+        shutil.rmtree(self.store)
+
+    def write(self, name, content):
+        with open(os.path.join(self.bucket, name), 'w') as f:
+            f.write(content)
+
+    def changed_keys(self):
+        watcher = self.cos.watcher('texts', self.state_file, page_size=2)
+        return [o['Key'] for o in watcher.changes()]
+
+    def test_changes(self):
+        self.assertEqual(self.changed_keys(), ['1.text', '2.text', '3.text'])
+        self.assertEqual(self.changed_keys(), [])
+        self.write('2.text', 'changed')
+        self.write('4.text', 'new')
+        self.assertEqual(self.changed_keys(), ['2.text', '4.text'])
+        self.assertEqual(self.changed_keys(), [])
+
+    def test_forgets_deleted(self):
+        self.changed_keys()
+        os.remove(os.path.join(self.bucket, '3.text'))
+        self.assertEqual(self.changed_keys(), [])
+        self.write('3.text', '3.text')
+        self.assertEqual(self.changed_keys(), ['3.text'])
+
+    def test_interrupted(self):
+        watcher = self.cos.watcher('texts', self.state_file)
+        changes = watcher.changes()
+        self.assertEqual(next(changes)['Key'], '1.text')
+        self.assertEqual(next(changes)['Key'], '2.text')
+        # 2.text was not finished with
+        changes.close()
+        self.assertEqual(self.changed_keys(), ['2.text', '3.text'])
+
+    def test_retry(self):
+        watcher = self.cos.watcher('texts', self.state_file)
+        for obj in watcher.changes():
+            if obj['Key'] == '2.text':
+                watcher.retry(obj['Key'])
+        self.assertEqual(self.changed_keys(), ['2.text'])
+        self.assertEqual(self.changed_keys(), [])
+
+    def test_poll(self):
+        watcher = self.cos.watcher('texts', self.state_file)
+        self.assertEqual(len(list(watcher.poll(interval=0, rounds=2))), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+import unittest
+import io
+import crossval
+import numpy as np
+from test_dataset import synthetic_dataset
+
+
+class GroupTestCase(unittest.TestCase):
+    def test_groups(self):
+        raw = np.array([['1', 'a'], ['1', 'b'], ['2', 'c'], ['1', 'd'], ['3', 'e']])
+        self.assertEqual(list(crossval.line_groups(raw)), [1, 1, 2, 1, 3])
+        self.assertEqual(list(crossval.poem_groups(raw)), [0, 0, 0, 1, 1])
+
+    def test_groups_of(self):
+        # Meter data: a row per poem, numbered from the first
+        raw = np.array([[str(i), 'poem'] for i in range(1, 8)])
+        self.assertEqual(len(crossval.groups_of(raw, 'line', 5)), 7)
+        with self.assertRaisesRegex(ValueError, 'grouped by poem into 5 folds'):
+            crossval.groups_of(raw, 'poem', 5)
+        ds = synthetic_dataset()
+        with self.assertRaisesRegex(ValueError, 'only 1 poem'):
+            crossval.cross_validate(ds, 2, group_by='poem', jobs=1)
+
+    def test_fold_assignments(self):
+        groups = np.repeat(np.arange(12), [5, 1, 4, 2, 3, 3, 2, 4, 1, 5, 3, 3])
+        folds = crossval.fold_assignments(groups, 3)
+        self.assertEqual(sorted(np.bincount(folds)), [12, 12, 12])
+        for g in np.unique(groups):
+            self.assertEqual(len(np.unique(folds[groups == g])), 1)
+        with self.assertRaises(ValueError):
+            crossval.fold_assignments(groups, 13)
+
+
+class BinTestCase(unittest.TestCase):
+    def test_bin_features(self):
+        X = np.array([[0.0, 5.0], [2.0, np.nan], [1.0, 5.0], [2.0, 7.0]])
+        binned, edges = crossval.bin_features(X)
+        self.assertEqual(binned.dtype, np.uint8)
+        self.assertEqual(binned[:, 0].tolist(), [0, 2, 1, 2])
+        self.assertEqual(binned[:, 1].tolist(), [0, 2, 0, 1])
+        self.assertEqual(edges[0].tolist(), [0.5, 1.5])
+
+    def test_many_values(self):
+        X = np.arange(1000, dtype=float)[:, None]
+        binned, edges = crossval.bin_features(X, max_bins=16)
+        self.assertEqual(len(np.unique(binned)), 16)
+        self.assertTrue((np.diff(binned[:, 0].astype(int)) >= 0).all())
+        with self.assertRaises(ValueError):
+            crossval.bin_features(X, max_bins=256)
+
+
+class CrossValidateTestCase(unittest.TestCase):
+    def test_cross_validate(self):
+        ds = synthetic_dataset()
+        config = {'n_estimators': 10, 'max_depth': 2}
+        rows = list(crossval.cross_validate(ds, 3, jobs=2, config=config))
+        self.assertEqual([r['fold'] for r in rows], [0, 1, 2])
+        self.assertEqual(sum(r['test_rows'] for r in rows), 300)
+        self.assertEqual(sum(r['test_groups'] for r in rows), 30)
+        for r in rows:
+            self.assertGreater(r['test_score'], 0.8)
+
+        # Binning these features loses nothing
+        binned, _ = crossval.bin_features(ds.data)
+        again = list(crossval.cross_validate(ds, 3, jobs=1, config=config,
+                                             binned=binned))
+        self.assertEqual([r['test_score'] for r in again],
+                         [r['test_score'] for r in rows])
+
+        summary = crossval.summarize(rows)
+        self.assertEqual(summary['folds'], 3)
+        self.assertAlmostEqual(summary['mean_test_score'],
+                               np.mean([r['test_score'] for r in rows]))
+
+        out = io.StringIO()
+        crossval.write_results(rows, out)
+        lines = out.getvalue().splitlines()
+        self.assertEqual(lines[0].split(','), crossval.RESULT_FIELDS)
+        self.assertEqual(len(lines), 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
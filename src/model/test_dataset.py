@@ -0,0 +1,74 @@
+import unittest
+import corpus
+import dataset
+import os
+import pipeline
+import shutil
+import tempfile
+import numpy as np
+from sklearn.ensemble import GradientBoostingClassifier, HistGradientBoostingClassifier
+from sklearn.utils import Bunch
+
+
+def synthetic_dataset(n=300, seed=0):
+    rng = np.random.RandomState(seed)
+    data = rng.randint(0, 4, size=(n, 7)).astype(float)
+    target = np.where(data[:, 0] + data[:, 1] >= 3, 2, 1)
+    target[data[:, 2] == 0] = 0
+    raw = np.column_stack([np.arange(n) // 10, ['syl'] * n])
+    return Bunch(data=data, target=target, raw=raw)
+
+
+class BackendTestCase(unittest.TestCase):
+    def test_make_classifier(self):
+        gbc = dataset.make_classifier('gbc', 7, 50, 0.2, 3, 5, 0)
+        self.assertIsInstance(gbc, GradientBoostingClassifier)
+        self.assertEqual(gbc.max_features, 5)
+
+        hist = dataset.make_classifier('hist', 7, 50, 0.2, 3, 7, 0,
+                                       n_iter_no_change=3)
+        self.assertIsInstance(hist, HistGradientBoostingClassifier)
+        self.assertEqual(hist.max_iter, 50)
+        self.assertEqual(hist.max_features, 1.0)
+        self.assertTrue(hist.early_stopping)
+        self.assertEqual(hist.n_iter_no_change, 3)
+
+        with self.assertRaises(ValueError):
+            dataset.make_classifier('xgb', 7, 50, 0.2, 3, 7, 0)
+
+    def test_run_gbc(self):
+        ds = synthetic_dataset()
+        for backend in ['gbc', 'hist']:
+            train_score, test_score, results = dataset.run_gbc(
+                ds, 0, 50, 0.1, 3, 7, 0, backend=backend)
+            self.assertGreater(test_score, 0.9)
+            # raw, data, prediction and a probability per class
+            self.assertEqual(results.shape, (75, 2 + 7 + 1 + 3))
+
+
+class CorpusDatasetTestCase(unittest.TestCase):
+    def setUp(self):
+        repo = os.path.join(os.path.dirname(os.path.realpath(__file__)), '..', '..')
+        self.text_file = os.path.join(repo, 'texts/latin/472/1/1.txt')
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    # The dataset of a corpus is that of the .syl.csv file of the same text
+    def test_load_latin_scansion_corpus(self):
+        data_file = os.path.join(self.directory, '1.syl.csv')
+        pipeline.write_syllabified(pipeline.syllabify_words(self.text_file),
+                                   os.path.join(self.directory, '1.syl'), data_file)
+        expected = dataset.load_latin_scansion_dataset(data_file, cache=False)
+
+        ds = dataset.load_latin_scansion_corpus(corpus.corpus_from_text(self.text_file))
+        self.assertEqual(ds.name, expected.name)
+        self.assertEqual(ds.feature_names, expected.feature_names)
+        np.testing.assert_array_equal(ds.data, expected.data)
+        np.testing.assert_array_equal(ds.raw, expected.raw)
+        self.assertNotIn('target', ds)
+
+
+if __name__ == '__main__':
+    unittest.main()
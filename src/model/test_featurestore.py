@@ -0,0 +1,78 @@
+import unittest
+import featurestore
+import os
+import shutil
+import tempfile
+from unittest import mock
+import numpy as np
+
+
+class CachedArraysTestCase(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.source = os.path.join(self.dir, 'data.csv')
+        self.write_source('1,2\n3,4\n')
+        self.parses = 0
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def write_source(self, contents, mtime_ns=None):
+        with open(self.source, 'w') as f:
+            f.write(contents)
+        if mtime_ns is not None:
+            os.utime(self.source, ns=(mtime_ns, mtime_ns))
+
+    def parse(self, path):
+        self.parses += 1
+        with open(path) as f:
+            rows = [[int(v) for v in l.split(',')] for l in f.read().splitlines()]
+        return {'data': np.array(rows)}
+
+    def load(self):
+        return featurestore.cached_arrays(self.source, 'test', self.parse)
+
+    def test_sidecar_reused(self):
+        first = self.load()
+        second = self.load()
+        self.assertEqual(self.parses, 1)
+        self.assertIsInstance(second['data'], np.memmap)
+        np.testing.assert_array_equal(first['data'], second['data'])
+
+    def test_changed_source_reparsed(self):
+        self.load()
+        old = self.load()['data']
+        self.write_source('5,6\n7,8\n9,0\n')
+        data = self.load()['data']
+        self.assertEqual(self.parses, 2)
+        self.assertEqual(data.shape, (3, 2))
+        # The new sidecar replaces the old one's files rather than rewriting
+        # them, so a memory map of the old one still sees the old data
+        self.assertEqual(old.tolist(), [[1, 2], [3, 4]])
+        self.assertEqual(sorted(os.listdir(featurestore.sidecar_dir(self.source, 'test'))),
+                         ['data.npy', 'meta.json'])
+
+    def test_touched_source_matched_by_hash(self):
+        self.load()
+        self.write_source('1,2\n3,4\n', mtime_ns=10 ** 18)
+        self.load()
+        self.load()
+        self.assertEqual(self.parses, 1)
+
+
+    # A failed write raises its own error, leaving no temporary file behind
+    def test_failed_write(self):
+        directory = featurestore.sidecar_dir(self.source, 'test')
+        arrays = {'data': np.arange(3)}
+        with mock.patch('featurestore.np.save', side_effect=ValueError('full')):
+            with self.assertRaisesRegex(ValueError, 'full'):
+                featurestore._write_sidecar(directory, {}, arrays)
+        with mock.patch('featurestore.open', side_effect=PermissionError('denied'),
+                        create=True):
+            with self.assertRaises(PermissionError):
+                featurestore._write_sidecar(directory, {}, arrays)
+        self.assertEqual(os.listdir(directory), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
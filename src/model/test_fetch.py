@@ -0,0 +1,120 @@
+import unittest
+import fetch
+import functools
+import os
+import shutil
+import tempfile
+import threading
+import time
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from text import Text, tokenized_lines
+
+FIXTURES = os.path.join(os.path.dirname(__file__), 'fixtures')
+
+
+class QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+# Times out on chapter 2 and drops the connection on chapter 10
+class FailingHandler(QuietHandler):
+    def do_GET(self):
+        if self.path.endswith('/2.txt'):
+            time.sleep(0.5)
+        elif self.path.endswith('/10.txt'):
+            self.close_connection = True
+            return
+        super().do_GET()
+
+
+class FetchTestCase(unittest.TestCase):
+    CHAPTERS = {
+        '1': 'Arma virumque cano, Troiae qui primus ab oris\n'
+             'Italiam, fato profugus, Laviniaque venit\n',
+        '2': 'litora, multum ille et terris iactatus et alto\n',
+        '10': '\'at certe tamen,\' inquiunt\n\n1 2 3\n',
+    }
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        work = os.path.join(self.root, '690', '3')
+        os.makedirs(work)
+        for chapter, content in self.CHAPTERS.items():
+            with open(os.path.join(work, chapter + '.txt'), 'w') as f:
+                f.write(content)
+        with open(os.path.join(work, 'notes.html'), 'w') as f:
+            f.write('<p>not a chapter</p>')
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def expected(self, chapter):
+        with open(os.path.join(self.root, '690', '3', chapter + '.txt')) as f:
+            return Text(f).lines
+
+    def check_source(self, base):
+        with fetch.TextFetcher(base, concurrency=2) as fetcher:
+            self.assertEqual(fetcher.chapters('690', '3'), ['1', '2', '10'])
+            self.assertEqual(fetcher.chapters('690', '4'), [])
+
+        chapters = fetch.fetch_work(base, '690', '3', concurrency=2)
+        self.assertEqual([c for c, _ in chapters], ['1', '2', '10'])
+        for chapter, word_lists in chapters:
+            self.assertEqual(word_lists, self.expected(chapter))
+
+        self.assertEqual(fetch.fetch_work(base, '690', '3', ['2', '3']),
+                         [('2', self.expected('2')), ('3', None)])
+
+    def test_directory(self):
+        self.check_source(self.root)
+
+    def serve(self, handler):
+        server = ThreadingHTTPServer(
+            ('127.0.0.1', 0), functools.partial(handler, directory=self.root))
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        return 'http://127.0.0.1:{}/'.format(server.server_port)
+
+    def test_server(self):
+        self.check_source(self.serve(QuietHandler))
+
+    def test_failing_chapters(self):
+        base = self.serve(FailingHandler)
+        self.assertEqual(fetch.fetch_work(base, '690', '3', timeout=0.1),
+                         [('1', self.expected('1')), ('2', None), ('10', None)])
+
+
+class PackhumTestCase(unittest.TestCase):
+    def setUp(self):
+        with open(os.path.join(FIXTURES, 'packhum-472-1-1.html')) as f:
+            self.html = f.read()
+
+    def test_lines(self):
+        lines = list(fetch.packhum_lines([self.html]))
+        self.assertEqual(len(lines), 11)
+        self.assertEqual(lines[0], 'Cui dono lepidum novum libellum')
+        self.assertEqual(lines[8], 'qualecumque; quod, <o> patrona virgo,')
+        self.assertEqual(lines[10], 'V\u0101le')
+        self.assertEqual(next(tokenized_lines(lines)),
+                         ['Cui', 'dono', 'lepidum', 'novum', 'libellum'])
+
+    def test_chunks(self):
+        # The same lines however the page is split
+        expected = list(fetch.packhum_lines([self.html]))
+        for size in [1, 2, 3, 7, 64, 1000]:
+            chunks = [self.html[i:i + size]
+                      for i in range(0, len(self.html), size)]
+            self.assertEqual(list(fetch.packhum_lines(chunks)), expected)
+
+    def test_incremental(self):
+        parser = fetch.PackhumHTMLParser()
+        parser.feed(self.html[:self.html.index('arido')])
+        self.assertEqual(list(parser.lines()),
+                         ['Cui dono lepidum novum libellum'])
+
+
+if __name__ == '__main__':
+    unittest.main()
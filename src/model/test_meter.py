@@ -0,0 +1,100 @@
+import unittest
+import meter
+import os
+import tempfile
+
+
+class DactyllicHexameterTestCase(unittest.TestCase):
+    def setUp(self):
+        self.meter = meter.DactyllicHexameter()
+
+    def test_patterns(self):
+        self.assertEqual(len(self.meter.patterns()), 64)
+
+    def test_automaton(self):
+        slots = self.meter.automaton()
+        self.assertEqual(len(slots), 6)
+        self.assertEqual(slots[0], (((2, 1, 1), 3, 0b001), ((2, 2), 2, 0b11)))
+        self.assertIs(slots, meter.DactyllicHexameter().automaton())
+
+    def test_candidate_count(self):
+        unknown = [0] * 14
+        self.assertEqual(self.meter.candidate_count(unknown),
+                         len(self.meter.candidates(unknown)))
+
+    def test_candidates(self):
+        # Arma virumque cano, Troiae qui primus ab oris
+        line = [2, 1, 1, 2, 1, 1, 2, 2, 2, 2, 2, 1, 1, 2, 2]
+        self.assertEqual(self.meter.candidates(line), [line])
+        unknown = [0] * 15
+        self.assertEqual(len(self.meter.candidates(unknown)), 20)
+
+
+class LongMeter(meter.BaseMeter):
+    def __init__(self):
+        super().__init__()
+        self.feet = [[meter.DACTYL, meter.SPONDEE]] * 30
+
+
+class LongMeterTestCase(unittest.TestCase):
+    def setUp(self):
+        self.meter = LongMeter()
+
+    def test_candidate_count(self):
+        # 15 dactyls and 15 spondees, in any order
+        self.assertEqual(self.meter.candidate_count([0] * 75), 155117520)
+
+    def test_iter_candidates(self):
+        first = next(self.meter.iter_candidates([0] * 75))
+        self.assertEqual(first, meter.DACTYL * 15 + meter.SPONDEE * 15)
+
+
+class NonStrictCandidatesTestCase(unittest.TestCase):
+    def setUp(self):
+        self.meter = meter.Hendecasyllabics()
+
+    def test_short_may_scan_long(self):
+        line = [1, 1, 2, 1, 1, 2, 1, 2, 1, 2, 2]
+        self.assertEqual(len(self.meter.candidates(line)), 0)
+        self.assertEqual(len(self.meter.candidates(line, strict=False)), 3)
+
+
+class SurveyTestCase(unittest.TestCase):
+    def setUp(self):
+        self.lines = [
+            [2, 1, 1, 2, 1, 1, 2, 2, 2, 2, 2, 1, 1, 2, 2],
+            [0] * 11,
+            [1, 1, 2, 1, 1, 2, 1, 2, 1, 2, 2],
+            []
+        ]
+        fd, self.scan_file = tempfile.mkstemp(suffix='.csv')
+        with os.fdopen(fd, 'w') as f:
+            for lineno, l in enumerate(self.lines):
+                f.write('{}\n'.format(
+                    ','.join(str(v) for v in [lineno + 1, len(l)] + l)))
+
+    def tearDown(self):
+        os.remove(self.scan_file)
+
+    def test_load_scan_matrix(self):
+        linenos, counts, matrix = meter.load_scan_matrix(self.scan_file)
+        self.assertEqual(list(linenos), [1, 2, 3, 4])
+        self.assertEqual(list(counts), [15, 11, 11, 0])
+        self.assertEqual(matrix.shape, (4, 15))
+        self.assertEqual(list(matrix[2, :11]), self.lines[2])
+        self.assertEqual(list(matrix[2, 11:]), [0] * 4)
+
+    def test_survey(self):
+        _, counts, matrix = meter.load_scan_matrix(self.scan_file)
+        names = ['DactyllicHexameter', 'Hendecasyllabics', 'Glyconic']
+        for strict in (True, False):
+            result = meter.survey(counts, matrix, names, strict)
+            for row, l in enumerate(self.lines):
+                for col, mn in enumerate(names):
+                    self.assertEqual(
+                        result[row, col],
+                        meter.get_meter(mn).candidate_count(l, strict))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,95 @@
+import unittest
+import cos
+import pipeline
+import io
+import itertools
+import os
+import shutil
+import tempfile
+from test_cos import DirectoryResource
+
+
+class PipelineTestCase(unittest.TestCase):
+    def setUp(self):
+        self.raw = 'Arma virumque cano, Troiae qui primus ab oris\n' \
+            '\n' \
+            'Italiam, fato profugus, Laviniaque venit\n'
+
+    def test_text_words(self):
+        self.assertEqual(
+            list(pipeline.text_words(io.StringIO(self.raw))),
+            [['Arma', 'virumque', 'cano', 'Troiae', 'qui', 'primus', 'ab', 'oris'],
+             ['Italiam', 'fato', 'profugus', 'Laviniaque', 'venit']])
+
+    def test_text_line(self):
+        self.assertEqual(pipeline.text_line(['Arma', 'virumque', 'cano']),
+                         '[\'Arma\', \'virumque\', \'cano\']')
+
+    def test_matches_text_file(self):
+        text_file = io.StringIO()
+        pipeline.write_text(pipeline.text_words(io.StringIO(self.raw)), text_file)
+        text_file.seek(0)
+        from_file = list(pipeline.syllabify_words(text_file))
+        end_to_end = list(pipeline.syllabify_text(io.StringIO(self.raw)))
+        self.assertEqual([l.string() for l in end_to_end],
+                         [l.string() for l in from_file])
+        self.assertEqual(list(pipeline.feature_rows(end_to_end)),
+                         list(pipeline.feature_rows(from_file)))
+
+    def test_feature_rows(self):
+        rows = list(pipeline.feature_rows(
+            pipeline.syllabify_text(io.StringIO('arma virumque cano\n'))))
+        self.assertEqual([r[1] for r in rows],
+                         ['ar', 'ma', 'vi', 'rum', 'que', 'ca', 'no'])
+        self.assertEqual(rows[0][0], 0)
+        self.assertEqual(rows[0][5:], (0, 1, 0, 6))
+
+    def test_write_syllabified(self):
+        syllabified = list(pipeline.syllabify_text(io.StringIO(self.raw)))
+        out, data = io.StringIO(), io.StringIO()
+        pipeline.write_syllabified(iter(syllabified), out, data, scan=True)
+        self.assertEqual(out.getvalue(), ''.join(l.string() for l in syllabified))
+        rows = data.getvalue().splitlines()
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(rows[0].split(',')[:2], ['1', '16'])
+
+    def test_lazy(self):
+        # An endless text is processed a line at a time
+        lines = itertools.repeat('arma virumque cano\n')
+        syllabified = pipeline.syllabified_lines(pipeline.word_lines(
+            ' '.join(words) for words in pipeline.text_words(lines)))
+        first = list(itertools.islice(syllabified, 3))
+        self.assertEqual([len(l.syllables) for l in first], [7, 7, 7])
+
+
+
+class SyllabifyObjectTestCase(unittest.TestCase):
+    def setUp(self):
+        self.store = tempfile.mkdtemp()
+        self.local = tempfile.mkdtemp()
+        self.storage = cos.CloudObjectStorage(resource=DirectoryResource(self.store))
+        os.makedirs(os.path.join(self.store, 'texts', '472', '1'))
+        with open(os.path.join(self.store, 'texts', '472', '1', 'x.text'), 'w') as f:
+            pipeline.write_text([['arma', 'virumque', 'cano']], f)
+
+    def tearDown(self):
+        shutil.rmtree(self.store)
+        shutil.rmtree(self.local)
+
+    # Keys with a prefix are fetched and stored under that prefix
+    def test_prefixed_key(self):
+        self.assertEqual(pipeline.syllabify_object(
+            self.storage, 'texts', '472/1/x.text', self.local), [])
+        stored = sorted(os.listdir(os.path.join(self.store, 'texts', '472', '1')))
+        self.assertEqual(stored, ['x.syl', 'x.syl.csv', 'x.text'])
+        with open(os.path.join(self.store, 'texts', '472', '1', 'x.syl.csv')) as f:
+            self.assertEqual(len(f.read().splitlines()), 7)
+
+    def test_missing_key(self):
+        failures = pipeline.syllabify_object(
+            self.storage, 'texts', '472/1/y.text', self.local)
+        self.assertEqual([key for key, _ in failures], ['472/1/y.text'])
+
+
+if __name__ == '__main__':
+    unittest.main()
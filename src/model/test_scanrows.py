@@ -0,0 +1,81 @@
+import unittest
+import scanrows
+import text
+import os
+import tempfile
+import numpy as np
+
+
+class ScanRowsTestCase(unittest.TestCase):
+    def setUp(self):
+        # Rows of two lines, not in line order (as in scan_syllables output)
+        self.csv_rows = [
+            '2,cu,1,0,0,0,1,0,2,1,0.0,0.9,0.1',
+            '1,ar,1,1,1,0,1,0,1,2,0.0,0.2,0.8',
+            '2,ī,2,0,1,1,0,1,1,2,0.0,0.3,0.7',
+            '1,ma,1,0,0,1,0,1,0,1,0.0,0.6,0.4',
+            '2,dum,1,1,0,0,0,2,0,2,0.1,0.1,0.8'
+        ]
+        fd, self.csv_file = tempfile.mkstemp(suffix='.csv')
+        with os.fdopen(fd, 'w') as f:
+            f.write('\n'.join(self.csv_rows) + '\n')
+        self.rows_file = self.csv_file + '.rows'
+        self.count = scanrows.convert_csv(self.csv_file, self.rows_file,
+                                          batch_size=2)
+
+    def tearDown(self):
+        os.remove(self.csv_file)
+        os.remove(self.rows_file)
+
+    def test_rows(self):
+        self.assertEqual(self.count, 5)
+        self.assertTrue(scanrows.is_rows_file(self.rows_file))
+        self.assertFalse(scanrows.is_rows_file(self.csv_file))
+        rows = scanrows.open_rows(self.rows_file)
+        self.assertEqual(len(rows), 5)
+        self.assertEqual(list(rows.line), [2, 1, 2, 1, 2])
+        self.assertEqual([rows.chars_at(i) for i in range(5)],
+                         ['cu', 'ar', 'ī', 'ma', 'dum'])
+        self.assertIsInstance(rows.features, np.memmap)
+        self.assertEqual(list(rows.features[2]), [2, 0, 1, 1, 0, 1, 1])
+        self.assertEqual(list(rows.quantity), [1, 2, 2, 1, 2])
+        self.assertAlmostEqual(float(rows.probabilities[4, 2]), 0.8, places=6)
+        self.assertEqual(rows.line_numbers(), [1, 2])
+        self.assertEqual(list(rows.line_rows(2)), [0, 2, 4])
+        with self.assertRaises(KeyError):
+            rows.line_rows(3)
+
+    def test_chars_array(self):
+        rows = scanrows.open_rows(self.rows_file)
+        expected = [rows.chars_at(i) for i in range(5)]
+        self.assertEqual(rows.chars_array().tolist(), expected)
+        self.assertEqual(rows.chars_array(block_size=2).tolist(), expected)
+
+    def test_long_syllable(self):
+        writer = scanrows.RowsWriter(self.rows_file + '.long')
+        with self.assertRaises(ValueError):
+            writer.append([1, 1], ['ar', 'm' * 256], np.zeros((2, 7)))
+        writer.append([1], ['ī' * 127], np.zeros((1, 7)))
+        writer.close()
+        rows = scanrows.open_rows(self.rows_file + '.long')
+        self.assertEqual(rows.chars_array().tolist(), ['ī' * 127])
+        os.remove(self.rows_file + '.long')
+
+    def test_scanned_text(self):
+        from_csv = text.ScannedText(self.csv_file)
+        from_rows = text.ScannedText(self.rows_file)
+        self.assertEqual(sorted(from_rows.lines), sorted(from_csv.lines))
+        for lineno in from_csv.lines:
+            expected = from_csv.lines[lineno]
+            actual = from_rows.lines[lineno]
+            self.assertEqual(sorted(actual), sorted(expected))
+            for pos in expected:
+                self.assertEqual(actual[pos]['chars'], expected[pos]['chars'])
+                self.assertEqual(actual[pos]['wordpos'], expected[pos]['wordpos'])
+                self.assertEqual(actual[pos]['quantity'], expected[pos]['quantity'])
+                self.assertAlmostEqual(actual[pos]['certainty'],
+                                       expected[pos]['certainty'], places=6)
+
+
+if __name__ == '__main__':
+    unittest.main()
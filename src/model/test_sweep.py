@@ -0,0 +1,73 @@
+import unittest
+import io
+import os
+import shutil
+import tempfile
+import dataset
+import numpy as np
+import sweep
+from test_dataset import synthetic_dataset
+
+
+class SweepTestCase(unittest.TestCase):
+    SPACE = {'max_depth': [2, 3], 'n_estimators': [10, 20], 'learning_rate': [0.1]}
+
+    def test_grid(self):
+        configs = sweep.grid(self.SPACE)
+        self.assertEqual(len(configs), 4)
+        self.assertIn({'max_depth': 3, 'n_estimators': 10, 'learning_rate': 0.1}, configs)
+
+    def test_random_configs(self):
+        configs = sweep.random_configs(self.SPACE, 3, seed=1)
+        self.assertEqual(len(configs), 3)
+        self.assertEqual(configs, sweep.random_configs(self.SPACE, 3, seed=1))
+        self.assertEqual(len({tuple(sorted(c.items())) for c in configs}), 3)
+        self.assertEqual(len(sweep.random_configs(self.SPACE, 10)), 4)
+
+    def test_share_arrays(self):
+        directory = tempfile.mkdtemp()
+        try:
+            np.save(os.path.join(directory, 'mapped.npy'), np.arange(10))
+            mapped = np.load(os.path.join(directory, 'mapped.npy'), mmap_mode='r')
+            shared_dir = os.path.join(directory, 'shared')
+            os.mkdir(shared_dir)
+            shared = sweep.share_arrays(
+                {'a': mapped, 'b': mapped[:5], 'c': np.ones(3)}, shared_dir)
+            self.assertEqual(shared['a'], os.path.join(directory, 'mapped.npy'))
+            self.assertEqual(shared['b'], os.path.join(shared_dir, 'b.npy'))
+            self.assertEqual(list(np.load(shared['b'])), [0, 1, 2, 3, 4])
+
+            # Views of the whole file with its shape are not the file's array
+            np.save(os.path.join(directory, 'square.npy'), np.arange(9).reshape(3, 3))
+            square = np.load(os.path.join(directory, 'square.npy'), mmap_mode='r')
+            shared = sweep.share_arrays(
+                {'s': square, 'r': mapped[::-1], 't': square.T,
+                 'u': square.view(np.uint64)}, shared_dir)
+            self.assertEqual(shared['s'], os.path.join(directory, 'square.npy'))
+            self.assertEqual(list(np.load(shared['r'])), list(range(9, -1, -1)))
+            self.assertEqual(np.load(shared['t']).tolist(), square.T.tolist())
+            self.assertEqual(shared['u'], os.path.join(shared_dir, 'u.npy'))
+        finally:
+            shutil.rmtree(directory)
+
+    def test_sweep(self):
+        ds = synthetic_dataset()
+        configs = sweep.grid(self.SPACE)
+        rows = list(sweep.sweep(ds, configs, jobs=2))
+        self.assertEqual([{p: r[p] for p in self.SPACE} for r in rows], configs)
+        self.assertEqual(list(sweep.sweep(ds, configs[:1], jobs=1))[0]['test_score'],
+                         rows[0]['test_score'])
+
+        # The same split and model as run_gbc
+        _, test_score, _ = dataset.run_gbc(ds, 0, 10, 0.1, 2, None, 0)
+        self.assertEqual(rows[0]['test_score'], test_score)
+
+        out = io.StringIO()
+        sweep.write_results(rows, out)
+        lines = out.getvalue().splitlines()
+        self.assertEqual(lines[0].split(','), sweep.RESULT_FIELDS)
+        self.assertEqual(len(lines), 5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -25,6 +25,28 @@ class DefaultWordsTestCase(unittest.TestCase):
         self.assertTrue(found)
 
 
+class SyllabifierTestCase(unittest.TestCase):
+    def test_normalize(self):
+        self.assertEqual(
+            syllable.SYLLABIFIER.normalize('Multum ille et terris, iactatus et alto'),
+            'multillet terris iactatus et alto')
+
+    def test_normalize_prodelision(self):
+        self.assertEqual(
+            syllable.SYLLABIFIER.normalize('quantum est hominum'),
+            'quantumst hominum')
+
+    def test_normalize_matches_passes(self):
+        # Including elisions in sequence, where a rule may not reuse letters
+        # consumed by its previous match
+        for line in ['[\'Arma\', \'uirumque\', \'cano\']',
+                     'cum am et', 'ille a et', 'quae et hoc', 'cum a e',
+                     'tum es est', 'nam a ae oe i', '(hic) ille, o hae!',
+                     'Ītalia\'s  vela  ', ', ', '', '...']:
+            self.assertEqual(syllable.SYLLABIFIER.normalize(line),
+                             syllable.SYLLABIFIER.normalize_passes(line), line)
+
+
 # Lowercase, no dipthongs
 class DefaultWordTestCase(unittest.TestCase):
     def setUp(self):
@@ -50,6 +72,40 @@ class WordWithQUTestCase(unittest.TestCase):
         self.assertEqual(len(self.word.to_syllables()), 1)
 
 
+class SyllableCacheTestCase(unittest.TestCase):
+    def setUp(self):
+        self.saved_cache = syllable.SYLLABLE_CACHE
+        syllable.SYLLABLE_CACHE = syllable.SyllableCache(maxsize=2)
+
+    def tearDown(self):
+        syllable.SYLLABLE_CACHE = self.saved_cache
+
+    def test_hits_and_misses(self):
+        first = syllable.Word('elegante').to_syllables()
+        second = syllable.Word('Elegante').to_syllables()
+        self.assertEqual(syllable.SYLLABLE_CACHE.info()['hits'], 1)
+        self.assertEqual(syllable.SYLLABLE_CACHE.info()['misses'], 1)
+        self.assertEqual([s.chars for s in first], [s.chars for s in second])
+        self.assertTrue(second[0].is_initial())
+        self.assertTrue(second[-1].is_final())
+
+    def test_fresh_copies(self):
+        first = syllable.Word('caedo').to_syllables()
+        first[0].set_zero_weight()
+        first[0].set_line_position(3)
+        second = syllable.Word('caedo').to_syllables()
+        self.assertEqual(second[0].nucleus_weight(), 2)
+        self.assertEqual(second[0].positions(), (0, 1, -1, -1))
+
+    def test_eviction(self):
+        for w in ['et', 'in', 'est', 'et']:
+            syllable.Word(w).to_syllables()
+        self.assertEqual(syllable.SYLLABLE_CACHE.info()['size'], 2)
+        self.assertEqual(syllable.SYLLABLE_CACHE.info()['misses'], 4)
+        syllable.SYLLABLE_CACHE.resize(0)
+        self.assertEqual(syllable.SYLLABLE_CACHE.info()['size'], 0)
+
+
 class DefaultSyllableTestCase(unittest.TestCase):
     def setUp(self):
         self.syl = syllable.Syllable('ten')
@@ -76,5 +132,21 @@ class SyllableWithDiphthongTestCase(unittest.TestCase):
         self.assertEqual(self.syl.slots, ['C', 'D'])
 
 
+class SyllableShapeTestCase(unittest.TestCase):
+    def test_shared_shape(self):
+        shape = syllable.shape_of('ten')
+        self.assertIs(syllable.shape_of('ten'), shape)
+        self.assertIs(syllable.Syllable('ten').shape, shape)
+        self.assertIs(syllable.Syllable('ten').shape, syllable.Syllable('ten').shape)
+        self.assertIsNot(syllable.shape_of('lae'), shape)
+
+    def test_no_dict(self):
+        syl = syllable.Syllable('ten')
+        self.assertFalse(hasattr(syl, '__dict__'))
+        self.assertFalse(hasattr(syl.shape, '__dict__'))
+        with self.assertRaises(AttributeError):
+            syl.extra = 2
+
+
 if __name__ == '__main__':
     unittest.main()
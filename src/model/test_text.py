@@ -0,0 +1,38 @@
+import unittest
+import text
+import io
+
+
+class TextTestCase(unittest.TestCase):
+    def test_lines(self):
+        t = text.Text(io.StringIO(
+            'Arma virumque cano, Troiae qui primus ab oris\n'
+            '\n'
+            '1 2 3\n'
+            'Italiam, fato profugus, Laviniaque venit\n'))
+        self.assertEqual(t.lines, [
+            ['Arma', 'virumque', 'cano', 'Troiae', 'qui', 'primus', 'ab', 'oris'],
+            ['Italiam', 'fato', 'profugus', 'Laviniaque', 'venit']])
+
+    def test_quotes_and_brackets(self):
+        # Quotes and unmatched brackets only separate words
+        t = text.Text(io.StringIO(
+            '\'at certe tamen,\' inquiunt, \'quod illic\n'
+            'natum dicitur esse, comparasti (ad lecticam\n'
+            'viden\' ut\n'))
+        self.assertEqual(t.lines, [
+            ['at', 'certe', 'tamen', 'inquiunt', 'quod', 'illic'],
+            ['natum', 'dicitur', 'esse', 'comparasti', 'ad', 'lecticam'],
+            ['viden', 'ut']])
+
+    def test_unicode(self):
+        t = text.Text(io.StringIO('Ārma virumque canō\nmāla\n'))
+        self.assertEqual(t.lines, [['Ārma', 'virumque', 'canō'], ['māla']])
+
+    def test_digits(self):
+        self.assertEqual(list(text.tokenized_lines(['v2 12 a_b\n'])),
+                         [['v2', 'a_b']])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,4 +1,27 @@
-import tokenize
+import re
+from collections.abc import Mapping
+
+# A word is a run of letters, digits and underscores (the characters of a
+# Python identifier) which does not start with a digit, including any
+# combining diacritics such as macrons and breves
+WORD = re.compile(r'[^\W\d][\w\u0300-\u036f]*')
+
+#
+# tokenized_lines: yield the words of each of the given lines, as a list
+#   per line, skipping lines without any words
+#
+# Each line is scanned once, with a single regular expression, so
+# apostrophes, brackets and quotes in the text simply separate words (they
+# never start a string or bracketed expression spanning lines, as they
+# would for Python's tokenizer, which earlier versions used).
+#
+
+def tokenized_lines(lines):
+    findall = WORD.findall
+    for line in lines:
+        words = findall(line)
+        if words:
+            yield words
 
 #
 # Text: a tokenized (by word) representation of a text
@@ -12,34 +35,30 @@ class Text:
         op = getattr(data, 'readline', None)
         self.lines = []
         if callable(op):
-            self.linedicts = {}
-            self.tokens = tokenize.generate_tokens(data.readline)
-            for tok in self.tokens:
-                if tok[0] != 1:
-                    # We only care about type=1 (NAME)
-                    continue
-                lineno = tok[2][0]
-                if lineno in self.linedicts:
-                    # We've seen the line before, add this word with the position within the line as the key
-                    self.linedicts[lineno][tok[2][1]] = tok[1]
-                else:
-                    # Each line is a dict, key is the starting position in the line, value is the word
-                    self.linedicts[lineno] = {tok[2][1]: tok[1]}
-
-            for lineno in sorted(self.linedicts):
-                ld = self.linedicts[lineno]
-                linewords = []
-                for pos in sorted(ld):
-                    linewords.append(ld[pos])
-                self.lines.insert(lineno, linewords)
+            self.lines = list(tokenized_lines(iter(data.readline, '')))
 
     def print(self):
         for line in self.lines:
             print(line)
 
 
+#
+# ScannedText: the syllables of a scanned text, by line
+#
+# lines maps each line number to a dict of that line's syllables keyed by
+# their position within the line.  The data file is either a CSV of scan
+# results or a binary rows file (see scanrows), in which case lines are
+# only read from the memory-mapped file when they are looked up.
+#
+
 class ScannedText:
     def __init__(self, data_file):
+        from scanrows import is_rows_file, open_rows
+
+        if is_rows_file(data_file):
+            self.lines = ScannedLines(open_rows(data_file))
+            return
+
         self.lines = {}
         with open(data_file) as f:
             for line in f:
@@ -55,4 +74,26 @@ class ScannedText:
                     'certainty': float(vals[10 + quantity])
                 }
 
-            # def create_bucket_if_does_not_exist(bucket=None):
+
+class ScannedLines(Mapping):
+    def __init__(self, rows):
+        self.rows = rows
+
+    def __getitem__(self, lineno):
+        rows = self.rows
+        line = {}
+        for i in rows.line_rows(lineno):
+            quantity = int(rows.quantity[i])
+            line[int(rows.features[i, 5])] = {
+                'chars': rows.chars_at(i),
+                'wordpos': int(rows.features[i, 3]),
+                'quantity': quantity,
+                'certainty': float(rows.probabilities[i, quantity])
+            }
+        return line
+
+    def __iter__(self):
+        return iter(self.rows.line_numbers())
+
+    def __len__(self):
+        return len(self.rows.line_numbers())
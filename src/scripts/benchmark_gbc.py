@@ -0,0 +1,82 @@
+import click
+import paths
+import time
+
+
+# Returns the best time, in seconds, of calling fn over the given number of
+# repeats
+def best_time(fn, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+# Returns the classifier fit last and the best fit and predict times, in
+# seconds, over the given number of repeats
+def time_fit(make, X_train, y_train, X_test, repeat):
+    best_fit = best_predict = None
+    for _ in range(repeat):
+        clf = make()
+        start = time.perf_counter()
+        clf.fit(X_train, y_train)
+        fit = time.perf_counter() - start
+        start = time.perf_counter()
+        clf.predict_proba(X_test)
+        predict = time.perf_counter() - start
+        best_fit = fit if best_fit is None else min(best_fit, fit)
+        best_predict = predict if best_predict is None else min(best_predict, predict)
+    return clf, best_fit, best_predict
+
+
+@click.command()
+@click.option('-d', '--data-file', help='Syllable data file',
+              type=click.Path(exists=True), default='datasets/aeneid1a.syl.csv', show_default=True)
+@click.option('-t', '--targets-file', help='Syllable targets file',
+              type=click.Path(exists=True), default='datasets/aeneid1-1-100-target.csv',
+              show_default=True)
+@click.option('-e', '--estimators', help='Number of estimators (at most, for hist)',
+              type=int, default=100, show_default=True)
+@click.option('-l', '--learning-rate', type=float, default=0.1, show_default=True)
+@click.option('-m', '--max-depth', type=int, default=3, show_default=True)
+@click.option('-s', '--split-random-state', type=int, default=0, show_default=True)
+@click.option('-r', '--repeat', help='Number of timings to take the best of',
+              type=int, default=5, show_default=True)
+def main(data_file, targets_file, estimators, learning_rate, max_depth,
+         split_random_state, repeat):
+    """Compare fit time and accuracy of the classifier backends"""
+    paths.add_repo_paths()
+    import dataset
+    from compiled import export_ensemble
+    from sklearn.model_selection import train_test_split
+
+    ds = dataset.load_latin_scansion_dataset(data_file, targets_file)
+    X_train, X_test, y_train, y_test = train_test_split(
+        ds.data.astype(float), ds.target, random_state=split_random_state)
+    click.echo('{} training and {} test syllables'.format(len(y_train), len(y_test)))
+
+    click.echo('{:<8}{:>8}{:>10}{:>12}{:>14}{:>8}{:>8}'.format(
+        'backend', 'trees', 'fit (s)', 'predict (s)', 'compiled (s)', 'train', 'test'))
+    for backend in sorted(dataset.BACKENDS):
+        def make():
+            return dataset.make_classifier(
+                backend, n_features=ds.data.shape[1], n_estimators=estimators,
+                learning_rate=learning_rate, max_depth=max_depth,
+                max_features=None, random_state=0)
+
+        clf, fit, predict = time_fit(make, X_train, y_train, X_test, repeat)
+        trees = getattr(clf, 'n_iter_', None) or clf.n_estimators_
+        ensemble = export_ensemble(clf)
+        compiled = best_time(lambda: ensemble.predict_proba(X_test), repeat)
+        click.echo('{:<8}{:>8}{:>10.3f}{:>12.4f}{:>14.4f}{:>8.3f}{:>8.3f}'.format(
+            backend, trees, fit, predict, compiled,
+            clf.score(X_train, y_train), clf.score(X_test, y_test)))
+
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,47 @@
+import click
+import paths
+import time
+
+
+# Returns the best time per line, in microseconds, of normalizing every
+# line with fn, over the given number of repeats
+def time_per_line(fn, lines, repeat, number):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            for l in lines:
+                fn(l)
+        elapsed = (time.perf_counter() - start) / number / len(lines)
+        best = elapsed if best is None else min(best, elapsed)
+    return best * 1e6
+
+
+@click.command()
+@click.option('-f', '--input-file', help='Text file to normalize',
+              type=click.Path(exists=True), default='datasets/aeneid1.text', show_default=True)
+@click.option('-r', '--repeat', help='Number of timings to take the best of',
+              type=int, default=5, show_default=True)
+@click.option('-n', '--number', help='Number of times to normalize the file per timing',
+              type=int, default=20, show_default=True)
+def main(input_file, repeat, number):
+    """Compare line normalization with the regular expression passes"""
+    paths.add_repo_paths()
+    from syllable import SYLLABIFIER
+
+    with open(input_file) as f:
+        lines = f.read().splitlines()
+
+    mismatches = sum(1 for l in lines
+                     if SYLLABIFIER.normalize(l) != SYLLABIFIER.normalize_passes(l))
+    click.echo('{} lines, {} normalized differently'.format(len(lines), mismatches))
+
+    for name in ['normalize_passes', 'normalize']:
+        us = time_per_line(getattr(SYLLABIFIER, name), lines, repeat, number)
+        click.echo('{:<18}{:>8.2f} us/line {:>10.0f} lines/s'.format(name, us, 1e6 / us))
+
+    return 0 if mismatches == 0 else 1
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -5,6 +5,11 @@ import sys
 import os
 
 
+def print_progress(report):
+    print('{}/{} files, {:.2f} MiB/s'.format(
+        report.done, report.total, report.throughput() / (1024 * 1024)))
+
+
 def main():
     paths.add_repo_paths()
     from cos import CloudObjectStorage
@@ -22,9 +27,21 @@ def main():
                         help='IAM endpoint')
     parser.add_argument('-b', '--bucket', help='COS bucket name')
     parser.add_argument('-t', '--action', required=True,
-                        help='COS action')
+                        help='COS action: put, get, sync or watch')
     parser.add_argument('-f', '--file', required=False,
                         help='file to to send or get')
+    parser.add_argument('-d', '--directory', default='.',
+                        help='local directory to sync')
+    parser.add_argument('--direction', choices=['up', 'down'], default='up',
+                        help='sync the bucket from the directory (up) or the directory from the bucket (down)')
+    parser.add_argument('-p', '--prefix', default='',
+                        help='only sync keys starting with this prefix')
+    parser.add_argument('-j', '--jobs', type=int, default=8,
+                        help='number of concurrent transfers')
+    parser.add_argument('--retries', type=int, default=3,
+                        help='number of times to retry a failed transfer')
+    parser.add_argument('-s', '--state-file',
+                        help='state file of the objects already seen, for watch')
     args = parser.parse_args()
 
     api_key = args.api_key if args.api_key else os.environ.get('API_KEY')
@@ -33,7 +50,8 @@ def main():
         api_key=api_key,
         instance_id=args.account_id,
         iam_endpoint=args.iam_endpoint,
-        cos_endpoint=args.endpoint
+        cos_endpoint=args.endpoint,
+        max_pool_connections=max(10, args.jobs)
     )
 
     if args.action == 'put':
@@ -41,8 +59,17 @@ def main():
     elif args.action == 'get':
         response = cos.get_text(bucket_name=args.bucket, file=args.file)
         print(json.dumps(response, indent=4, default=str))
+    elif args.action == 'sync':
+        report = cos.sync(bucket_name=args.bucket, directory=args.directory,
+                          direction=args.direction, prefix=args.prefix,
+                          workers=args.jobs, retries=args.retries,
+                          progress=print_progress)
+        print(report)
+        for job, e in report.failures:
+            print('Failed: {} ({})'.format(job, e))
+        return 1 if report.failures else 0
     else:
-        cos.watch_bucket(bucket_name=args.bucket)
+        cos.watch_bucket(bucket_name=args.bucket, state_file=args.state_file)
 
 
 if __name__ == '__main__':
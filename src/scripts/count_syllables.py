@@ -2,11 +2,37 @@ import argparse
 import os
 import paths
 from datetime import date
+from pool import ordered_map, chapter_files
+
+
+# Returns the average syllable count and definite long count per line of a
+# chapter file
+def count_chapter(chapter_file):
+    from syllable import Words, SyllabifiedLine
+
+    w = Words(chapter_file)
+    total_syllables = 0
+    total_definite_longs = 0
+    # Iterate and build the base dataset
+    for line in w.lines():
+        syls = []
+        for word in line:
+            try:
+                for syl in word.to_syllables():
+                    syls.append(syl)
+            except IndexError:
+                print('Unable to syllabify \"{}\", skipping'.format(word.chars))
+        total_syllables += len(syls)
+        sl = SyllabifiedLine(syls)
+        for syl in sl.syllables:
+            if syl.coda_weight() > 1 or syl.nucleus_weight() > 1:
+                total_definite_longs += 1
+
+    return total_syllables / len(w.lines()), total_definite_longs / len(w.lines())
 
 
 def main():
     paths.add_repo_paths()
-    from syllable import Words, SyllabifiedLine
 
     parser = argparse.ArgumentParser(
         description='Analyze latin texts for syllablic structure',
@@ -17,6 +43,8 @@ def main():
                         required=False, help='Work index')
     parser.add_argument('-o', '--output-file',
                         required=False, help='Destination file for output')
+    parser.add_argument('-j', '--jobs', type=int, default=1,
+                        required=False, help='Number of worker processes (0 for all cores)')
 
     args = parser.parse_args()
 
@@ -42,27 +70,12 @@ def main():
         ])
 
     data = []
-    for f in os.listdir(chapters_dir):
-        w = Words('/'.join([chapters_dir, f]))
-        total_syllables = 0
-        total_definite_longs = 0
-        # Iterate and build the base dataset
-        for line in w.lines():
-            syls = []
-            for word in line:
-                try:
-                    for syl in word.to_syllables():
-                        syls.append(syl)
-                except IndexError:
-                    print('Unable to syllabify \"{}\", skipping'.format(word.chars))
-            total_syllables += len(syls)
-            sl = SyllabifiedLine(syls)
-            for syl in sl.syllables:
-                if syl.coda_weight() > 1 or syl.nucleus_weight() > 1:
-                    total_definite_longs += 1
-
-        syls_per_line = total_syllables / len(w.lines())
-        definite_longs_per_line = total_definite_longs / len(w.lines())
+    chapters = chapter_files(chapters_dir)
+    counts = ordered_map(
+        count_chapter,
+        ['/'.join([chapters_dir, f]) for f in chapters],
+        args.jobs)
+    for f, (syls_per_line, definite_longs_per_line) in zip(chapters, counts):
         try:
             idx = int(f.removesuffix('.txt'))
             data.append([idx, f, syls_per_line, definite_longs_per_line])
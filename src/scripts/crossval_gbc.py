@@ -0,0 +1,95 @@
+import argparse
+import sys
+import time
+import paths
+
+
+def main():
+    paths.add_repo_paths()
+    import dataset
+    import crossval
+
+    parser = argparse.ArgumentParser(
+        description='Cross-validate the classifiers on folds of whole lines or poems',
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument('-d', '--data-file',
+                        required=True, help='Path to the data file')
+    parser.add_argument('-t', '--targets-file',
+                        required=True, help='Path to the targets file')
+    parser.add_argument('-k', '--kind', choices=['syllable', 'meter'], default='syllable',
+                        help='Kind of dataset')
+    parser.add_argument('-b', '--backends', default='gbc',
+                        help='Comma-separated classifiers to evaluate on the same folds: {}'.format(
+                            ', '.join(sorted(dataset.BACKENDS))))
+    parser.add_argument('-g', '--group-by', choices=sorted(crossval.GROUPINGS), default='line',
+                        help='Keep the rows of each line (or poem) in one fold')
+    parser.add_argument('-n', '--splits', type=int, default=5,
+                        help='Number of folds')
+    parser.add_argument('-e', '--estimators', type=int, default=100,
+                        help='Number of estimators (at most, for hist)')
+    parser.add_argument('-l', '--learning-rate', type=float, default=0.1)
+    parser.add_argument('-m', '--max-depth', type=int, default=3)
+    parser.add_argument('-f', '--max-features', type=int, required=False,
+                        help='Maximum number of features (default: all)')
+    parser.add_argument('-j', '--jobs', type=int, default=0,
+                        help='Number of worker processes (0 for all cores)')
+    parser.add_argument('-r', '--model-random-state', type=int, default=0,
+                        help='Random state for building models')
+    parser.add_argument('-o', '--output-file',
+                        required=False, help='CSV file for the per-fold results')
+
+    args = parser.parse_args()
+
+    backends = args.backends.split(',')
+    for backend in backends:
+        if backend not in dataset.BACKENDS:
+            parser.error('unknown backend {}'.format(backend))
+
+    load = dataset.load_latin_scansion_dataset if args.kind == 'syllable' \
+        else dataset.load_latin_meter_dataset
+    ds = load(data_file_name=args.data_file, target_file_name=args.targets_file)
+
+    try:
+        crossval.groups_of(ds.raw, args.group_by, args.splits)
+    except ValueError as e:
+        parser.error(str(e))
+
+    start = time.perf_counter()
+    binned, _ = crossval.bin_features(ds.data)
+    print('Binned {} rows of {} features in {:.3f} s'.format(
+        len(ds.target), ds.data.shape[1], time.perf_counter() - start), file=sys.stderr)
+
+    config = {
+        'n_estimators': args.estimators,
+        'learning_rate': args.learning_rate,
+        'max_depth': args.max_depth,
+        'max_features': args.max_features
+    }
+
+    rows = []
+    print('{:<8}{:>5}{:>8}{:>7}{:>8}{:>8}{:>8}{:>9}{:>10}'.format(
+        'backend', 'fold', 'train', 'test', 'groups', 'train', 'test',
+        'fit (s)', 'pred (s)'))
+    for backend in backends:
+        folds = []
+        for row in crossval.cross_validate(ds, args.splits, args.group_by, backend, config,
+                                           args.jobs, args.model_random_state, binned):
+            folds.append(row)
+            print('{:<8}{:>5}{:>8}{:>7}{:>8}{:>8.3f}{:>8.3f}{:>9.3f}{:>10.4f}'.format(
+                backend, row['fold'], row['train_rows'], row['test_rows'],
+                row['test_groups'], row['train_score'], row['test_score'],
+                row['fit_seconds'], row['predict_seconds']))
+        summary = crossval.summarize(folds)
+        print('{:<8} test score {:.3f} +/- {:.3f} over {} folds, {:.3f} s fitting\n'.format(
+            backend, summary['mean_test_score'], summary['std_test_score'],
+            summary['folds'], summary['fit_seconds']))
+        rows.extend(folds)
+
+    if args.output_file:
+        with open(args.output_file, 'w', newline='') as f:
+            crossval.write_results(rows, f)
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
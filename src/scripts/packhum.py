@@ -1,73 +1,44 @@
 import requests
 import argparse
 import os
-import re
-from html.parser import HTMLParser
 from datetime import date
 import paths
 
 PACKHUM_URL = 'https://latin.packhum.org/dx/text/{}/{}/{}'
-ROMAN_NUM = '(?<=\n)[CDILMVX]+(?=\n)'
-WORK_NUM = '(?<=\n)[\d\.]+(?=\n)'
-WORK_LINE = '[a-z][a-z\?\.\,\!\;\:]*'
-
-
-class PackhumHTMLParser(HTMLParser):
-    def init_regex(self):
-        self.lines = []
-        self.current_line = 0
-        self.rnp = re.compile(ROMAN_NUM)
-        self.wnp = re.compile(WORK_NUM)
-        self.wlp = re.compile(WORK_LINE)
-        self.in_table_data = False
-
-    def handle_starttag(self, tag, attrs):
-        if tag == 'td':
-            self.in_table_data = True
-
-    def handle_endtag(self, tag):
-        if tag == 'td':
-            self.in_table_data = False
-
-    def handle_data(self, data):
-        if self.in_table_data:
-            if self.rnp.search(data):
-                return
-            if self.wnp.search(data):
-                return
-            if self.wlp.search(data):
-                self.lines.append(data.strip('\n'))
-
-    def readline(self):
-        if self.current_line < len(self.lines):
-            self.current_line += 1
-            return self.lines[self.current_line - 1]
-        else:
-            return ''
-
-
-def get_text(author, work, chapter):
-    from text import Text
+CHUNK_SIZE = 16 * 1024
+
+
+# Returns the word lists of the verse lines of a chapter, as a stream which
+# parses and tokenizes the page as it's downloaded, or None if the chapter
+# could not be fetched
+def get_text(author, work, chapter, chunk_size=CHUNK_SIZE):
+    from fetch import packhum_lines
+    from text import tokenized_lines
 
     headers = {'user-agent': 'curl/7.64.1'}
     request_path = PACKHUM_URL.format(author, work, chapter)
-    r = requests.get(request_path, headers=headers)
+    r = requests.get(request_path, headers=headers, stream=True)
     if r.status_code != 200:
+        r.close()
         return None
 
-    parser = PackhumHTMLParser()
-    parser.init_regex()
-    parser.feed(r.text)
-    return Text(parser)
+    # The page is decoded as it streams in, before the whole of it is there
+    # to detect an encoding from (as r.text would), so a response which
+    # doesn't give its charset is taken to be UTF-8
+    if r.encoding is None:
+        r.encoding = 'utf-8'
+    return tokenized_lines(packhum_lines(
+        r.iter_content(chunk_size, decode_unicode=True)))
 
 
-def upload_processed_text(text, name,
+def upload_processed_text(word_lists, name,
                           cos, bucket_name):
+    from pipeline import write_text
+
     # Write to a temp file
     tmp_file = os.path.join('/tmp', name)
     with open(tmp_file, 'w') as f:
-        for line in text.lines:
-            f.write('[\'' + '\',\''.join(line) + '\']' + '\n')
+        write_text(word_lists, f)
 
     cos.put_text(
         bucket_name=bucket_name,
@@ -132,11 +103,14 @@ def main():
             print('Missing one or more required parameters for using COS.')
             return -1
 
-    text = get_text(author_index, work_index, chapter_index)
+    word_lists = get_text(author_index, work_index, chapter_index)
+    if word_lists is None:
+        print('Unable to fetch the text.')
+        return -1
 
     if cos_endpoint:
         upload_processed_text(
-                text=text,
+                word_lists=word_lists,
                 name='-'.join([
                     date.today().isoformat(),
                     author_index,
@@ -149,7 +123,8 @@ def main():
                     iam_endpoint=iam_endpoint,
                     cos_endpoint=cos_endpoint))
     else:
-        text.print()
+        for words in word_lists:
+            print(words)
 
     return 0
 
@@ -0,0 +1,33 @@
+import os
+import paths
+from concurrent.futures import ProcessPoolExecutor
+
+#
+# ordered_map: apply fn to each of items, fanned out to a pool of jobs
+#   worker processes (all cores if jobs is 0), yielding the results in the
+#   order of items as they become available.  With jobs == 1 everything runs
+#   in this process.  fn must be a module-level (picklable) function.
+#
+
+def ordered_map(fn, items, jobs=1):
+    if jobs == 0:
+        jobs = os.cpu_count() or 1
+    if jobs <= 1:
+        yield from map(fn, items)
+        return
+    with ProcessPoolExecutor(max_workers=jobs,
+                             initializer=paths.add_repo_paths) as executor:
+        yield from executor.map(fn, items)
+
+#
+# chapter_files: list the chapter files of a work directory, ordered by
+#   chapter index (e.g. 2.txt before 10.txt), then any others by name
+#
+
+def chapter_files(chapters_dir):
+    def chapter_key(name):
+        try:
+            return 0, int(name.removesuffix('.txt')), name
+        except ValueError:
+            return 1, 0, name
+    return sorted(os.listdir(chapters_dir), key=chapter_key)
@@ -0,0 +1,75 @@
+import argparse
+import os
+import time
+import paths
+
+
+# The results file for a data file: datasets/aeneid4-1.syl.csv ->
+# <output_dir>/aeneid4-1-scan.csv (texts/latin/472/1/1.txt -> 1-scan.csv)
+def results_file(data_file, output_dir):
+    name = os.path.basename(data_file)
+    for suffix in ['.syl.csv', '.csv', '.txt', '.text']:
+        if name.endswith(suffix):
+            name = name[:-len(suffix)]
+            break
+    return os.path.join(output_dir, name + '-scan.csv')
+
+
+def main():
+    paths.add_repo_paths()
+    import dataset
+    from artifact import load_model
+
+    parser = argparse.ArgumentParser(
+        description='Score data files with a saved model',
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument('data_files', nargs='+',
+                        help='Data files (.syl.csv for syllable models) to score')
+    parser.add_argument('-s', '--syllabify', action='store_true',
+                        help='The files are texts, to syllabify and score with a syllable model')
+    parser.add_argument('-M', '--model-dir',
+                        required=True, help='Directory the model was saved in')
+    parser.add_argument('-v', '--version', type=int,
+                        required=False, help='Model version (default: the latest)')
+    parser.add_argument('-c', '--compiled', action='store_true',
+                        help='Score with the compiled model, without sklearn')
+    parser.add_argument('-o', '--output-dir',
+                        required=False, help='Directory for writing each file\'s results')
+
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    model = load_model(args.model_dir, args.version, args.compiled)
+    print('Loaded {}{} model version {} ({}, trained on {} rows) in {:.1f} ms'.format(
+        'compiled ' if args.compiled else '', model.meta['backend'], model.version,
+        model.meta['dataset'], model.meta['training_rows'], (time.perf_counter() - start) * 1000))
+    load = dataset.LOADERS[model.meta['dataset']]
+    if args.syllabify:
+        if load is not dataset.load_latin_scansion_dataset:
+            parser.error('only syllable models can score texts')
+
+        # Texts go straight into the features, with no .syl.csv in between
+        def load(text_file):
+            from corpus import corpus_from_text
+            return dataset.load_latin_scansion_corpus(corpus_from_text(text_file))
+
+    for data_file in args.data_files:
+        start = time.perf_counter()
+        results = model.predict(load(data_file))
+        elapsed = time.perf_counter() - start
+
+        counts = ', '.join('{}: {}'.format(name, count)
+                           for name, count in model.class_counts(results))
+        print('{}: {} rows in {:.1f} ms ({})'.format(
+            data_file, len(results), elapsed * 1000, counts))
+
+        if args.output_dir:
+            os.makedirs(args.output_dir, exist_ok=True)
+            with open(results_file(data_file, args.output_dir), 'w') as of:
+                for res in results:
+                    of.write('{}\n'.format(','.join(res[:])))
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
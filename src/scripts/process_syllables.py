@@ -11,14 +11,45 @@ def download_text(file_name, bucket_name,
         file=file_name)
 
 
-def upload_results(file_name, bucket_name, cos_client=None):
-    cos_client.put_text(bucket_name=bucket_name, file=file_name)
+# Uploads the result files concurrently; returns whether all of them were
+# uploaded, reporting any which were not
+def upload_results(file_names, bucket_name, cos_client=None):
+    report = cos_client.upload_many(bucket_name=bucket_name, files=file_names)
+    for (f, _), e in report.failures:
+        print('Unable to upload {}: {}'.format(f, e))
+    return not report.failures
+
+
+# Syllabifies input_file into output_file and its .csv data file, fetching
+# the input from and uploading the results to COS if a client is given.
+# Returns whether the results were uploaded (always, without COS).
+def process_file(input_file, output_file, bucket_name=None, cos_client=None):
+    from pipeline import syllabify_words, write_syllabified
+
+    data_file = output_file + '.csv'
+    if cos_client:
+        download_text(
+            file_name=input_file,
+            bucket_name=bucket_name,
+            cos_client=cos_client
+        )
+
+    print("Writing output to ", output_file)
+    print("Writing data to ", data_file)
+    write_syllabified(syllabify_words(input_file), output_file, data_file)
+
+    if cos_client:
+        return upload_results(
+            file_names=[output_file, data_file],
+            bucket_name=bucket_name,
+            cos_client=cos_client
+        )
+    return True
 
 
 def main():
     paths.add_repo_paths()
     from cos import CloudObjectStorage
-    from syllable import Words, SyllabifiedLine
 
     parser = argparse.ArgumentParser(
         description='Analyze latin texts for syllablic structure',
@@ -43,37 +74,17 @@ def main():
                         required=False, help='Local file to process')
     parser.add_argument('-o', '--output-file',
                         required=False, help='Destination file for output')
+    parser.add_argument('-W', '--watch-state',
+                        required=False, help='Process the .text objects in the bucket which are new '
+                        'or have changed since the last run with this state file (requires COS)')
 
     args = parser.parse_args()
 
-    # Process arguments related to the work to be downloaded
-    chapter_index = args.chapter_index if args.chapter_index else os.environ.get(
-        'JOB_INDEX')
-    author_index = args.author_index if args.author_index else os.environ.get(
-        'AUTHOR_INDEX')
-    work_index = args.work_index if args.work_index else os.environ.get(
-        'WORK_INDEX')
-
-    input_file = args.input_file if args.input_file else '-'.join(
-        [
-            date.today().isoformat(),
-            author_index,
-            work_index,
-            chapter_index
-        ]) + '.text'
-    output_file = args.output_file if args.output_file else '-'.join(
-        [
-            date.today().isoformat(),
-            author_index,
-            work_index,
-            chapter_index
-            ]) + '.syl'
-    data_file = output_file + '.csv'
-
     # Process arguments related to COS and IAM access
     cos_endpoint = args.cos_endpoint if args.cos_endpoint else os.environ.get(
         'COS_ENDPOINT')
     cos_client = None
+    bucket = None
     if cos_endpoint:
         iam_endpoint = args.iam_endpoint if args.iam_endpoint else os.environ.get(
             'IAM_ENDPOINT')
@@ -95,57 +106,49 @@ def main():
             iam_endpoint=iam_endpoint,
             cos_endpoint=cos_endpoint)
 
-        download_text(
-            file_name=input_file,
-            bucket_name=bucket,
-            cos_client=cos_client
-        )
-
-    w = Words(input_file)
-    syllabified_lines = []
-    for line in w.lines():
-        syls = []
-        for word in line:
-            try:
-                for syl in word.to_syllables():
-                    syls.append(syl)
-            except IndexError:
-                print('Unable to syllabify \"{}\", skipping'.format(word.chars))
-        syllabified_lines.append(SyllabifiedLine(syls))
+    if args.watch_state:
+        if not cos_client:
+            print('Watching the bucket requires COS.')
+            return -1
+        from pipeline import syllabify_object
+
+        # Objects whose transfers failed are left for the next run to retry,
+        # without holding up the others
+        watcher = cos_client.watcher(bucket, args.watch_state)
+        failed = 0
+        for obj in watcher.changes():
+            failures = syllabify_object(cos_client, bucket, obj['Key'])
+            for key, e in failures:
+                print('Unable to transfer {}: {}'.format(key, e))
+            if failures:
+                watcher.retry(obj['Key'])
+                failed += 1
+        return 1 if failed else 0
 
-    print("Writing output to ", output_file)
-    with open(output_file, 'w') as f:
-        for s in syllabified_lines:
-            f.write(s.string())
+    # Process arguments related to the work to be downloaded
+    chapter_index = args.chapter_index if args.chapter_index else os.environ.get(
+        'JOB_INDEX')
+    author_index = args.author_index if args.author_index else os.environ.get(
+        'AUTHOR_INDEX')
+    work_index = args.work_index if args.work_index else os.environ.get(
+        'WORK_INDEX')
 
-    print("Writing data to ", data_file)
-    with open(data_file, "w") as d:
-        for lineno, s in enumerate(syllabified_lines):
-            for syl in s.syllables:
-                wp, rwp, lp, rlp = syl.positions()
-                d.write('{},{},{},{},{},{},{},{},{}\n'.format(
-                    lineno,
-                    syl.chars,
-                    syl.nucleus_weight(),
-                    syl.coda_weight(),
-                    syl.nucleus_class(),
-                    wp,
-                    rwp,
-                    lp,
-                    rlp))
+    input_file = args.input_file if args.input_file else '-'.join(
+        [
+            date.today().isoformat(),
+            author_index,
+            work_index,
+            chapter_index
+        ]) + '.text'
+    output_file = args.output_file if args.output_file else '-'.join(
+        [
+            date.today().isoformat(),
+            author_index,
+            work_index,
+            chapter_index
+            ]) + '.syl'
 
-    if cos_client:
-        upload_results(
-            file_name=output_file,
-            bucket_name=bucket,
-            cos_client=cos_client
-        )
-        upload_results(
-            file_name=data_file,
-            bucket_name=bucket,
-            cos_client=cos_client
-        )
-    return 0
+    return 0 if process_file(input_file, output_file, bucket, cos_client) else 1
 
 
 if __name__ == "__main__":
@@ -4,42 +4,56 @@ import os
 from datetime import date
 import paths
 
-TEXT_URL = 'http://latin-texts.{}.svc.cluster.local/{}/{}/{}.txt'
+TEXT_URL = 'http://latin-texts.{}.svc.cluster.local'
 NS_FILE = '/var/run/secrets/kubernetes.io/serviceaccount/namespace'
 
 
-def get_text(author, work, chapter):
-    from text import Text
-
-    # headers = {'user-agent': 'curl/7.64.1'}
+# The in-cluster latin-texts server, unless text_url (another server, or a
+# directory laid out like texts/latin) is given
+def text_source(text_url=None):
+    if text_url:
+        return text_url
     with open(NS_FILE) as f:
-        namespace = f.read()
-        request_path = TEXT_URL.format(namespace, author, work, chapter)
-        try:
-            r = requests.get(request_path)
-            if r.status_code != 200:
-                print('Received {} from server'.format(r.status_code))
-                return None
-        except ConnectionError:
-            print('Unable to connect to server at {}'.format(request_path))
-            return None
-
-        with open('/tmp/' + '-'.join([
-                author,
-                work,
-                chapter]) + '.txt', 'w+') as tmp_file:
-            tmp_file.write(r.text)
-            tmp_file.seek(0)
-            return Text(tmp_file)
-
-
-def upload_processed_text(text, name,
+        return TEXT_URL.format(f.read().strip())
+
+
+# Returns the word lists of each line of a chapter, or None if it could not
+# be fetched
+def get_text(author, work, chapter, text_url=None):
+    from fetch import fetch_work
+
+    source = text_source(text_url)
+    try:
+        [(_, word_lists)] = fetch_work(source, author, work, [chapter])
+    except requests.exceptions.RequestException as e:
+        print('Unable to fetch from server at {}: {}'.format(source, e))
+        return None
+    return word_lists
+
+
+# Returns (chapter, word lists) for every chapter of a work (or the given
+# chapters), fetched concurrently over a pool of keep-alive connections
+def get_work(author, work, chapters=None, text_url=None, concurrency=8):
+    from fetch import fetch_work
+
+    source = text_source(text_url)
+    try:
+        return fetch_work(source, author, work, chapters, concurrency)
+    except requests.exceptions.RequestException as e:
+        print('Unable to fetch from server at {}: {}'.format(source, e))
+        return []
+
+
+# word_lists is an iterable of the words of each line, such as Text.lines
+# or a pipeline.text_words stream
+def upload_processed_text(word_lists, name,
                           cos, bucket_name):
+    from pipeline import write_text
+
     # Write to a temp file
     tmp_file = os.path.join('/tmp', name)
     with open(tmp_file, 'w') as f:
-        for line in text.lines:
-            f.write('[\'' + '\',\''.join(line) + '\']' + '\n')
+        write_text(word_lists, f)
 
     cos.put_text(
         bucket_name=bucket_name,
@@ -73,6 +87,13 @@ def main():
                         required=False, help='Input file')
     parser.add_argument('-o', '--output-file',
                         required=False, help='Output file')
+    parser.add_argument('-A', '--all-chapters', action='store_true',
+                        help='Process every chapter of the work')
+    parser.add_argument('-u', '--text-url',
+                        required=False, help='Server (or local directory) to fetch texts '
+                        'from, instead of the in-cluster latin-texts server')
+    parser.add_argument('-j', '--concurrency', type=int, default=8,
+                        help='Number of chapters to fetch at once')
 
     args = parser.parse_args()
 
@@ -104,35 +125,51 @@ def main():
             print('Missing one or more required parameters for using COS.')
             return -1
 
-    text = None
+    cos = None
+    if cos_endpoint:
+        cos = CloudObjectStorage(
+            api_key=api_key,
+            instance_id=cos_instance_id,
+            iam_endpoint=iam_endpoint,
+            cos_endpoint=cos_endpoint)
+
+    chapters = []
     if args.input_file:
-        with open(args.input_file) as f:
-            from text import Text
-            text = Text(f)
+        # Tokenized a line at a time as the output is written
+        from pipeline import read_lines, text_words
+        chapters = [(chapter_index, text_words(read_lines(args.input_file)))]
+    elif args.all_chapters:
+        if not author_index or not work_index:
+            print('Must supply the indices for author and work.')
+            return -1
+        chapters = get_work(author_index, work_index, text_url=args.text_url,
+                            concurrency=args.concurrency)
     else:
         if not author_index or not work_index or not chapter_index:
             print('Must supply the indices for author, work, and chapter.')
             return -1
-        text = get_text(author_index, work_index, chapter_index)
-
-    if cos_endpoint:
-        upload_file_name = '-'.join([
-            date.today().isoformat(),
-            author_index,
-            work_index,
-            chapter_index]) + '.text'
-        print('Uploading file {} to COS...'.format(upload_file_name))
-        upload_processed_text(
-                text=text,
-                name=upload_file_name,
-                bucket_name=bucket,
-                cos=CloudObjectStorage(
-                    api_key=api_key,
-                    instance_id=cos_instance_id,
-                    iam_endpoint=iam_endpoint,
-                    cos_endpoint=cos_endpoint))
-    else:
-        text.print()
+        chapters = [(chapter_index, get_text(
+            author_index, work_index, chapter_index, args.text_url))]
+
+    for chapter, word_lists in chapters:
+        if word_lists is None:
+            print('Unable to fetch chapter {}, skipping'.format(chapter))
+            continue
+        if cos:
+            upload_file_name = '-'.join([
+                date.today().isoformat(),
+                author_index,
+                work_index,
+                chapter]) + '.text'
+            print('Uploading file {} to COS...'.format(upload_file_name))
+            upload_processed_text(
+                    word_lists=word_lists,
+                    name=upload_file_name,
+                    bucket_name=bucket,
+                    cos=cos)
+        else:
+            for words in word_lists:
+                print(words)
 
     return 0
 
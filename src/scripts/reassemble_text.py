@@ -27,10 +27,18 @@ def main():
                         required=False, help='Random state for splitting dataset between training and test data')
     parser.add_argument('-o', '--output-file',
                         required=False, help='Output file for writing model results')
+    parser.add_argument('-b', '--backend', choices=sorted(dataset.BACKENDS), default='gbc',
+                        help='Classifier: exact (gbc) or histogram-based (hist) gradient boosting')
+    parser.add_argument('--validation-fraction', type=float, default=0.1,
+                        help='Fraction of the training data held out for early stopping (hist only)')
+    parser.add_argument('--n-iter-no-change', type=int, default=10,
+                        help='Rounds without improvement before stopping early (hist only)')
+    parser.add_argument('-M', '--model-dir',
+                        required=False, help='Save the trained model as a new version in this directory')
 
     args = parser.parse_args()
 
-    ds = dataset.load_latin_dataset(
+    ds = dataset.load_latin_scansion_dataset(
         data_file_name=args.data_file,
         target_file_name=args.targets_file)
 
@@ -38,9 +46,15 @@ def main():
     num_estimators = int(args.estimators) if args.estimators else 100
     lr = float(args.learning_rate) if args.learning_rate else 0.1
     md = int(args.max_depth) if args.max_depth else 3
-    mf = int(args.max_features) if args.max_features else dataset.data.shape[1]
+    mf = int(args.max_features) if args.max_features else ds.data.shape[1]
     mrs = int(args.model_random_state) if args.model_random_state else 0
 
+    backend_options = {}
+    if args.backend == 'hist':
+        backend_options = {
+            'validation_fraction': args.validation_fraction,
+            'n_iter_no_change': args.n_iter_no_change}
+
     train_score, test_score, final_result_set = dataset.run_gbc(
         dataset=ds,
         split_random_state=srs,
@@ -48,19 +62,27 @@ def main():
         learning_rate=lr,
         max_depth=md,
         max_features=mf,
-        model_random_state=mrs)
+        model_random_state=mrs,
+        backend=args.backend,
+        model_root=args.model_dir,
+        **backend_options)
 
     if args.output_file:
         with open(args.output_file, 'w') as of:
             for res in final_result_set:
                 of.write('{}\n'.format(','.join(res[:])))
     print('Model params\n============\n')
+    print('Backend: {}'.format(args.backend))
     print('Estimators: {}\tLearning Rate: {}\tMax depth: {}\tMax features: {}\n'.format(
         num_estimators, lr, md, mf))
     print('Random states - Model: {}\tData split{}\n'.format(
         mrs, srs))
     print('Train score: {:.3f}\nTest score: {:.3f}'.format(
         train_score, test_score))
+    if args.model_dir:
+        from artifact import versions
+        print('Saved model version {} in {}'.format(
+            versions(args.model_dir)[-1], args.model_dir))
 
 
 if __name__ == "__main__":
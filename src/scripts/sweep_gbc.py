@@ -0,0 +1,88 @@
+import argparse
+import sys
+import paths
+
+
+def parse_values(values, type):
+    return [None if v == 'all' else type(v) for v in values.split(',')]
+
+
+def main():
+    paths.add_repo_paths()
+    import dataset
+    import sweep
+
+    parser = argparse.ArgumentParser(
+        description='Evaluate many model configurations in parallel',
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument('-d', '--data-file',
+                        required=True, help='Path to the data file')
+    parser.add_argument('-t', '--targets-file',
+                        required=True, help='Path to the targets file')
+    parser.add_argument('-k', '--kind', choices=['syllable', 'meter'], default='syllable',
+                        help='Kind of dataset')
+    parser.add_argument('-b', '--backend', choices=sorted(dataset.BACKENDS), default='gbc',
+                        help='Classifier: exact (gbc) or histogram-based (hist) gradient boosting')
+    parser.add_argument('-e', '--estimators', default='100',
+                        help='Comma-separated numbers of estimators')
+    parser.add_argument('-l', '--learning-rate', default='0.1',
+                        help='Comma-separated learning rates')
+    parser.add_argument('-m', '--max-depth', default='3',
+                        help='Comma-separated maximum tree depths')
+    parser.add_argument('-f', '--max-features', default='all',
+                        help='Comma-separated maximum numbers of features (or all)')
+    parser.add_argument('-n', '--random-search', type=int, required=False,
+                        help='Evaluate this many configurations chosen at random, instead of all of them')
+    parser.add_argument('-j', '--jobs', type=int, default=0,
+                        help='Number of worker processes (0 for all cores)')
+    parser.add_argument('-r', '--model-random-state', type=int, default=0,
+                        help='Random state for building models (and choosing configurations)')
+    parser.add_argument('-s', '--split-random-state', type=int, default=0,
+                        help='Random state for splitting dataset between training and test data')
+    parser.add_argument('-o', '--output-file',
+                        required=False, help='CSV file for the results table')
+
+    args = parser.parse_args()
+
+    load = dataset.load_latin_scansion_dataset if args.kind == 'syllable' \
+        else dataset.load_latin_meter_dataset
+    ds = load(data_file_name=args.data_file, target_file_name=args.targets_file)
+
+    space = {
+        'n_estimators': parse_values(args.estimators, int),
+        'learning_rate': parse_values(args.learning_rate, float),
+        'max_depth': parse_values(args.max_depth, int),
+        'max_features': parse_values(args.max_features, int)
+    }
+    if args.random_search:
+        configs = sweep.random_configs(space, args.random_search, args.model_random_state)
+    else:
+        configs = sweep.grid(space)
+    print('Evaluating {} configurations on {} rows'.format(len(configs), len(ds.target)),
+          file=sys.stderr)
+
+    rows = []
+    print('{:>10}{:>8}{:>6}{:>6}{:>7}{:>8}{:>8}{:>9}{:>10}'.format(
+        'estimators', 'rate', 'depth', 'feats', 'trees', 'train', 'test',
+        'fit (s)', 'pred (s)'))
+    for row in sweep.sweep(ds, configs, args.backend, args.jobs,
+                           split_random_state=args.split_random_state,
+                           model_random_state=args.model_random_state):
+        rows.append(row)
+        print('{:>10}{:>8}{:>6}{:>6}{:>7}{:>8.3f}{:>8.3f}{:>9.3f}{:>10.4f}'.format(
+            row['n_estimators'], row['learning_rate'], str(row['max_depth']),
+            str(row['max_features'] or 'all'), row['trees'], row['train_score'],
+            row['test_score'], row['fit_seconds'], row['predict_seconds']))
+
+    best = max(rows, key=lambda r: r['test_score'])
+    print('\nBest test score {:.3f}: {}'.format(
+        best['test_score'], {p: best[p] for p in sweep.PARAMETERS}))
+
+    if args.output_file:
+        with open(args.output_file, 'w', newline='') as f:
+            sweep.write_results(rows, f)
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
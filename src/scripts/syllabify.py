@@ -1,57 +1,91 @@
 import click
+import io
 import os
 import paths
 from datetime import date
+from pool import ordered_map, chapter_files
 
 
 def syllabify_file(input_file=None):
-    from syllable import Words, SyllabifiedLine
-    w = Words(input_file)
-    syllabified_lines = []
-    for line in w.lines():
-        syls = []
-        for word in line:
-            try:
-                for syl in word.to_syllables():
-                    syls.append(syl)
-            except IndexError:
-                print('Unable to syllabify \"{}\", skipping'.format(word.chars))
-        syllabified_lines.append(SyllabifiedLine(syls))
-    return syllabified_lines
+    from pipeline import syllabify_words
+    return list(syllabify_words(input_file))
 
 
-def write_output(syllabified_lines, output_file, scan=False):
+# Formats syllabified lines as the contents of the output (.syl) and data
+# (.syl.csv) files, returned as a tuple of strings
+def format_output(syllabified_lines, scan=False):
+    from pipeline import write_syllabified
+    text, data = io.StringIO(), io.StringIO()
+    write_syllabified(syllabified_lines, text, data, scan)
+    return text.getvalue(), data.getvalue()
+
+
+def write_formatted(text, data, output_file):
     data_file = output_file + '.csv'
     print("Writing output to ", output_file)
     with open(output_file, 'w') as f:
-        for s in syllabified_lines:
-            f.write(s.string())
+        f.write(text)
 
     print("Writing data to ", data_file)
     with open(data_file, "w") as d:
-        if scan:
-            for lineno, s in enumerate(syllabified_lines):
-                vals = [lineno + 1, len(s.syllables)]
-                for syl in s.syllables:
-                    if syl.nucleus_weight() >= 2 or syl.coda_weight() >= 2:
-                        vals.append(2)
-                    else:
-                        vals.append(0)
-                d.write('{}\n'.format(','.join(str(v) for v in vals)))
-        else:
-            for lineno, s in enumerate(syllabified_lines):
-                for syl in s.syllables:
-                    wp, rwp, lp, rlp = syl.positions()
-                    d.write('{},{},{},{},{},{},{},{},{}\n'.format(
-                        lineno,
-                        syl.chars,
-                        syl.nucleus_weight(),
-                        syl.coda_weight(),
-                        syl.nucleus_class(),
-                        wp,
-                        rwp,
-                        lp,
-                        rlp))
+        d.write(data)
+
+
+def write_output(syllabified_lines, output_file, scan=False):
+    text, data = format_output(syllabified_lines, scan)
+    write_formatted(text, data, output_file)
+
+
+# Streams a single file through the syllabification pipeline, writing its
+# output and data files as lines are syllabified
+def syllabify_to_files(input_file, output_file, scan=False):
+    from pipeline import syllabify_words, write_syllabified
+    data_file = output_file + '.csv'
+    print("Writing output to ", output_file)
+    print("Writing data to ", data_file)
+    write_syllabified(syllabify_words(input_file), output_file, data_file, scan)
+
+
+# The syllable cache's counts in this process, tagged with its pid
+def cache_info():
+    from syllable import SYLLABLE_CACHE
+    return dict(SYLLABLE_CACHE.info(), pid=os.getpid())
+
+
+# Worker for processing a directory: syllabifies one chapter and returns
+# its formatted output, which the main process writes in chapter order,
+# and the hits and misses of this process's syllable cache while doing so
+def syllabify_chapter(job):
+    input_file, scan, cache_size = job
+    from pipeline import syllabify_words
+    from syllable import SYLLABLE_CACHE
+    if SYLLABLE_CACHE.maxsize != cache_size:
+        SYLLABLE_CACHE.resize(cache_size)
+    before = cache_info()
+    text, data = format_output(syllabify_words(input_file), scan)
+    after = cache_info()
+    after.update(hits=after['hits'] - before['hits'],
+                 misses=after['misses'] - before['misses'])
+    return text, data, after
+
+
+# Sums the cache counts of the chapters (or files) syllabified, in however
+# many processes; each process's cache is counted once, at its last size
+def cache_totals(infos):
+    caches = {}
+    hits = misses = 0
+    for info in infos:
+        hits += info['hits']
+        misses += info['misses']
+        caches[info['pid']] = info
+    return {
+        'hits': hits,
+        'misses': misses,
+        'size': sum(c['size'] for c in caches.values()),
+        'maxsize': sum(c['maxsize'] for c in caches.values()),
+        'processes': len(caches)
+    }
+
 
 @click.command()
 @click.option('-a', '--author-index', help='Author index')
@@ -61,9 +95,17 @@ def write_output(syllabified_lines, output_file, scan=False):
 @click.option('-o', '--output-file', help='Destination file for output')
 @click.option('-s', '--scan', help='Attempt scansion', is_flag=True)
 @click.option('-d', '--directory', help='Process directory contents', is_flag=True)
-def main(author_index, work_index, chapter_index, input_file, output_file, scan, directory):
+@click.option('-j', '--jobs', help='Number of worker processes for directories (0 for all cores)',
+              type=int, default=1, show_default=True)
+@click.option('--cache-size', help='Number of distinct words whose syllabification is cached',
+              type=int, default=16384, show_default=True)
+@click.option('--cache-stats', help='Report syllabification cache hits and misses', is_flag=True)
+def main(author_index, work_index, chapter_index, input_file, output_file, scan, directory,
+         jobs, cache_size, cache_stats):
     """Process and syllabify/scan text(s)"""
     paths.add_repo_paths()
+    from syllable import SYLLABLE_CACHE
+    SYLLABLE_CACHE.resize(cache_size)
 
     if directory:
         chapters_dir = '/'.join(
@@ -72,18 +114,32 @@ def main(author_index, work_index, chapter_index, input_file, output_file, scan,
                 author_index,
                 work_index
             ])
-        for f in os.listdir(chapters_dir):
-            syllabified_lines = syllabify_file('/'.join([chapters_dir, f]))
-            write_output(syllabified_lines, '/'.join(
+        chapters = chapter_files(chapters_dir)
+        results = ordered_map(
+            syllabify_chapter,
+            [('/'.join([chapters_dir, f]), scan, cache_size) for f in chapters],
+            jobs)
+        infos = []
+        for f, (text, data, info) in zip(chapters, results):
+            infos.append(info)
+            write_formatted(text, data, '/'.join(
                 [
                     'datasets/syllabifications',
                     author_index,
                     work_index,
                     f + '.syl'
-                ]), scan)
+                ]))
     else:
-        syllabified_lines = syllabify_file(input_file)
-        write_output(syllabified_lines, output_file, scan)
+        syllabify_to_files(input_file, output_file, scan)
+        infos = [cache_info()]
+
+    if cache_stats:
+        info = cache_totals(infos)
+        lookups = info['hits'] + info['misses']
+        print('Syllable cache: {} hits, {} misses ({:.1%} hit rate), {} of {} entries used'
+              ' in {} process(es)'.format(
+                  info['hits'], info['misses'], info['hits'] / lookups if lookups else 0,
+                  info['size'], info['maxsize'], info['processes']))
 
     return 0
 